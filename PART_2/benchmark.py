@@ -0,0 +1,87 @@
+# benchmark.py
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from sorter import organize_files
+
+# os functions counted as filesystem system calls; os.path and shutil go through these
+SYSCALLS = ('stat', 'lstat', 'scandir', 'listdir', 'mkdir', 'rename', 'replace', 'unlink',
+            'rmdir', 'chmod')
+
+EXTENSIONS = ('txt', 'jpg', 'pdf', 'mp3', 'bin')
+
+@contextmanager
+def count_syscalls(counts):
+    """Counts calls to the os functions in SYSCALLS while the block runs."""
+    originals = {name: getattr(os, name) for name in SYSCALLS}
+
+    def counting(name, func):
+        def wrapper(*args, **kwargs):
+            counts[name] = counts.get(name, 0) + 1
+            return func(*args, **kwargs)
+        return wrapper
+
+    for name, func in originals.items():
+        setattr(os, name, counting(name, func))
+    try:
+        yield counts
+    finally:
+        for name, func in originals.items():
+            setattr(os, name, func)
+
+def make_tree(root, n_files, files_per_dir=100):
+    for i in range(n_files):
+        directory = os.path.join(root, f'dir{i // files_per_dir}')
+        if i % files_per_dir == 0:
+            os.makedirs(directory)
+        open(os.path.join(directory, f'file_{i}.{EXTENSIONS[i % len(EXTENSIONS)]}'), 'w').close()
+
+def run_case(n_files, workers=0, workdir=None):
+    """Organizes a generated tree of n_files and returns the time and syscall counts."""
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        source_dir = os.path.join(tmp, 'source')
+        make_tree(source_dir, n_files)
+        counts = {}
+        start_time = time.perf_counter()
+        with count_syscalls(counts):
+            organize_files(source_dir, os.path.join(tmp, 'dest'), workers=workers)
+        elapsed = time.perf_counter() - start_time
+    total = sum(counts.values())
+    return {'files': n_files, 'workers': workers, 'seconds': elapsed, 'syscalls': counts,
+            'syscalls_per_file': total / n_files if n_files else 0.0}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure time and filesystem calls per file.")
+    parser.add_argument('--files', type=int, default=10000)
+    parser.add_argument('--workers', type=int, default=0)
+    parser.add_argument('--output', help="Write the results to this JSON file.")
+    parser.add_argument('--compare', help="Results JSON from an earlier revision to compare with.")
+    args = parser.parse_args(argv)
+
+    # Per-file log lines would dominate the measurement
+    logging.getLogger('FileOrganizer').disabled = True
+    result = run_case(args.files, args.workers)
+    print(f"{result['files']} files in {result['seconds']:.3f} s, "
+          f"{result['syscalls_per_file']:.2f} syscalls per file")
+    for name, count in sorted(result['syscalls'].items()):
+        print(f"    {name:<10}{count / result['files']:>8.2f} per file")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"Before: {baseline['syscalls_per_file']:.2f} syscalls per file, "
+              f"{baseline['seconds']:.3f} s")
+        print(f"After:  {result['syscalls_per_file']:.2f} syscalls per file, "
+              f"{result['seconds']:.3f} s")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,6 +4,12 @@ import re
 
 file_type_registry = []
 
+# Patterns of the form \.ext$ or \.(ext1|ext2)$, which can be looked up by extension
+EXTENSION_RULE = re.compile(r'\\\.(?:([A-Za-z0-9]+)|\((?:\?:)?([A-Za-z0-9]+(?:\|[A-Za-z0-9]+)*)\))\$')
+
+# Numbered backreferences would point at the wrong group once patterns are merged
+BACKREFERENCE = re.compile(r'\\[1-9]')
+
 def register_file_type(pattern, target_directory):
     def decorator(func):
         compiled_pattern = re.compile(pattern, re.IGNORECASE)
@@ -11,6 +17,73 @@ def register_file_type(pattern, target_directory):
         return func
     return decorator
 
+def extension_rule(pattern):
+    """Returns the lowercase extensions matched by a pure extension pattern, or None."""
+    match = EXTENSION_RULE.fullmatch(pattern.pattern)
+    if match is None:
+        return None
+    return [ext.lower() for ext in (match.group(1) or match.group(2)).split('|')]
+
+class DispatchIndex:
+    """
+    Registry compiled so that classifying a file takes one dict lookup and at
+    most one regex search.
+
+    Extension rules registered before the first other pattern go into a
+    case-insensitive dict. All later rules are merged into one alternation
+    tried in registration order at the start of the name, with a named group
+    per rule, so the first registered match still wins.
+    """
+
+    def __init__(self, registry):
+        self.size = len(registry)
+        self.extensions = {}
+        self.targets = {}
+        self.rules = []
+        for pattern, target_directory in registry:
+            extensions = None if self.rules else extension_rule(pattern)
+            if extensions is None:
+                self.rules.append((pattern, target_directory))
+                continue
+            for ext in extensions:
+                self.extensions.setdefault(ext, target_directory)
+        self.combined = None
+        if self.rules and not any(BACKREFERENCE.search(p.pattern) for p, _ in self.rules):
+            alternatives = []
+            for i, (pattern, target_directory) in enumerate(self.rules):
+                self.targets[f'rule{i}'] = target_directory
+                alternatives.append(f'(?=(?s:.*?)(?:{pattern.pattern}))(?P<rule{i}>)')
+            try:
+                self.combined = re.compile('|'.join(alternatives), re.IGNORECASE)
+            except re.error:
+                # e.g. the same group name in two patterns; scan the rules in order instead
+                self.combined = None
+
+    def lookup(self, filename):
+        _, dot, ext = filename.rpartition('.')
+        if dot:
+            if ext.endswith('\n'):
+                ext = ext[:-1]  # '$' also matches before a trailing newline
+            target_directory = self.extensions.get(ext.lower())
+            if target_directory is not None:
+                return target_directory
+        if self.combined is not None:
+            match = self.combined.match(filename)
+            return self.targets[match.lastgroup] if match else None
+        for pattern, target_directory in self.rules:
+            if pattern.search(filename):
+                return target_directory
+        return None
+
+_dispatch_index = None
+
+def classify_file(filename):
+    """Returns the target directory registered for a file name, or None."""
+    global _dispatch_index
+    if _dispatch_index is None or _dispatch_index.size != len(file_type_registry):
+        _dispatch_index = DispatchIndex(file_type_registry)
+    return _dispatch_index.lookup(filename)
+
 # Register default file types
 @register_file_type(r'\.txt$', 'TextFiles')
 def handle_text_file():
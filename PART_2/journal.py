@@ -0,0 +1,238 @@
+# journal.py
+
+import os
+import shutil
+from logger import setup_logger
+from errors import DirectoryNotFoundError, FileOrganizerError
+from filetype_handlers import classify_file
+from sorter import move_file, scan_files
+
+# First bytes of a manifest; bump the digit when the layout changes
+MANIFEST_MAGIC = b'ORGPLAN1'
+
+# Completed moves appended to the journal between two fsyncs
+SYNC_EVERY = 256
+
+READ_SIZE = 1 << 16
+
+def journal_path(manifest_path):
+    return manifest_path + '.journal'
+
+def build_plan(source_dir, dest_base_dir):
+    """Lists the (source, destination) path of every file organize_files would move."""
+    if not os.path.exists(source_dir):
+        raise DirectoryNotFoundError(f"Source directory {source_dir} does not exist.")
+    dest_stat = os.stat(dest_base_dir) if os.path.exists(dest_base_dir) else None
+    plan = []
+    for entry in scan_files(source_dir, exclude=dest_stat):
+        target_dir = classify_file(entry.name) or 'Others'
+        plan.append((entry.path, os.path.join(dest_base_dir, target_dir, entry.name)))
+    return plan
+
+def write_manifest(manifest_path, source_dir, dest_base_dir, plan):
+    """
+    Writes a plan atomically as NUL-separated paths, the one byte that
+    cannot occur in a path.
+    """
+    tmp = manifest_path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MANIFEST_MAGIC + b'\0' + os.fsencode(source_dir) + b'\0' +
+                os.fsencode(dest_base_dir) + b'\0')
+        for src, dst in plan:
+            f.write(os.fsencode(src) + b'\0' + os.fsencode(dst) + b'\0')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, manifest_path)
+
+def _fields(f):
+    """Yields (offset, field) for the NUL-terminated fields of a file from its position."""
+    offset = f.tell()
+    buffer = b''
+    while True:
+        chunk = f.read(READ_SIZE)
+        if not chunk:
+            return
+        buffer += chunk
+        *fields, buffer = buffer.split(b'\0')
+        for field in fields:
+            yield offset, field
+            offset += len(field) + 1
+
+def read_header(manifest_path):
+    """Returns the source and destination directories of a manifest, and where its entries start."""
+    with open(manifest_path, 'rb') as f:
+        fields = _fields(f)
+        header = [next(fields, (0, None)) for _ in range(3)]
+    if header[0][1] != MANIFEST_MAGIC or header[2][1] is None:
+        raise FileOrganizerError(f"{manifest_path} is not an organizer plan.")
+    start = header[2][0] + len(header[2][1]) + 1
+    return os.fsdecode(header[1][1]), os.fsdecode(header[2][1]), start
+
+def read_manifest(manifest_path, offset):
+    """Yields (offset, source, destination) for the entries from a byte offset on."""
+    with open(manifest_path, 'rb') as f:
+        f.seek(offset)
+        fields = _fields(f)
+        for entry_offset, src in fields:
+            _, dst = next(fields)
+            yield entry_offset, os.fsdecode(src), os.fsdecode(dst)
+
+def read_entry(manifest_path, offset):
+    """Returns the (offset, source, destination) entry starting at a byte offset."""
+    _, _, start = read_header(manifest_path)
+    entry = None
+    if offset >= start:
+        with open(manifest_path, 'rb') as f:
+            f.seek(offset - 1)
+            # Every field, and so every entry, starts right after a NUL
+            at_field = f.read(1) == b'\0'
+        if at_field:
+            entry = next(read_manifest(manifest_path, offset), None)
+    if entry is None:
+        raise FileOrganizerError(f"{offset} is not an entry of {manifest_path}.")
+    return entry
+
+def entry_offsets(manifest_path):
+    """Returns the set of byte offsets at which the entries of a manifest start."""
+    _, _, start = read_header(manifest_path)
+    return {offset for offset, _, _ in read_manifest(manifest_path, start)}
+
+def _journal_records(path):
+    """Returns the (position, offset) of every complete record of a journal."""
+    records = []
+    if not os.path.exists(path):
+        return records
+    position = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break  # torn by a crash while writing
+            records.append((position, int(line)))
+            position += len(line)
+    return records
+
+def _complete_length(path):
+    """Returns the length of a journal up to the end of its last complete record."""
+    with open(path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        tail_start = max(size - 64, 0)
+        f.seek(tail_start)
+        tail = f.read()
+    return tail_start + tail.rfind(b'\n') + 1
+
+def _last_record(path):
+    """Returns the manifest offset in the last complete journal record, reading only its tail."""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(size - 64, 0))
+        lines = f.read().split(b'\n')[:-1]
+    return int(lines[-1]) if lines else None
+
+class Journal:
+    """Append-only record of completed moves, fsynced every SYNC_EVERY entries."""
+
+    def __init__(self, path):
+        if os.path.exists(path):
+            # Drop a record torn by a crash, so the next one is not appended to it
+            os.truncate(path, _complete_length(path))
+        self.file = open(path, 'ab')
+        self.pending = 0
+
+    def record(self, offset):
+        self.file.write(b'%d\n' % offset)
+        self.pending += 1
+        if self.pending >= SYNC_EVERY:
+            self.sync()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending = 0
+
+    def close(self):
+        self.sync()
+        self.file.close()
+
+def execute_plan(manifest_path):
+    """
+    Moves the files of a manifest in order, journaling each completed move.
+
+    A rerun resumes after the last journaled entry. Moves made after the last
+    fsync are found done (source gone, destination present) and journaled again.
+    """
+    logger = setup_logger()
+    _, dest_base_dir, start = read_header(manifest_path)
+    resume = _last_record(journal_path(manifest_path))
+    entries = read_manifest(manifest_path, start if resume is None else resume)
+    if resume is not None:
+        # Seek straight to the last journaled entry and skip it
+        _, last, _ = next(entries)
+        logger.info(f"Resuming {manifest_path} after {last}")
+    os.makedirs(dest_base_dir, exist_ok=True)
+    ensured = set()
+    journal = Journal(journal_path(manifest_path))
+    moved = 0
+    try:
+        for offset, src, dst in entries:
+            dest_dir = os.path.dirname(dst)
+            if not os.path.lexists(src) and os.path.lexists(dst):
+                logger.info(f"File {src} was already moved to {dest_dir}")
+            else:
+                if dest_dir not in ensured:
+                    os.makedirs(dest_dir, exist_ok=True)
+                    ensured.add(dest_dir)
+                move_file(src, dest_dir, logger)
+                moved += 1
+            journal.record(offset)
+    finally:
+        journal.close()
+    return moved
+
+def undo_plan(manifest_path):
+    """Moves the journaled files back in reverse order, shortening the journal as it goes."""
+    logger = setup_logger()
+    path = journal_path(manifest_path)
+    records = _journal_records(path)
+    # Checked before anything moves, so a bad journal cannot leave the undo half done
+    offsets = entry_offsets(manifest_path)
+    for _, offset in records:
+        if offset not in offsets:
+            raise FileOrganizerError(f"{path} records {offset}, which is not an entry "
+                                     f"of {manifest_path}.")
+    restored = 0
+    for i, (position, offset) in enumerate(reversed(records), start=1):
+        _, src, dst = read_entry(manifest_path, offset)
+        if os.path.lexists(dst) and not os.path.lexists(src):
+            os.makedirs(os.path.dirname(src) or '.', exist_ok=True)
+            shutil.move(dst, src)
+            logger.info(f"Moved file {dst} back to {src}")
+            restored += 1
+        if i % SYNC_EVERY == 0:
+            os.truncate(path, position)
+    if os.path.exists(path):
+        os.remove(path)
+    return restored
+
+def organize_with_plan(source_dir, dest_base_dir, manifest_path, dry_run=False):
+    """
+    Organizes files in two phases: write the move plan, then execute it.
+
+    An existing manifest for the same directories is resumed rather than
+    rebuilt. With dry_run the plan is printed and nothing is written.
+    """
+    if dry_run:
+        plan = build_plan(source_dir, dest_base_dir)
+        for src, dst in plan:
+            print(f"{src} -> {dst}")
+        return plan
+    if os.path.exists(manifest_path):
+        planned_source, planned_dest, _ = read_header(manifest_path)
+        if (planned_source, planned_dest) != (source_dir, dest_base_dir):
+            raise FileOrganizerError(f"{manifest_path} plans moves from {planned_source} "
+                                     f"to {planned_dest}.")
+    else:
+        write_manifest(manifest_path, source_dir, dest_base_dir,
+                       build_plan(source_dir, dest_base_dir))
+    return execute_plan(manifest_path)
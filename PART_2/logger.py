@@ -2,13 +2,19 @@
 
 import logging
 
+# Read when the handlers are first added; the tests point it at a temporary directory
+LOG_FILE = 'file_organizer.log'
+
 def setup_logger():
     logger = logging.getLogger('FileOrganizer')
+    if logger.handlers:
+        # Already set up; more handlers would write every line again
+        return logger
     logger.setLevel(logging.DEBUG)
 
     # Create handlers
     c_handler = logging.StreamHandler()
-    f_handler = logging.FileHandler('file_organizer.log')
+    f_handler = logging.FileHandler(LOG_FILE)
     c_handler.setLevel(logging.WARNING)
     f_handler.setLevel(logging.DEBUG)
 
@@ -1,7 +1,10 @@
 # main.py
 
+import argparse
 import sys
 from sorter import organize_files
+from journal import organize_with_plan, undo_plan
+from watcher import POLL_INTERVAL, SETTLE_SECONDS, watch
 from config import load_config
 from logger import setup_logger
 import os
@@ -17,6 +20,40 @@ def load_plugins(plugins_dir='plugins'):
             module = importlib.util.module_from_spec(spec)
             spec.loader.exec_module(module)
 
+def non_negative_int(value):
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be 0 or more, got {value}")
+    return number
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Organize files into directories by file type.")
+    parser.add_argument('source_dir', nargs='?')
+    parser.add_argument('dest_base_dir', nargs='?')
+    parser.add_argument('--workers', type=non_negative_int,
+                        help="Move files in this many threads, with scanning and classifying "
+                             "running alongside (default: sequential, or 'workers' in config.json)")
+    parser.add_argument('--plan', metavar='MANIFEST',
+                        help="Write the moves to MANIFEST first, then execute them with a journal; "
+                             "rerunning with the same MANIFEST resumes an interrupted run")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Print the planned moves without touching any file")
+    parser.add_argument('--undo', metavar='MANIFEST',
+                        help="Move the files journaled for MANIFEST back where they came from")
+    parser.add_argument('--watch', action='store_true',
+                        help="Keep running and sort files as they arrive, using inotify where "
+                             "available and polling otherwise")
+    parser.add_argument('--poll', action='store_true',
+                        help="With --watch, poll even where inotify is available")
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL,
+                        help=f"Seconds between polling sweeps (default: {POLL_INTERVAL})")
+    parser.add_argument('--settle', type=float, default=SETTLE_SECONDS,
+                        help=f"Seconds a file must go unmodified before it is moved "
+                             f"(default: {SETTLE_SECONDS})")
+    parser.add_argument('--state', metavar='PATH',
+                        help="Keep the watch state in PATH, so a restart skips unchanged directories")
+    return parser.parse_args(argv)
+
 def main():
     logger = setup_logger()
 
@@ -26,15 +63,35 @@ def main():
     # Load plugins
     load_plugins()
 
-    if len(sys.argv) < 3:
-        logger.error("Usage: python main.py <source_directory> <destination_base_directory>")
+    args = parse_args()
+    if args.undo:
+        try:
+            undo_plan(args.undo)
+        except Exception as e:
+            logger.exception(f"An error occurred: {e}")
+            sys.exit(1)
+        return
+
+    if args.dest_base_dir is None:
+        logger.error("Usage: python main.py <source_directory> <destination_base_directory> "
+                     "[--workers N] [--plan MANIFEST] [--dry-run] [--watch] | --undo MANIFEST")
         sys.exit(1)
 
-    source_dir = sys.argv[1]
-    dest_base_dir = sys.argv[2]
+    source_dir = args.source_dir
+    dest_base_dir = args.dest_base_dir
+    workers = args.workers if args.workers is not None else config.get('workers', 0)
 
     try:
-        organize_files(source_dir, dest_base_dir)
+        if args.watch:
+            try:
+                watch(source_dir, dest_base_dir, state_path=args.state, interval=args.interval,
+                      settle=args.settle, use_inotify=not args.poll)
+            except KeyboardInterrupt:
+                logger.info("Stopped watching.")
+        elif args.plan or args.dry_run:
+            organize_with_plan(source_dir, dest_base_dir, args.plan, dry_run=args.dry_run)
+        else:
+            organize_files(source_dir, dest_base_dir, workers=workers)
     except Exception as e:
         logger.exception(f"An error occurred: {e}")
         sys.exit(1)
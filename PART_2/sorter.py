@@ -1,48 +1,174 @@
 # sorter.py
 
 import os
+import queue
 import shutil
-import re
+import threading
 from logger import setup_logger
-from errors import DirectoryNotFoundError, PermissionDeniedError
-from filetype_handlers import file_type_registry
+from errors import DirectoryNotFoundError, FileOrganizerError, PermissionDeniedError
+from filetype_handlers import classify_file
 
-def organize_files(source_dir, dest_base_dir):
+# Items each pipeline queue holds before the stage feeding it blocks
+QUEUE_SIZE = 1024
+
+# Marks the end of a pipeline queue
+_DONE = object()
+
+def organize_files(source_dir, dest_base_dir, workers=0):
     logger = setup_logger()
 
     if not os.path.exists(source_dir):
         logger.error(f"Source directory {source_dir} does not exist.")
         raise DirectoryNotFoundError(f"Source directory {source_dir} does not exist.")
 
+    if workers < 0:
+        raise FileOrganizerError(f"workers must be 0 or more, got {workers}.")
+
     if not os.path.exists(dest_base_dir):
         logger.info(f"Destination directory {dest_base_dir} does not exist. Creating it.")
         os.makedirs(dest_base_dir)
+    # Not descended into when the destination lies inside the source
+    dest_stat = os.stat(dest_base_dir)
+
+    if workers:
+        return _organize_pipelined(source_dir, dest_base_dir, dest_stat, workers, logger)
+
+    # Destination directories already created, so each costs one makedirs per run
+    ensured = set()
+    for entry in scan_files(source_dir, exclude=dest_stat):
+        # Files no registered pattern matches go to 'Others'
+        target_dir = classify_file(entry.name) or 'Others'
+        dest_dir = os.path.join(dest_base_dir, target_dir)
+        if dest_dir not in ensured:
+            os.makedirs(dest_dir, exist_ok=True)
+            ensured.add(dest_dir)
+        move_file(entry.path, dest_dir, logger)
+
+def scan_files(source_dir, exclude=None):
+    """
+    Yields a DirEntry for every file under source_dir, in os.walk order.
+
+    Directories are told apart by the file type scandir already returns, so
+    no file needs a stat call. Symlinked directories are not followed, and
+    the directory whose stat result is `exclude` is skipped.
+    """
+    stack = [source_dir]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                entries = list(it)
+        except OSError:
+            # Like os.walk, skip directories that cannot be listed
+            continue
+        subdirs = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if not is_dir:
+                yield entry
+            elif not entry.is_symlink():
+                if exclude is not None and entry.inode() == exclude.st_ino and \
+                        os.path.samestat(entry.stat(follow_symlinks=False), exclude):
+                    continue
+                subdirs.append(entry.path)
+        stack.extend(reversed(subdirs))
+
+def move_file(file_path, dest_dir, logger):
+    # Moving to the full path skips the isdir/samefile/exists checks shutil.move
+    # makes for a directory target; the one check it needs is done here
+    dest_path = os.path.join(dest_dir, os.path.basename(file_path))
+    if os.path.lexists(dest_path):
+        raise shutil.Error(f"Destination path '{dest_path}' already exists")
+    try:
+        shutil.move(file_path, dest_path)
+        logger.info(f"Moved file {file_path} to {dest_dir}")
+    except PermissionError as e:
+        logger.error(f"Permission error moving file {file_path}: {e}")
+        raise PermissionDeniedError(f"Permission error moving file {file_path}: {e}")
+
+def _organize_pipelined(source_dir, dest_base_dir, dest_stat, workers, logger):
+    """
+    Runs the scan, classify and move stages in threads connected by bounded queues.
+
+    Each destination directory is assigned to one of `workers` move threads,
+    so files going to the same directory are moved in scan order. The first
+    error stops every stage and is raised once all threads have exited.
+    """
+    scanned = queue.Queue(QUEUE_SIZE)
+    lanes = [queue.Queue(QUEUE_SIZE) for _ in range(workers)]
+    lane_of = {}
+    stop = threading.Event()
+    errors = []
+
+    def put(q, item):
+        # Gives up once another stage has failed, so no thread blocks forever
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def get(q):
+        # Reads as the end of the queue once another stage has failed
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return _DONE
+
+    def run(stage, *args):
+        try:
+            stage(*args)
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+
+    def scan():
+        try:
+            for entry in scan_files(source_dir, exclude=dest_stat):
+                if not put(scanned, entry):
+                    return
+        finally:
+            put(scanned, _DONE)
+
+    def classify():
+        try:
+            while True:
+                item = get(scanned)
+                if item is _DONE:
+                    return
+                dest_dir = os.path.join(dest_base_dir, classify_file(item.name) or 'Others')
+                lane = lane_of.setdefault(dest_dir, len(lane_of) % workers)
+                if not put(lanes[lane], (item.path, dest_dir)):
+                    return
+        finally:
+            for lane in lanes:
+                put(lane, _DONE)
+
+    def move(lane):
+        ensured = set()
+        while True:
+            item = get(lane)
+            if item is _DONE:
+                return
+            file_path, dest_dir = item
+            if dest_dir not in ensured:
+                os.makedirs(dest_dir, exist_ok=True)
+                ensured.add(dest_dir)
+            move_file(file_path, dest_dir, logger)
 
-    for root, dirs, files in os.walk(source_dir):
-        for file in files:
-            file_path = os.path.join(root, file)
-            matched = False
-            for pattern, target_dir in file_type_registry:
-                if pattern.search(file):
-                    dest_dir = os.path.join(dest_base_dir, target_dir)
-                    if not os.path.exists(dest_dir):
-                        os.makedirs(dest_dir)
-                    try:
-                        shutil.move(file_path, dest_dir)
-                        logger.info(f"Moved file {file_path} to {dest_dir}")
-                    except PermissionError as e:
-                        logger.error(f"Permission error moving file {file_path}: {e}")
-                        raise PermissionDeniedError(f"Permission error moving file {file_path}: {e}")
-                    matched = True
-                    break
-            if not matched:
-                # Move to 'Others' directory
-                dest_dir = os.path.join(dest_base_dir, 'Others')
-                if not os.path.exists(dest_dir):
-                    os.makedirs(dest_dir)
-                try:
-                    shutil.move(file_path, dest_dir)
-                    logger.info(f"Moved file {file_path} to {dest_dir}")
-                except PermissionError as e:
-                    logger.error(f"Permission error moving file {file_path}: {e}")
-                    raise PermissionDeniedError(f"Permission error moving file {file_path}: {e}")
+    threads = [threading.Thread(target=run, args=(scan,), name='organizer-scan'),
+               threading.Thread(target=run, args=(classify,), name='organizer-classify')]
+    threads += [threading.Thread(target=run, args=(move, lane), name=f'organizer-move-{i}')
+                for i, lane in enumerate(lanes)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
@@ -1,5 +1,6 @@
 # tests/test_sorter.py
 
+import logging
 import sys
 import os
 import shutil
@@ -10,9 +11,23 @@ from unittest.mock import patch
 # Ensure the parent directory is in the import path
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
+import logger as logger_module
 from main import load_plugins
 from sorter import organize_files
 from errors import DirectoryNotFoundError, PermissionDeniedError
+from filetype_handlers import DispatchIndex
+
+@pytest.fixture(autouse=True, scope='module')
+def log_to_temp_dir(tmp_path_factory):
+    # Keeps the test runs out of file_organizer.log in the working directory
+    original = logger_module.LOG_FILE
+    logger_module.LOG_FILE = str(tmp_path_factory.mktemp('logs') / 'file_organizer.log')
+    yield
+    organizer_logger = logging.getLogger('FileOrganizer')
+    for handler in list(organizer_logger.handlers):
+        organizer_logger.removeHandler(handler)
+        handler.close()
+    logger_module.LOG_FILE = original
 
 def setup_test_environment(source_dir, files):
     os.makedirs(source_dir, exist_ok=True)
@@ -206,3 +221,367 @@ def test_custom_file_type_from_plugin():
         assert os.path.exists(os.path.join(dest_dir, 'Documents', 'document.docx'))
     finally:
         teardown_test_environment([source_dir, dest_dir])
+
+def test_dispatch_index_keeps_registration_order():
+    import re
+    registry = [(re.compile(pattern, re.IGNORECASE), target) for pattern, target in [
+        (r'\.txt$', 'TextFiles'),
+        (r'\.(jpg|jpeg)$', 'Images'),
+        (r'^backup_', 'Backups'),
+        (r'\.zip$', 'Archives'),
+        (r'\.tar\.gz$', 'Archives'),
+        (r'\.txt$', 'Duplicate'),
+        (r'(\w)\1\.log$', 'Repeated'),
+    ]]
+    names = ['a.TXT', 'photo.JPeG', 'backup_a.txt', 'backup_b.zip', 'notes.zip', 'x.tar.gz',
+             'aa.log', 'ab.log', 'README', '.hidden', 'a.txt\n']
+    # Without the backreference the later rules are merged into one regex
+    for rules, merged in ((registry[:-1], True), (registry, False)):
+        index = DispatchIndex(rules)
+        assert set(index.extensions) == {'txt', 'jpg', 'jpeg'}
+        assert (index.combined is not None) == merged
+        for name in names:
+            expected = next((target for pattern, target in rules if pattern.search(name)), None)
+            assert index.lookup(name) == expected, name
+
+def test_pipelined_mode():
+    source_dir = 'test_source'
+    dest_dir = 'test_dest'
+    files = [f'folder{i % 3}/file_{i}.{ext}' for i in range(60) for ext in ('txt', 'jpg', 'bin')]
+    setup_test_environment(source_dir, files)
+
+    try:
+        organize_files(source_dir, dest_dir, workers=4)
+        for file in files:
+            name = os.path.basename(file)
+            target = {'txt': 'TextFiles', 'jpg': 'Images', 'bin': 'Others'}[name.rsplit('.', 1)[1]]
+            assert os.path.exists(os.path.join(dest_dir, target, name))
+        assert not any(files_in_root for _, _, files_in_root in os.walk(source_dir))
+    finally:
+        teardown_test_environment([source_dir, dest_dir])
+
+def test_negative_workers_rejected():
+    from errors import FileOrganizerError
+    from main import parse_args
+    source_dir = 'test_source'
+    dest_dir = 'test_dest'
+    setup_test_environment(source_dir, ['a.txt'])
+
+    try:
+        with pytest.raises(FileOrganizerError):
+            organize_files(source_dir, dest_dir, workers=-1)
+        assert os.path.exists(os.path.join(source_dir, 'a.txt'))
+        with pytest.raises(SystemExit):
+            parse_args([source_dir, dest_dir, '--workers', '-2'])
+    finally:
+        teardown_test_environment([source_dir, dest_dir])
+
+def test_pipelined_mode_keeps_order_per_destination():
+    source_dir = 'test_source'
+    dest_dir = 'test_dest'
+    files = [f'file_{i}.{ext}' for i in range(50) for ext in ('txt', 'png')]
+    setup_test_environment(source_dir, files)
+    scan_order = [f for _, _, names in os.walk(source_dir) for f in names]
+    moved = []
+
+    try:
+        with patch('shutil.move', side_effect=lambda src, dst: moved.append((os.path.dirname(dst), os.path.basename(src)))):
+            organize_files(source_dir, dest_dir, workers=3)
+        for target in ('TextFiles', 'Images'):
+            destination = os.path.join(dest_dir, target)
+            suffix = '.txt' if target == 'TextFiles' else '.png'
+            expected = [f for f in scan_order if f.endswith(suffix)]
+            assert [name for dst, name in moved if dst == destination] == expected
+    finally:
+        teardown_test_environment([source_dir, dest_dir])
+
+def test_pipelined_permission_denied():
+    source_dir = 'test_source'
+    dest_dir = 'test_dest'
+    files = [f'test{i}.txt' for i in range(20)]
+    setup_test_environment(source_dir, files)
+
+    try:
+        with patch('shutil.move', side_effect=PermissionError), \
+             pytest.raises(PermissionDeniedError):
+            organize_files(source_dir, dest_dir, workers=2)
+    finally:
+        teardown_test_environment([source_dir, dest_dir])
+
+def test_destination_inside_source_is_skipped():
+    source_dir = 'test_source'
+    dest_dir = os.path.join(source_dir, 'sorted')
+    files = ['a.txt', 'folder/b.jpg', 'sorted/TextFiles/old.txt']
+    setup_test_environment(source_dir, files)
+
+    try:
+        organize_files(source_dir, dest_dir)
+        assert sorted(os.listdir(os.path.join(dest_dir, 'TextFiles'))) == ['a.txt', 'old.txt']
+        assert os.listdir(os.path.join(dest_dir, 'Images')) == ['b.jpg']
+    finally:
+        teardown_test_environment([source_dir])
+
+def test_benchmark_counts_syscalls():
+    from benchmark import run_case
+    result = run_case(50)
+    assert result['syscalls']['rename'] == 50
+    assert result['syscalls_per_file'] < 4
+
+def test_plan_execute_and_undo():
+    from journal import organize_with_plan, undo_plan
+    source_dir = 'test_source'
+    dest_dir = 'test_dest'
+    manifest = 'test_plan.manifest'
+    files = ['a.txt', 'folder/b.jpg', 'folder/c.bin']
+    setup_test_environment(source_dir, files)
+
+    try:
+        assert organize_with_plan(source_dir, dest_dir, manifest) == 3
+        assert os.path.exists(os.path.join(dest_dir, 'Images', 'b.jpg'))
+        assert not os.path.exists(os.path.join(source_dir, 'folder', 'c.bin'))
+        # A rerun of a completed plan has nothing left to do
+        assert organize_with_plan(source_dir, dest_dir, manifest) == 0
+        assert undo_plan(manifest) == 3
+        for file in files:
+            assert os.path.exists(os.path.join(source_dir, file))
+        assert not os.path.exists(os.path.join(dest_dir, 'Images', 'b.jpg'))
+    finally:
+        teardown_test_environment([source_dir, dest_dir])
+        for path in (manifest, manifest + '.journal'):
+            if os.path.exists(path):
+                os.remove(path)
+
+def test_plan_resumes_after_failure():
+    import journal
+    source_dir = 'test_source'
+    dest_dir = 'test_dest'
+    manifest = 'test_plan.manifest'
+    files = [f'file_{i}.txt' for i in range(10)]
+    setup_test_environment(source_dir, files)
+    real_move = shutil.move
+    calls = []
+
+    def failing_move(src, dst):
+        calls.append(src)
+        if len(calls) == 6:
+            raise PermissionError
+        return real_move(src, dst)
+
+    try:
+        with patch('shutil.move', side_effect=failing_move), \
+             pytest.raises(PermissionDeniedError):
+            journal.organize_with_plan(source_dir, dest_dir, manifest)
+        assert len(journal._journal_records(manifest + '.journal')) == 5
+        calls.clear()
+        with patch('shutil.move', side_effect=real_move) as move:
+            assert journal.organize_with_plan(source_dir, dest_dir, manifest) == 5
+            assert move.call_count == 5
+        for file in files:
+            assert os.path.exists(os.path.join(dest_dir, 'TextFiles', file))
+    finally:
+        teardown_test_environment([source_dir, dest_dir])
+        for path in (manifest, manifest + '.journal'):
+            if os.path.exists(path):
+                os.remove(path)
+
+def test_plan_resumes_after_torn_journal_record():
+    import journal
+    from errors import FileOrganizerError
+    source_dir = 'test_source'
+    dest_dir = 'test_dest'
+    manifest = 'test_plan.manifest'
+    files = [f'file_{i}.txt' for i in range(10)]
+    setup_test_environment(source_dir, files)
+    real_move = shutil.move
+    calls = []
+
+    def failing_move(src, dst):
+        calls.append(src)
+        if len(calls) == 4:
+            raise PermissionError
+        return real_move(src, dst)
+
+    try:
+        with patch('shutil.move', side_effect=failing_move), \
+             pytest.raises(PermissionDeniedError):
+            journal.organize_with_plan(source_dir, dest_dir, manifest)
+        # A crash while writing the next record leaves part of it behind
+        with open(manifest + '.journal', 'ab') as f:
+            f.write(b'8')
+        assert journal.organize_with_plan(source_dir, dest_dir, manifest) == 7
+        offsets = journal.entry_offsets(manifest)
+        records = journal._journal_records(manifest + '.journal')
+        assert [offset for _, offset in records] == sorted(offsets)
+        assert journal.undo_plan(manifest) == 10
+        for file in files:
+            assert os.path.exists(os.path.join(source_dir, file))
+        with pytest.raises(FileOrganizerError):
+            journal.read_entry(manifest, min(offsets) + 1)
+    finally:
+        teardown_test_environment([source_dir, dest_dir])
+        for path in (manifest, manifest + '.journal'):
+            if os.path.exists(path):
+                os.remove(path)
+
+def test_dry_run_touches_nothing(capsys):
+    from journal import organize_with_plan
+    source_dir = 'test_source'
+    dest_dir = 'test_dest'
+    files = ['a.txt', 'b.mp3']
+    setup_test_environment(source_dir, files)
+
+    try:
+        plan = organize_with_plan(source_dir, dest_dir, 'test_plan.manifest', dry_run=True)
+        assert len(plan) == 2
+        assert os.path.join(dest_dir, 'Music', 'b.mp3') in capsys.readouterr().out
+        assert not os.path.exists(dest_dir)
+        assert not os.path.exists('test_plan.manifest')
+        assert sorted(os.listdir(source_dir)) == files
+    finally:
+        teardown_test_environment([source_dir, dest_dir])
+
+def test_watcher_sweeps_only_changed_directories():
+    from benchmark import count_syscalls
+    from watcher import Watcher
+    source_dir = 'test_source'
+    dest_dir = 'test_dest'
+    state = 'test_watch_state.json'
+    files = ['a.txt', 'folder1/b.jpg', 'folder2/sub/c.pdf']
+    setup_test_environment(source_dir, files)
+
+    try:
+        watcher = Watcher(source_dir, dest_dir, state_path=state, settle=0)
+        assert watcher.sweep() == 3
+        assert os.path.exists(os.path.join(dest_dir, 'PDFs', 'c.pdf'))
+        watcher.sweep()  # lists the directories the moves changed
+        counts = {}
+        with count_syscalls(counts):
+            assert watcher.sweep() == 0
+        assert 'scandir' not in counts
+        open(os.path.join(source_dir, 'folder2', 'sub', 'd.mp3'), 'w').close()
+        counts = {}
+        with count_syscalls(counts):
+            assert Watcher(source_dir, dest_dir, state_path=state, settle=0).sweep() == 1
+        assert counts['scandir'] == 1
+        assert os.path.exists(os.path.join(dest_dir, 'Music', 'd.mp3'))
+    finally:
+        teardown_test_environment([source_dir, dest_dir])
+        if os.path.exists(state):
+            os.remove(state)
+
+def test_watcher_waits_for_files_to_settle():
+    import time
+    from watcher import Watcher
+    source_dir = 'test_source'
+    dest_dir = 'test_dest'
+    state = 'test_watch_state.json'
+    setup_test_environment(source_dir, ['partial.txt'])
+
+    try:
+        assert Watcher(source_dir, dest_dir, state_path=state, settle=60).sweep() == 0
+        assert os.path.exists(os.path.join(source_dir, 'partial.txt'))
+        # Still pending after a restart, although its directory has not changed
+        watcher = Watcher(source_dir, dest_dir, state_path=state, settle=60)
+        assert watcher.sweep(now=time.time() + 120) == 1
+        assert os.path.exists(os.path.join(dest_dir, 'TextFiles', 'partial.txt'))
+    finally:
+        teardown_test_environment([source_dir, dest_dir])
+        if os.path.exists(state):
+            os.remove(state)
+
+def test_watch_with_inotify():
+    import threading
+    import time
+    from watcher import Inotify, watch
+    inotify = Inotify.create()
+    if inotify is None:
+        pytest.skip("inotify is not available")
+    inotify.close()
+    source_dir = 'test_source'
+    dest_dir = 'test_dest'
+    setup_test_environment(source_dir, ['before.txt'])
+    stop = threading.Event()
+    thread = threading.Thread(target=watch, args=(source_dir, dest_dir),
+                              kwargs={'settle': 0.1, 'interval': 0.1, 'stop': stop})
+    thread.start()
+
+    try:
+        os.makedirs(os.path.join(source_dir, 'new'))
+        with open(os.path.join(source_dir, 'new', 'after.jpg'), 'w') as f:
+            f.write('data')
+        deadline = time.time() + 5
+        expected = [os.path.join(dest_dir, 'TextFiles', 'before.txt'),
+                    os.path.join(dest_dir, 'Images', 'after.jpg')]
+        while time.time() < deadline and not all(os.path.exists(p) for p in expected):
+            time.sleep(0.05)
+        assert all(os.path.exists(p) for p in expected)
+    finally:
+        stop.set()
+        thread.join()
+        teardown_test_environment([source_dir, dest_dir])
+
+def test_watcher_rewatches_after_overflow():
+    import time
+    from watcher import IN_Q_OVERFLOW, Inotify, Watcher
+    inotify = Inotify.create()
+    if inotify is None:
+        pytest.skip("inotify is not available")
+    source_dir = 'test_source'
+    dest_dir = 'test_dest'
+    setup_test_environment(source_dir, [])
+
+    try:
+        watcher = Watcher(source_dir, dest_dir, settle=60)
+        watcher.watch_tree(inotify, source_dir)
+        # Created while the event queue overflowed, so no event announces it
+        os.makedirs(os.path.join(source_dir, 'lost'))
+        watcher.handle_event(inotify, None, IN_Q_OVERFLOW, '', time.time())
+        assert os.path.join(source_dir, 'lost') in inotify.paths.values()
+    finally:
+        inotify.close()
+        teardown_test_environment([source_dir, dest_dir])
+
+def test_watcher_skips_file_that_vanishes_before_move():
+    import sorter
+    import watcher
+    source_dir = 'test_source'
+    dest_dir = 'test_dest'
+    setup_test_environment(source_dir, ['gone.txt', 'kept.jpg'])
+    gone = os.path.join(source_dir, 'gone.txt')
+
+    def removing_move(file_path, dest_dir, logger):
+        # Removed by someone else between the lstat and the rename
+        if file_path == gone:
+            os.remove(file_path)
+        return sorter.move_file(file_path, dest_dir, logger)
+
+    try:
+        w = watcher.Watcher(source_dir, dest_dir, settle=0)
+        with patch('watcher.move_file', side_effect=removing_move):
+            assert w.sweep() == 1
+        assert os.path.exists(os.path.join(dest_dir, 'Images', 'kept.jpg'))
+        assert not w.pending
+    finally:
+        teardown_test_environment([source_dir, dest_dir])
+
+def test_watcher_saves_state_only_on_change():
+    from benchmark import count_syscalls
+    from watcher import Watcher
+    source_dir = 'test_source'
+    dest_dir = 'test_dest'
+    state = 'test_watch_state.json'
+    setup_test_environment(source_dir, ['waiting.txt'])
+
+    try:
+        watcher = Watcher(source_dir, dest_dir, state_path=state, settle=60)
+        watcher.sweep()
+        assert os.path.exists(state)
+        counts = {}
+        with count_syscalls(counts):
+            assert watcher.flush() == 0
+            assert watcher.sweep() == 0
+        assert 'replace' not in counts
+    finally:
+        teardown_test_environment([source_dir, dest_dir])
+        if os.path.exists(state):
+            os.remove(state)
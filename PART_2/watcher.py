@@ -0,0 +1,274 @@
+# watcher.py
+
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import shutil
+import struct
+import sys
+import time
+from logger import setup_logger
+from errors import DirectoryNotFoundError, PermissionDeniedError
+from filetype_handlers import classify_file
+from sorter import move_file
+
+# Seconds a file must go unmodified before it is moved, so files still being written are left alone
+SETTLE_SECONDS = 2.0
+
+# Seconds between sweeps when polling
+POLL_INTERVAL = 5.0
+
+# inotify event bits, from <sys/inotify.h>
+IN_MODIFY = 0x2
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+EVENT_HEADER = struct.Struct('iIII')
+
+class Inotify:
+    """Minimal inotify binding over libc, for Linux only."""
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.paths = {}
+
+    @classmethod
+    def create(cls):
+        """Returns an Inotify instance, or None where inotify is unavailable."""
+        if not sys.platform.startswith('linux'):
+            return None
+        try:
+            return cls()
+        except (OSError, AttributeError):
+            return None
+
+    def add_watch(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        self.paths[wd] = path
+
+    def read_events(self, timeout):
+        """Yields (directory, mask, name) for the events available within timeout seconds."""
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            if mask & IN_IGNORED:
+                self.paths.pop(wd, None)
+            elif mask & IN_Q_OVERFLOW or wd in self.paths:
+                yield self.paths.get(wd), mask, name
+
+    def close(self):
+        os.close(self.fd)
+
+class Watcher:
+    """
+    Sorts the files arriving under source_dir into dest_base_dir.
+
+    Every directory's mtime and subdirectories are kept in a state index,
+    persisted to state_path if given. A sweep stats each directory once and
+    only lists those whose mtime changed, so unchanged subtrees cost no
+    listing. Files are moved once they have gone unmodified for `settle`
+    seconds; until then they stay pending, across restarts too.
+    """
+
+    def __init__(self, source_dir, dest_base_dir, state_path=None, settle=SETTLE_SECONDS):
+        if not os.path.exists(source_dir):
+            raise DirectoryNotFoundError(f"Source directory {source_dir} does not exist.")
+        os.makedirs(dest_base_dir, exist_ok=True)
+        self.logger = setup_logger()
+        self.source_dir = source_dir
+        self.dest_base_dir = dest_base_dir
+        self.dest_stat = os.stat(dest_base_dir)
+        self.state_path = state_path
+        self.settle = settle
+        self.directories = {}
+        self.pending = {}
+        self.ensured = set()
+        # Whether directories or pending differ from what was last saved
+        self.dirty = False
+        if state_path is not None and os.path.exists(state_path):
+            with open(state_path, 'r') as f:
+                state = json.load(f)
+            self.directories = {path: tuple(entry) for path, entry in state['directories'].items()}
+            self.pending = dict.fromkeys(state['pending'], 0.0)
+
+    def save(self):
+        """Writes the state index, if it has changed since it was last written."""
+        if self.state_path is None or not self.dirty:
+            return
+        tmp = self.state_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'directories': self.directories, 'pending': list(self.pending)}, f)
+        os.replace(tmp, self.state_path)
+        self.dirty = False
+
+    def _is_destination(self, entry):
+        return entry.inode() == self.dest_stat.st_ino and \
+            os.path.samestat(entry.stat(follow_symlinks=False), self.dest_stat)
+
+    def scan_directory(self, path):
+        """Lists one directory, queueing its files; returns its subdirectories."""
+        subdirs = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if not is_dir:
+                        # Settling is judged by the file's mtime alone until an event arrives
+                        if entry.path not in self.pending:
+                            self.pending[entry.path] = 0.0
+                            self.dirty = True
+                    elif not entry.is_symlink() and not self._is_destination(entry):
+                        subdirs.append(entry.path)
+        except OSError:
+            return []
+        return subdirs
+
+    def sweep(self, now=None):
+        """Finds new files by mtime, then moves the settled ones. Returns the number moved."""
+        now = time.time() if now is None else now
+        listed = 0
+        stack = [self.source_dir]
+        seen = {}
+        while stack:
+            path = stack.pop()
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            saved = self.directories.get(path)
+            if saved is None or saved[0] != mtime:
+                subdirs = self.scan_directory(path)
+                listed += 1
+            else:
+                subdirs = saved[1]
+            seen[path] = (mtime, subdirs)
+            stack.extend(subdirs)
+        if seen != self.directories:
+            self.directories = seen
+            self.dirty = True
+        self.logger.debug(f"Sweep listed {listed} of {len(seen)} directories")
+        return self.flush(now)
+
+    def flush(self, now=None):
+        """Moves the pending files that have settled. Returns the number moved."""
+        now = time.time() if now is None else now
+        moved = 0
+        for path, seen in list(self.pending.items()):
+            try:
+                mtime = os.lstat(path).st_mtime
+            except FileNotFoundError:
+                del self.pending[path]
+                self.dirty = True
+                continue
+            if now - max(mtime, seen) < self.settle:
+                continue
+            target_dir = classify_file(os.path.basename(path)) or 'Others'
+            dest_dir = os.path.join(self.dest_base_dir, target_dir)
+            del self.pending[path]
+            self.dirty = True
+            try:
+                if dest_dir not in self.ensured:
+                    os.makedirs(dest_dir, exist_ok=True)
+                    self.ensured.add(dest_dir)
+                move_file(path, dest_dir, self.logger)
+            except (PermissionDeniedError, shutil.Error, OSError) as e:
+                # Logged and skipped, so one bad file does not stop the watch;
+                # this includes a file removed since it was stat'ed
+                self.logger.error(f"Could not move file {path}: {e}")
+                continue
+            moved += 1
+        self.save()
+        return moved
+
+    def watch_tree(self, inotify, path):
+        """Adds inotify watches for a directory and its subdirectories, queueing their files."""
+        stack = [path]
+        while stack:
+            directory = stack.pop()
+            try:
+                inotify.add_watch(directory)
+            except OSError as e:
+                self.logger.warning(f"Cannot watch {directory}: {e}")
+                continue
+            # Files created before the watch was in place
+            stack.extend(self.scan_directory(directory))
+
+    def handle_event(self, inotify, directory, mask, name, now):
+        if mask & IN_Q_OVERFLOW:
+            # Events were lost; fall back to one full listing, and watch the
+            # directories created meanwhile (existing watches are kept as they are)
+            self.directories = {}
+            self.sweep(now)
+            self.watch_tree(inotify, self.source_dir)
+            return
+        path = os.path.join(directory, name)
+        if mask & IN_ISDIR:
+            try:
+                is_destination = os.path.samestat(os.stat(path), self.dest_stat)
+            except OSError:
+                return
+            if not is_destination:
+                self.watch_tree(inotify, path)
+        else:
+            # Only the pending paths are saved, not when their last event came
+            self.dirty = self.dirty or path not in self.pending
+            self.pending[path] = now
+
+def watch(source_dir, dest_base_dir, state_path=None, interval=POLL_INTERVAL,
+          settle=SETTLE_SECONDS, use_inotify=True, stop=None):
+    """
+    Sorts files into dest_base_dir as they arrive under source_dir, until `stop` is set.
+
+    Uses inotify where available, otherwise sweeps every `interval` seconds.
+    """
+    watcher = Watcher(source_dir, dest_base_dir, state_path, settle)
+    inotify = Inotify.create() if use_inotify else None
+    logger = watcher.logger
+    now = time.time()
+    if inotify is None:
+        logger.info(f"Watching {source_dir} by polling every {interval} seconds")
+        watcher.sweep(now)
+    else:
+        logger.info(f"Watching {source_dir} with inotify")
+        watcher.watch_tree(inotify, source_dir)
+        watcher.flush(now)
+    try:
+        while stop is None or not stop.is_set():
+            if inotify is None:
+                time.sleep(interval)
+                watcher.sweep()
+                continue
+            # Wake up in time to move pending files once they settle
+            timeout = min(settle, interval) if watcher.pending else interval
+            now = time.time()
+            for directory, mask, name in inotify.read_events(timeout):
+                watcher.handle_event(inotify, directory, mask, name, now)
+            if watcher.pending:
+                watcher.flush()
+    finally:
+        if inotify is not None:
+            inotify.close()
@@ -1,60 +1,229 @@
 # main.py
 import time
-from modules.data_loader import parse_json
-from modules.graph_utils import (
-    build_graph,
-    compute_all_pairs_shortest_paths,
-    create_distance_matrix,
-    plot_graph
+
+# Start timing before the program's own imports so startup cost is tracked
+_import_start = time.perf_counter()
+
+import argparse
+import sys
+from modules import tracing
+from modules.distance_cache import DistanceCache
+from modules.network_cache import DEFAULT_CACHE_DIR
+from modules.planner import Planner, PlanningError
+from modules.transfers import MODE_CHANGES
+from modules.multi_criteria import CRITERIA, pareto_front, route_metrics
+from modules.presenter import (
+    log_total_weight,
+    output_comparison,
+    output_results,
+    results_to_csv,
+    results_to_json
 )
-from modules.optimizer import solve_tsp, adjust_route
-from modules.presenter import log_total_weight, output_results
-from modules.interface import get_optimization_criteria  # Import the function from interface.py
 from modules.logger_config import logger  # Import the logger
 
+IMPORT_TIME = time.perf_counter() - _import_start
+
+
+def non_negative_hours(text):
+    """
+    Parses a non-negative number of hours for argparse.
+
+    Parameters:
+        text (str): The argument.
+
+    Returns:
+        float: The number of hours.
+    """
+    try:
+        hours = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid number of hours: {text!r}") from None
+    if not 0 <= hours < float('inf'):
+        raise argparse.ArgumentTypeError(f"must be a non-negative number of hours, got {text}")
+    return hours
+
 
-def main():
+def parse_args(argv=None):
+    """
+    Parses the command line arguments.
+
+    Parameters:
+        argv (list, optional): Arguments to parse instead of sys.argv.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Plan the optimal route to visit all relatives.")
+    parser.add_argument('--input', default='data/routes.json', help="Routes JSON file.")
+    parser.add_argument('--criteria', choices=CRITERIA + (MODE_CHANGES, 'all'),
+                        help="Optimization criteria; prompts when omitted on a terminal, "
+                             "otherwise defaults to time. mode_changes minimizes changes of "
+                             "travel mode, then travel time.")
+    parser.add_argument('--transfer-penalty', type=non_negative_hours, metavar='HOURS',
+                        help="With mode_changes, minimize travel time plus this many hours "
+                             "per mode change instead.")
+    parser.add_argument('--start', default="Tarjan's Home",
+                        help="Node or 'lat,lon' coordinate the tour starts from.")
+    parser.add_argument('--stops', help="Comma-separated nodes to visit (default: all relatives). "
+                                        "Separate with ';' when giving 'lat,lon' coordinates; "
+                                        "a lone coordinate needs no separator.")
+    parser.add_argument('--format', choices=('text', 'json', 'csv'), default='text',
+                        help="Output format.")
+    parser.add_argument('--output', help="Write results to this file instead of stdout.")
+    parser.add_argument('--plot', metavar='PATH', help="Save a plot of the route to PATH (PNG/SVG).")
+    parser.add_argument('--show', action='store_true', help="Show the plot interactively.")
+    parser.add_argument('--plot-corridor', type=float, metavar='MARGIN',
+                        help="Only plot the tour's bounding box, grown by this fraction of its size.")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="Compiled network cache.")
+    parser.add_argument('--distance-cache', metavar='PATH',
+                        help="Keep geodesic distances in this file across runs (.npz).")
+    parser.add_argument('--timings', action='store_true', help="Print stage timings to stderr.")
+    parser.add_argument('--trace', metavar='PATH',
+                        help="Write a trace of every stage: JSON, or Prometheus text for .prom/.txt.")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="Record peak allocations in the trace (slower).")
+    return parser.parse_args(argv)
+
+
+def parse_location(text):
+    """
+    Parses a 'lat,lon' coordinate, leaving node names unchanged.
+
+    Parameters:
+        text (str): A node name or a coordinate.
+
+    Returns:
+        str or list: The node name, or [latitude, longitude].
+    """
+    parts = text.split(',')
+    if len(parts) == 2:
+        try:
+            return [float(parts[0]), float(parts[1])]
+        except ValueError:
+            pass
+    return text
+
+
+def main(argv=None):
     """
     Main function to execute the TarjanPlanner program.
     """
     # Start timing
     start_time = time.perf_counter()
+    args = parse_args(argv)
+    if args.trace:
+        tracing.enable(memory=args.trace_memory)
+    try:
+        return run(args, start_time)
+    finally:
+        # Written on failed runs too, which are the ones worth inspecting
+        if args.trace:
+            tracing.write_trace(args.trace)
+            tracing.disable()
 
-    # Get the optimization criteria from the user
-    criteria = get_optimization_criteria()
-    logger.info(f"Selected optimization criteria: {criteria}")
-
-    # Parse the JSON data
-    data = parse_json('data/routes.json')
 
-    # Build the graph
-    G = build_graph(data, criteria)
+def run(args, start_time):
+    """
+    Plans the tours for parsed arguments and outputs them.
 
-    # Compute all-pairs shortest paths based on chosen criteria
-    all_pairs = compute_all_pairs_shortest_paths(G)
+    Parameters:
+        args (argparse.Namespace): The parsed arguments.
+        start_time (float): perf_counter() value when the program started.
 
-    # Build the distance matrix for TSP solver
-    distance_matrix, index, nodes = create_distance_matrix(G, all_pairs)
+    Returns:
+        int: The exit status.
+    """
+    timings = {'imports': IMPORT_TIME}
 
-    # Solve TSP using python-tsp
-    permutation, total_weight = solve_tsp(distance_matrix)
+    # Get the optimization criteria from the flags, or from the user when interactive
+    if args.criteria is not None:
+        criteria = args.criteria
+    elif sys.stdin.isatty():
+        from modules.interface import get_optimization_criteria
+        criteria = get_optimization_criteria()
+    else:
+        criteria = 'time'
+    logger.info(f"Selected optimization criteria: {criteria}")
+    selected = CRITERIA if criteria == 'all' else (criteria,)
 
-    # Adjust permutation to start at 'Tarjan's Home'
-    optimal_path = adjust_route(permutation, index, nodes)
+    # Load the compiled network (graph and shortest paths from Tarjan's Home
+    # and the relatives), rebuilding it only if the routes file has changed
+    stage_start = time.perf_counter()
+    distance_cache = DistanceCache(path=args.distance_cache) if args.distance_cache else None
+    with tracing.span('load_network', input=args.input):
+        planner = Planner(args.input, cache_dir=args.cache_dir, criteria=selected,
+                          distance_cache=distance_cache)
+    if distance_cache is not None:
+        logger.info(f"Distance cache: {distance_cache.stats()}")
+        if distance_cache.misses:
+            distance_cache.save()
+    timings['load'] = time.perf_counter() - stage_start
 
-    # Log total weight based on criteria
-    log_total_weight(criteria, total_weight)
+    # Solve the TSP over the required stops for each criterion
+    stage_start = time.perf_counter()
+    stops = None
+    if args.stops:
+        stops = parse_location(args.stops)
+        if isinstance(stops, list):
+            # A single 'lat,lon' coordinate, not two node names
+            stops = [stops]
+        else:
+            separator = ';' if ';' in args.stops else ','
+            stops = [parse_location(stop) for stop in args.stops.split(separator)]
+    try:
+        with tracing.span('plan', criteria=criteria):
+            results = [planner.plan(c, stops=stops, start=parse_location(args.start),
+                                    transfer_penalty=args.transfer_penalty)
+                       for c in selected]
+    except PlanningError as e:
+        logger.error(str(e))
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    for snap in results[0]['snapped'] if results else []:
+        logger.info(f"Snapped {snap['location']} to {snap['node']} ({snap['distance_km']:.3f} km away).")
+    for result in results:
+        result['metrics'] = route_metrics(planner.G, result['legs'])
+        # Log total weight based on criteria
+        log_total_weight(result['criteria'], result['total_weight'], result['metrics'],
+                         args.transfer_penalty)
+    timings['plan'] = time.perf_counter() - stage_start
 
     # End timing
     elapsed_time = time.perf_counter() - start_time
-    logger.info(f"Program execution time: {elapsed_time:.4f} seconds")
+    timings['total'] = elapsed_time + IMPORT_TIME
+    logger.info(f"Program execution time: {elapsed_time:.4f} seconds "
+                f"(imports {IMPORT_TIME:.4f} seconds)")
+
+    # Output results in the requested format
+    out = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        if args.format == 'json':
+            out.write(results_to_json(results, timings) + '\n')
+        elif args.format == 'csv':
+            out.write(results_to_csv(results))
+        elif criteria == 'all':
+            output_comparison({r['criteria']: r for r in results},
+                              pareto_front({r['criteria']: r for r in results}), file=out)
+        else:
+            output_results(results[0]['path'], criteria, results[0]['total_weight'],
+                           results[0]['legs'], file=out, metrics=results[0]['metrics'],
+                           transfer_penalty=args.transfer_penalty)
+    finally:
+        if out is not sys.stdout:
+            out.close()
 
-    # Output results to console
-    output_results(optimal_path, criteria, total_weight)
+    if args.timings:
+        print(' '.join(f"{stage}={seconds:.4f}s" for stage, seconds in timings.items()),
+              file=sys.stderr)
 
-    # Plot the graph with the optimal path and criteria
-    plot_graph(G, optimal_path, criteria)
+    # Plot the graph with the optimal path, only when asked for
+    if args.plot or args.show:
+        from modules.graph_utils import plot_graph
+        result = results[0]
+        plot_graph(planner.G, result['path'], result['criteria'], result['legs'],
+                   output=args.plot, show=args.show, corridor=args.plot_corridor)
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
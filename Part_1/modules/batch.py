@@ -0,0 +1,137 @@
+# batch.py
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import numpy as np
+from .optimizer import solve_tsp, adjust_route
+from .transfers import MODE_CHANGES, transfer_paths
+from .logger_config import logger
+
+_shared = {}
+
+
+def normalize_job(job):
+    """
+    Converts a job given as a tuple or dict into a dict.
+
+    Parameters:
+        job (tuple or dict): (start, stops, criteria) or a dict with those keys.
+
+    Returns:
+        dict: Job with 'start', 'stops' and 'criteria'.
+    """
+    if isinstance(job, dict):
+        return {'start': job.get('start', "Tarjan's Home"), 'stops': list(job['stops']),
+                'criteria': job.get('criteria', 'time')}
+    start, stops, criteria = job
+    return {'start': start, 'stops': list(stops), 'criteria': criteria}
+
+
+def _attach(name, shape, criteria, nodes):
+    """Pool initializer: maps the shared distance matrices into a worker process."""
+    block = shared_memory.SharedMemory(name=name)
+    _shared['block'] = block
+    _shared['matrices'] = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+    _shared['criteria'] = {c: i for i, c in enumerate(criteria)}
+    _shared['index'] = {node: i for i, node in enumerate(nodes)}
+
+
+def _solve_job(job_id, job, solver_options):
+    """Slices a job's submatrix from the shared matrices and solves its tour."""
+    start_time = time.perf_counter()
+    terminals = [job['start']] + [node for node in dict.fromkeys(job['stops'])
+                                  if node != job['start']]
+    rows = np.array([_shared['index'][node] for node in terminals], dtype=np.intp)
+    matrix = _shared['matrices'][_shared['criteria'][job['criteria']]]
+    distance_matrix = matrix[np.ix_(rows, rows)]
+    permutation, total_weight, report = solve_tsp(distance_matrix, return_report=True,
+                                                  **solver_options)
+    index = {node: i for i, node in enumerate(terminals)}
+    optimal_path = adjust_route(permutation, index, terminals, start=job['start'])
+    return {
+        'job': job_id,
+        'start': job['start'],
+        'criteria': job['criteria'],
+        'path': optimal_path,
+        'total_weight': total_weight,
+        'report': report,
+        'solve_time': time.perf_counter() - start_time,
+    }
+
+
+def fill_distance_matrices(planner, criteria, nodes, out):
+    """
+    Fills the distance matrices between every node any job uses.
+
+    Parameters:
+        planner (Planner): The resident planner holding the network.
+        criteria (list): Criteria used by the jobs.
+        nodes (list): Nodes used by the jobs.
+        out (numpy.ndarray): Array of shape (criteria, nodes, nodes) to write into.
+    """
+    missing = [node for node in nodes if node not in planner.index]
+    if missing:
+        raise KeyError(f"Unknown nodes in batch: {missing}")
+    columns = np.array([planner.index[node] for node in nodes], dtype=np.intp)
+    for c, name in enumerate(criteria):
+        if name == MODE_CHANGES:
+            out[c] = transfer_paths(planner.G, nodes).matrix[:, columns]
+            continue
+        for r, node in enumerate(nodes):
+            out[c, r] = planner.shortest_path_tree(name, node)[0][columns]
+
+
+def plan_many(planner, jobs, workers=None, **solver_options):
+    """
+    Plans many tours against one network, streaming results as jobs finish.
+
+    The distance matrices between all nodes used by any job are computed
+    once, placed in shared memory and mapped read-only by every worker,
+    which slices out the submatrix of each job it solves.
+
+    Parameters:
+        planner (Planner): The resident planner holding the network.
+        jobs (list): (start, stops, criteria) tuples or dicts with those keys.
+        workers (int, optional): Number of worker processes; defaults to the CPU count.
+        **solver_options: Extra keyword arguments passed to `solve_tsp`.
+
+    Yields:
+        dict: Per-job result with 'job' (its position in `jobs`), 'path',
+            'total_weight', 'report', 'solve_time' (inside the worker) and
+            'latency' (from submission to completion).
+    """
+    jobs = [normalize_job(job) for job in jobs]
+    if not jobs:
+        return
+    batch_start = time.perf_counter()
+    criteria = sorted({job['criteria'] for job in jobs})
+    nodes = list(dict.fromkeys(node for job in jobs for node in [job['start']] + job['stops']))
+    shape = (len(criteria), len(nodes), len(nodes))
+
+    block = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 8)
+    pool = None
+    shared = None
+    try:
+        shared = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+        fill_distance_matrices(planner, criteria, nodes, shared)
+        shared = None
+        logger.info(f"Prepared {shape} shared distance matrices for {len(jobs)} jobs in "
+                    f"{time.perf_counter() - batch_start:.4f} seconds.")
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                   initargs=(block.name, shape, criteria, nodes))
+        submitted = {}
+        for job_id, job in enumerate(jobs):
+            future = pool.submit(_solve_job, job_id, job, solver_options)
+            submitted[future] = time.perf_counter()
+        for future in as_completed(submitted):
+            result = future.result()
+            result['latency'] = time.perf_counter() - submitted[future]
+            yield result
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        # The view must be released before the block can be closed
+        shared = None
+        block.close()
+        block.unlink()
+    logger.info(f"Planned {len(jobs)} itineraries in {time.perf_counter() - batch_start:.4f} seconds.")
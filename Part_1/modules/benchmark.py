@@ -0,0 +1,247 @@
+# benchmark.py
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+import numpy as np
+from .data_loader import parse_json
+from .graph_utils import (
+    build_graph, build_network, find_terminals, compute_all_pairs_shortest_paths,
+    create_distance_matrix
+)
+from .optimizer import solve_tsp, adjust_route
+from .synthetic import DEFAULT_MODE_MIX, generate_routes, write_routes
+from .transfers import transfer_paths
+from .logger_config import logger
+
+RESULTS_VERSION = 1
+
+STAGES = ('parse_json', 'build_network', 'build_graph', 'compute_all_pairs_shortest_paths',
+          'transfer_paths', 'create_distance_matrix', 'solve_tsp', 'adjust_route')
+
+# Relative slowdown above which `compare_results` flags a stage
+REGRESSION_THRESHOLD = 0.10
+
+# Slowdowns smaller than this many seconds are timer noise, whatever the ratio
+REGRESSION_FLOOR = 0.001
+
+
+def measure(func, *args, repeat=3, **kwargs):
+    """
+    Times a function and measures its peak memory.
+
+    The function runs `repeat` times untraced for the wall times, then once
+    more under tracemalloc for the peak, since tracing slows Python code down.
+
+    Parameters:
+        func (callable): The function to measure.
+        *args: Positional arguments for `func`.
+        repeat (int): Number of timed runs.
+        **kwargs: Keyword arguments for `func`.
+
+    Returns:
+        tuple: The function's result, dict with 'wall_min', 'wall_median' and 'peak_bytes'.
+    """
+    times = []
+    for _ in range(max(repeat, 1)):
+        start_time = time.perf_counter()
+        result = func(*args, **kwargs)
+        times.append(time.perf_counter() - start_time)
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, {'wall_min': min(times), 'wall_median': statistics.median(times),
+                    'peak_bytes': peak}
+
+
+def run_case(n_nodes, degree=4.0, stops=10, mode_mix=None, seed=0, criteria='time',
+             repeat=3, time_budget=1.0, workdir=None):
+    """
+    Benchmarks every stage of the planning pipeline on one synthetic network.
+
+    Parameters:
+        n_nodes (int): Number of nodes in the network.
+        degree (float): Average number of routes per node.
+        stops (int): Number of relatives the tour must visit.
+        mode_mix (dict, optional): Travel mode -> share of routes.
+        seed (int): Random seed for the network.
+        criteria (str): Optimization criteria.
+        repeat (int): Timed runs per stage.
+        time_budget (float): Seconds for the heuristic TSP solver.
+        workdir (str, optional): Directory for the generated routes file.
+
+    Returns:
+        dict: The case parameters and per-stage measurements.
+    """
+    mode_mix = DEFAULT_MODE_MIX if mode_mix is None else mode_mix
+    routes = generate_routes(n_nodes, degree, stops, mode_mix, seed)
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        filename = os.path.join(tmp, 'routes.json')
+        write_routes(routes, filename)
+        stages = {}
+        data, stages['parse_json'] = measure(parse_json, filename, repeat=repeat)
+    network, stages['build_network'] = measure(build_network, data, criteria, repeat=repeat)
+    # The networkx export is measured on its own; the compute path runs on the network
+    _, stages['build_graph'] = measure(build_graph, data, criteria, repeat=repeat)
+    terminals = find_terminals(network)
+    all_pairs, stages['compute_all_pairs_shortest_paths'] = measure(
+        compute_all_pairs_shortest_paths, network, terminals=terminals, repeat=repeat)
+    # The mode-aware search over (stop, mode) states, used by the mode_changes criterion
+    _, stages['transfer_paths'] = measure(transfer_paths, network, terminals, repeat=repeat)
+    (distance_matrix, index, nodes), stages['create_distance_matrix'] = measure(
+        create_distance_matrix, network, all_pairs, terminals, repeat=repeat)
+    (permutation, total_weight), stages['solve_tsp'] = measure(
+        solve_tsp, distance_matrix, time_budget=time_budget, repeat=repeat)
+    _, stages['adjust_route'] = measure(adjust_route, permutation, index, nodes, repeat=repeat)
+    return {
+        'nodes': n_nodes,
+        'edges': network.number_of_edges(),
+        'degree': degree,
+        'stops': stops,
+        'mode_mix': mode_mix,
+        'seed': seed,
+        'criteria': criteria,
+        'total_weight': total_weight,
+        'stages': stages,
+    }
+
+
+def git_revision():
+    """Returns the current git commit, or None outside a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes, **case_options):
+    """
+    Benchmarks the pipeline at several network sizes.
+
+    Parameters:
+        sizes (list): Node counts to benchmark.
+        **case_options: Keyword arguments passed to `run_case`.
+
+    Returns:
+        dict: Results document with the environment and one entry per case.
+    """
+    # Logging to the log file would otherwise be timed with every stage
+    level = logger.getEffectiveLevel()
+    logger.setLevel(logging.WARNING)
+    try:
+        cases = [run_case(n, **case_options) for n in sizes]
+    finally:
+        logger.setLevel(level)
+    return {
+        'version': RESULTS_VERSION,
+        'revision': git_revision(),
+        'created': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cases': cases,
+    }
+
+
+def compare_results(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """
+    Compares two results documents stage by stage.
+
+    Cases are matched on their network parameters; the minimum wall time is
+    compared since it is the least noisy.
+
+    Parameters:
+        baseline (dict): Results from the reference revision.
+        current (dict): Results from the revision under test.
+        threshold (float): Relative slowdown reported as a regression, if it
+            also exceeds REGRESSION_FLOOR seconds.
+
+    Returns:
+        list: Dicts with 'nodes', 'stage', 'baseline', 'current', 'ratio' and 'regression'.
+    """
+    def key(case):
+        return (case['nodes'], case['degree'], case['stops'], case['seed'], case['criteria'])
+
+    reference = {key(case): case for case in baseline['cases']}
+    rows = []
+    for case in current['cases']:
+        base = reference.get(key(case))
+        if base is None:
+            continue
+        for stage in STAGES:
+            if stage not in case['stages'] or stage not in base['stages']:
+                continue
+            before = base['stages'][stage]['wall_min']
+            after = case['stages'][stage]['wall_min']
+            ratio = after / before if before > 0 else float('inf')
+            regression = ratio > 1 + threshold and after - before > REGRESSION_FLOOR
+            rows.append({'nodes': case['nodes'], 'stage': stage, 'baseline': before,
+                         'current': after, 'ratio': ratio, 'regression': regression})
+    return rows
+
+
+def parse_mode_mix(text):
+    """Parses 'bus=0.3,bicycle=0.4,walking=0.3' into a dict."""
+    mix = {}
+    for item in text.split(','):
+        mode, _, share = item.partition('=')
+        mix[mode.strip()] = float(share)
+    return mix
+
+
+def main(argv=None):
+    """
+    Runs the benchmark suite and writes the results as JSON.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the TarjanPlanner pipeline.")
+    parser.add_argument('--sizes', default='50,200,1000', help="Comma-separated node counts.")
+    parser.add_argument('--degree', type=float, default=4.0, help="Average routes per node.")
+    parser.add_argument('--stops', type=int, default=10, help="Relatives the tour must visit.")
+    parser.add_argument('--modes', type=parse_mode_mix, help="Mode mix, e.g. bus=0.3,walking=0.7.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--criteria', choices=('time', 'cost', 'transfers'), default='time')
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per stage.")
+    parser.add_argument('--time-budget', type=float, default=1.0, help="Heuristic solver budget.")
+    parser.add_argument('--output', default='benchmark_results.json', help="Results file.")
+    parser.add_argument('--compare', metavar='BASELINE', help="Results file to compare against.")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    results = run_benchmarks(sizes, degree=args.degree, stops=args.stops, mode_mix=args.modes,
+                             seed=args.seed, criteria=args.criteria, repeat=args.repeat,
+                             time_budget=args.time_budget)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{'Nodes':>7} {'Stage':<34}{'Wall (ms)':>11}{'Peak (KiB)':>12}")
+    for case in results['cases']:
+        for stage, measured in case['stages'].items():
+            print(f"{case['nodes']:>7} {stage:<34}{measured['wall_min'] * 1000:>11.2f}"
+                  f"{measured['peak_bytes'] / 1024:>12.1f}")
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows = compare_results(baseline, results)
+        for row in rows:
+            flag = '  REGRESSION' if row['regression'] else ''
+            print(f"{row['nodes']:>7} {row['stage']:<34}{row['ratio']:>8.2f}x{flag}")
+        return 1 if any(row['regression'] for row in rows) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,7 +1,39 @@
 # data_loader.py
 import json
+import numbers
+import sys
 from .logger_config import logger
 
+# Required route fields and the types their values must have
+ROUTE_SCHEMA = {
+    'position_1': str,
+    'position_2': str,
+    'position1_coordinates': list,
+    'position2_coordinates': list,
+    'travel_mode': str,
+    'travel_speed': numbers.Real,
+    'cost_per_km': numbers.Real,
+}
+
+
+# Longest single route record the streaming loader buffers before giving up
+MAX_RECORD_CHARS = 1 << 24
+
+
+class RouteSchemaError(ValueError):
+    """Exception raised when a routes file is malformed or a route breaks the schema."""
+
+    def __init__(self, message, filename=None, record=None, lineno=None, colno=None):
+        location = ':'.join(str(part) for part in (filename, lineno, colno) if part is not None)
+        prefix = f"{location}: " if location else ''
+        if record is not None:
+            prefix += f"route #{record}: "
+        super().__init__(prefix + message)
+        self.filename = filename
+        self.record = record
+        self.lineno = lineno
+        self.colno = colno
+
 def parse_json(filename):
     """
     Parses the JSON file and returns the data.
@@ -23,3 +55,156 @@ def parse_json(filename):
     except json.JSONDecodeError:
         logger.error(f"Error decoding JSON from file {filename}.")
         raise
+
+
+def validate_route(route):
+    """
+    Checks a route record against the route schema.
+    
+    Parameters:
+        route (dict): A single route record.
+        
+    Returns:
+        str or None: Description of the first problem found, or None if the route is valid.
+    """
+    if not isinstance(route, dict):
+        return f"expected an object, got {type(route).__name__}"
+    for field, expected in ROUTE_SCHEMA.items():
+        if field not in route:
+            return f"missing field '{field}'"
+        value = route[field]
+        if not isinstance(value, expected) or isinstance(value, bool):
+            return f"field '{field}' has invalid value {value!r}"
+    for field in ('position1_coordinates', 'position2_coordinates'):
+        coords = route[field]
+        if len(coords) != 2 or not all(isinstance(c, numbers.Real) and not isinstance(c, bool)
+                                       for c in coords):
+            return f"field '{field}' must be a [latitude, longitude] pair"
+    if route['travel_speed'] <= 0:
+        return f"field 'travel_speed' must be positive, got {route['travel_speed']!r}"
+    return None
+
+
+def iter_routes(filename, chunk_size=1 << 16):
+    """
+    Streams route records from a JSON array file, validating each one.
+    
+    The file is decoded one record at a time, so memory use does not grow
+    with the file size. Node names, street names and coordinates are
+    interned, so every stop is stored once however many routes use it.
+    
+    Parameters:
+        filename (str): The path to the JSON file.
+        chunk_size (int): Number of characters read at a time.
+        
+    Yields:
+        dict: One validated route record, with coordinates as tuples.
+        
+    Raises:
+        FileNotFoundError: If the file does not exist.
+        RouteSchemaError: If the file is not a JSON array of valid routes,
+            with the file, line and column of the problem.
+    """
+    decoder = json.JSONDecoder()
+    coordinates = {}
+    buffer = ''
+    pos = 0
+    consumed_lines = 0  # newlines in text already dropped from the buffer
+    consumed_line_start = 0  # chars after the last dropped newline
+    eof = False
+    record = 0
+
+    def location(offset):
+        text = buffer[:offset]
+        newlines = text.count('\n')
+        if newlines:
+            column = offset - text.rfind('\n')
+        else:
+            column = consumed_line_start + offset + 1
+        return consumed_lines + newlines + 1, column
+
+    def fill():
+        nonlocal buffer, pos, eof, consumed_lines, consumed_line_start
+        dropped = buffer[:pos]
+        newlines = dropped.count('\n')
+        if newlines:
+            consumed_lines += newlines
+            consumed_line_start = len(dropped) - dropped.rfind('\n') - 1
+        else:
+            consumed_line_start += len(dropped)
+        chunk = f.read(chunk_size)
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        eof = not chunk
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    def fail(message, offset=None):
+        lineno, colno = location(pos if offset is None else offset)
+        logger.error(f"Invalid routes file {filename} at line {lineno}, column {colno}: {message}")
+        return RouteSchemaError(message, filename, record, lineno, colno)
+
+    def check_end():
+        # Like json.load, allow only whitespace after the closing ']'
+        nonlocal pos
+        pos += 1
+        skip_whitespace()
+        if pos < len(buffer):
+            raise fail("unexpected data after the routes array")
+
+    try:
+        f = open(filename, 'r')
+    except FileNotFoundError:
+        logger.error(f"File {filename} not found.")
+        raise
+    with f:
+        skip_whitespace()
+        if pos >= len(buffer) or buffer[pos] != '[':
+            raise fail("expected '[' at the start of the routes array")
+        pos += 1
+        skip_whitespace()
+        if pos < len(buffer) and buffer[pos] == ']':
+            check_end()
+            return
+        while True:
+            skip_whitespace()
+            while True:
+                try:
+                    route, end = decoder.raw_decode(buffer, pos)
+                    break
+                except json.JSONDecodeError as e:
+                    # The record may just be cut off at the end of the buffer
+                    if eof or len(buffer) - pos > MAX_RECORD_CHARS:
+                        raise fail(e.msg, e.pos) from None
+                    fill()
+                    skip_whitespace()
+            problem = validate_route(route)
+            if problem is not None:
+                raise fail(problem)
+            for key in ('position_1', 'position_2', 'travel_mode',
+                        'position1_streetName', 'position2_streetName', 'routeName'):
+                if isinstance(route.get(key), str):
+                    route[key] = sys.intern(route[key])
+            for key in ('position1_coordinates', 'position2_coordinates'):
+                coord = tuple(route[key])
+                route[key] = coordinates.setdefault(coord, coord)
+            yield {sys.intern(key): value for key, value in route.items()}
+            record += 1
+            pos = end
+            skip_whitespace()
+            if pos >= len(buffer):
+                raise fail("unexpected end of file, expected ',' or ']'")
+            if buffer[pos] == ']':
+                check_end()
+                break
+            if buffer[pos] != ',':
+                raise fail("expected ',' or ']' after a route")
+            pos += 1
+    logger.info(f"Streamed {record} routes from {filename}.")
@@ -0,0 +1,194 @@
+# distance_cache.py
+import os
+import tempfile
+from collections import OrderedDict
+import numpy as np
+from .geodesy import batch_distance, canonical_pairs
+from . import tracing
+from .logger_config import logger
+
+# Coordinate pairs kept by default; about 100 bytes each
+DEFAULT_CACHE_SIZE = 1 << 20
+
+
+def unique_pairs(pairs):
+    """
+    Finds the distinct rows of a pair array.
+
+    A lexsort over the four columns, which is much faster than
+    `np.unique(axis=0)` on float rows.
+
+    Parameters:
+        pairs (numpy.ndarray): Array of shape (m, 4).
+
+    Returns:
+        tuple: Distinct rows (numpy.ndarray), index of each input row's distinct row.
+    """
+    order = np.lexsort(pairs.T[::-1])
+    ordered = pairs[order]
+    starts = np.empty(len(pairs), dtype=bool)
+    starts[:1] = True
+    np.any(ordered[1:] != ordered[:-1], axis=1, out=starts[1:])
+    inverse = np.empty(len(pairs), dtype=np.intp)
+    inverse[order] = np.cumsum(starts) - 1
+    return ordered[starts], inverse
+
+
+class DistanceCache:
+    """
+    Bounded LRU cache of geodesic distances keyed by canonical coordinate pairs.
+
+    `batch_distance` evaluates every pair in its canonical orientation, so
+    cached and uncached results are bit-for-bit identical.
+
+    Attributes:
+        maxsize (int): Largest number of pairs kept.
+        path (str): File the cache is loaded from and saved to, if any.
+        hits, misses, evictions (int): Lookup statistics since creation or `clear`.
+    """
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE, path=None):
+        self.maxsize = maxsize
+        self.path = path
+        self._entries = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """
+        Returns the cache statistics.
+
+        Returns:
+            dict: 'hits', 'misses', 'evictions', 'size', 'maxsize' and 'hit_rate'.
+        """
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'size': len(self._entries), 'maxsize': self.maxsize,
+                'hit_rate': self.hits / lookups if lookups else 0.0}
+
+    def clear(self):
+        """Drops all entries and resets the statistics."""
+        self._entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def distances(self, coords1, coords2, method='ellipsoidal'):
+        """
+        Returns distances for aligned coordinate pairs, computing only unseen pairs.
+
+        Repeated and reversed pairs within the batch are computed once and
+        counted as hits after the first.
+
+        Parameters:
+            coords1, coords2 (numpy.ndarray): Arrays of shape (m, 2) with the endpoints.
+            method (str): Distance model passed to `batch_distance`.
+
+        Returns:
+            numpy.ndarray: Distances in kilometers.
+        """
+        pairs = canonical_pairs(coords1, coords2)
+        if len(pairs) == 0:
+            return np.empty(0)
+        unique, inverse = unique_pairs(pairs)
+        values = np.empty(len(unique))
+        entries = self._entries
+        if self.maxsize > 0 or entries:
+            keys = [(method,) + key for key in map(tuple, unique.tolist())]
+            missing = []
+            for i, key in enumerate(keys):
+                value = entries.get(key)
+                if value is None:
+                    missing.append(i)
+                else:
+                    entries.move_to_end(key)
+                    values[i] = value
+        else:
+            missing = range(len(unique))
+        if len(missing):
+            missing = np.array(missing, dtype=np.intp)
+            computed = batch_distance(unique[missing, :2], unique[missing, 2:], method=method)
+            values[missing] = computed
+            if self.maxsize > 0:
+                for i, value in zip(missing.tolist(), computed.tolist()):
+                    entries[keys[i]] = value
+            while len(entries) > self.maxsize:
+                entries.popitem(last=False)
+                self.evictions += 1
+        self.misses += len(missing)
+        self.hits += len(pairs) - len(missing)
+        tracing.count('distance_cache_hits', len(pairs) - len(missing))
+        tracing.count('distance_cache_misses', len(missing))
+        return values[inverse]
+
+    def save(self, path=None):
+        """
+        Writes the cache atomically to a .npz file.
+
+        Parameters:
+            path (str, optional): Destination; defaults to the path the cache was created with.
+        """
+        path = path or self.path
+        if path is None:
+            raise ValueError("No path given to save the distance cache to.")
+        methods = sorted({key[0] for key in self._entries})
+        codes = {method: i for i, method in enumerate(methods)}
+        keys = np.array([key[1:] for key in self._entries], dtype=np.float64).reshape(-1, 4)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.npz')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, keys=keys,
+                         values=np.fromiter(self._entries.values(), dtype=np.float64,
+                                            count=len(self._entries)),
+                         methods=np.array(methods, dtype=str),
+                         method_codes=np.array([codes[key[0]] for key in self._entries],
+                                               dtype=np.int16))
+            os.replace(tmp, path)
+        except Exception:
+            os.remove(tmp)
+            raise
+        logger.info(f"Saved {len(self._entries)} cached distances to {path}.")
+
+    def load(self, path):
+        """
+        Adds the entries of a saved cache, keeping the most recently used ones if it is too large.
+
+        Parameters:
+            path (str): The .npz file written by `save`.
+        """
+        try:
+            with np.load(path) as saved:
+                keys = saved['keys'].tolist()
+                values = saved['values'].tolist()
+                methods = saved['methods'].tolist()
+                codes = saved['method_codes'].tolist()
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not load distance cache from {path}: {e}")
+            return
+        start = max(len(keys) - self.maxsize, 0)
+        for key, value, code in zip(keys[start:], values[start:], codes[start:]):
+            self._entries[(methods[code],) + tuple(key)] = value
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        logger.info(f"Loaded {len(keys) - start} cached distances from {path}.")
+
+
+def pair_distances(coords1, coords2, method='ellipsoidal', cache=None):
+    """
+    Computes route distances, through the cache when one is given.
+
+    Parameters:
+        coords1, coords2 (numpy.ndarray): Arrays of shape (m, 2) with the endpoints.
+        method (str): Distance model passed to `batch_distance`.
+        cache (DistanceCache, optional): Cache consulted and filled.
+
+    Returns:
+        numpy.ndarray: Distances in kilometers.
+    """
+    if cache is None:
+        return batch_distance(coords1, coords2, method=method)
+    return cache.distances(coords1, coords2, method)
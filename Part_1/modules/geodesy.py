@@ -0,0 +1,157 @@
+# geodesy.py
+import numpy as np
+from . import tracing
+
+# WGS-84 ellipsoid, the same model geopy.distance.geodesic uses by default
+WGS84_A = 6378.137  # semi-major axis in kilometers
+WGS84_F = 1 / 298.257223563
+WGS84_B = (1 - WGS84_F) * WGS84_A
+
+# Mean Earth radius in kilometers used by the spherical approximation
+EARTH_RADIUS_KM = 6371.0088
+
+DISTANCE_METHODS = ('ellipsoidal', 'haversine', 'geopy')
+
+
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """
+    Computes great-circle distances on a sphere for arrays of coordinate pairs.
+
+    Fast, but up to about 0.5% off the ellipsoidal distance.
+
+    Parameters:
+        lat1, lon1, lat2, lon2 (numpy.ndarray): Coordinates in degrees.
+
+    Returns:
+        numpy.ndarray: Distances in kilometers.
+    """
+    phi1, lam1, phi2, lam2 = (np.radians(np.asarray(x, dtype=float)) for x in (lat1, lon1, lat2, lon2))
+    h = (np.sin((phi2 - phi1) / 2) ** 2
+         + np.cos(phi1) * np.cos(phi2) * np.sin((lam2 - lam1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+
+def ellipsoidal_distance(lat1, lon1, lat2, lon2, tolerance=1e-12, max_iterations=200):
+    """
+    Computes distances on the WGS-84 ellipsoid for arrays of coordinate pairs.
+
+    Uses Vincenty's inverse formula iterated on all pairs at once. Its error
+    against the exact geodesic is below 0.5 mm. The few nearly antipodal
+    pairs where the iteration does not converge are computed with geopy.
+
+    Parameters:
+        lat1, lon1, lat2, lon2 (numpy.ndarray): Coordinates in degrees.
+        tolerance (float): Convergence threshold on the longitude on the auxiliary sphere.
+        max_iterations (int): Iteration limit before falling back to geopy.
+
+    Returns:
+        numpy.ndarray: Distances in kilometers.
+    """
+    lat1, lon1, lat2, lon2 = (np.asarray(x, dtype=float) for x in (lat1, lon1, lat2, lon2))
+    f = WGS84_F
+    L = np.radians(lon2 - lon1)
+    U1 = np.arctan((1 - f) * np.tan(np.radians(lat1)))
+    U2 = np.arctan((1 - f) * np.tan(np.radians(lat2)))
+    sinU1, cosU1 = np.sin(U1), np.cos(U1)
+    sinU2, cosU2 = np.sin(U2), np.cos(U2)
+
+    lam = L.copy()
+    converged = np.zeros(L.shape, dtype=bool)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for _ in range(max_iterations):
+            sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+            sin_sigma = np.hypot(cosU2 * sin_lam, cosU1 * sinU2 - sinU1 * cosU2 * cos_lam)
+            cos_sigma = sinU1 * sinU2 + cosU1 * cosU2 * cos_lam
+            sigma = np.arctan2(sin_sigma, cos_sigma)
+            sin_alpha = np.where(sin_sigma == 0, 0.0, cosU1 * cosU2 * sin_lam / sin_sigma)
+            cos2_alpha = 1 - sin_alpha ** 2
+            # Equatorial lines have cos2_alpha == 0
+            cos_2sigma_m = np.where(cos2_alpha == 0, 0.0,
+                                    cos_sigma - 2 * sinU1 * sinU2 / cos2_alpha)
+            C = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+            lam_prev = lam
+            lam = L + (1 - C) * f * sin_alpha * (
+                sigma + C * sin_sigma * (cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)))
+            converged = np.abs(lam - lam_prev) <= tolerance
+            if converged.all():
+                break
+
+        u2 = cos2_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+        A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+        B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+        delta_sigma = B * sin_sigma * (cos_2sigma_m + B / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+            - B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)))
+        distance = WGS84_B * A * (sigma - delta_sigma)
+
+    distance = np.where(sin_sigma == 0, 0.0, distance)
+    failed = ~converged | ~np.isfinite(distance)
+    if failed.any():
+        distance[failed] = geopy_distance(lat1[failed], lon1[failed], lat2[failed], lon2[failed])
+    return distance
+
+
+def geopy_distance(lat1, lon1, lat2, lon2):
+    """
+    Computes geodesic distances one pair at a time with geopy.
+
+    This is the reference implementation the vectorized methods are checked against.
+
+    Parameters:
+        lat1, lon1, lat2, lon2 (numpy.ndarray): Coordinates in degrees.
+
+    Returns:
+        numpy.ndarray: Distances in kilometers.
+    """
+    from geopy.distance import geodesic
+    return np.array([geodesic((a, b), (c, d)).kilometers
+                     for a, b, c, d in zip(lat1, lon1, lat2, lon2)], dtype=float)
+
+
+def canonical_pairs(coords1, coords2):
+    """
+    Orders each coordinate pair so that a route and its reverse are evaluated alike.
+
+    Parameters:
+        coords1, coords2 (numpy.ndarray): Arrays of shape (m, 2) with the endpoints.
+
+    Returns:
+        numpy.ndarray: Array of shape (m, 4) with the lexicographically smaller
+            endpoint first.
+    """
+    coords1 = np.asarray(coords1, dtype=float).reshape(-1, 2)
+    coords2 = np.asarray(coords2, dtype=float).reshape(-1, 2)
+    swap = (coords2[:, 0] < coords1[:, 0]) | \
+        ((coords2[:, 0] == coords1[:, 0]) & (coords2[:, 1] < coords1[:, 1]))
+    first = np.where(swap[:, None], coords2, coords1)
+    second = np.where(swap[:, None], coords1, coords2)
+    return np.hstack([first, second])
+
+
+@tracing.traced()
+def batch_distance(coords1, coords2, method='ellipsoidal'):
+    """
+    Computes distances between two aligned arrays of (latitude, longitude) pairs.
+
+    Each pair is evaluated in its canonical orientation, so a route and its
+    reverse get bit-for-bit identical distances.
+
+    Parameters:
+        coords1 (numpy.ndarray): Array of shape (m, 2) with the first endpoints.
+        coords2 (numpy.ndarray): Array of shape (m, 2) with the second endpoints.
+        method (str): Distance model ('ellipsoidal', 'haversine', 'geopy').
+
+    Returns:
+        numpy.ndarray: Distances in kilometers.
+    """
+    pairs = canonical_pairs(coords1, coords2)
+    tracing.count('geodesic_distances', len(pairs))
+    if method == 'ellipsoidal':
+        func = ellipsoidal_distance
+    elif method == 'haversine':
+        func = haversine_distance
+    elif method == 'geopy':
+        func = geopy_distance
+    else:
+        raise ValueError(f"Unknown distance method: {method}")
+    return func(pairs[:, 0], pairs[:, 1], pairs[:, 2], pairs[:, 3])
@@ -1,91 +1,242 @@
 # graph_utils.py
-import networkx as nx
-import matplotlib.pyplot as plt
-from geopy.distance import geodesic
+import logging
+from .distance_cache import pair_distances
+from .network import Network, encode_modes
+from .shortest_paths import ShortestPaths, shortest_paths
+from . import tracing
 from .logger_config import logger
 import numpy as np
 
+# Node count above which only the tour's stops are labelled
+LABEL_LIMIT = 200
 
-def build_graph(data, criteria):
+# Element count above which a plot layer is rasterized
+RASTERIZE_ABOVE = 5000
+
+
+@tracing.traced()
+def build_network(data, criteria='time', distance_method='ellipsoidal', distance_cache=None):
+    """
+    Builds the compact array-backed transport network from route data.
+    
+    Distances, travel times and costs are computed for all routes in one
+    vectorized pass, once per distinct pair of coordinates; a route and its
+    reverse share the same distance. As with a networkx graph, a node keeps the position of
+    its first appearance and the coordinates of its last, and a repeated
+    route keeps its first position and the attributes of its last record.
+    
+    Parameters:
+        data (iterable): List of route information, or a stream from `iter_routes`.
+        criteria (str): Optimization criteria the edge 'weight' refers to.
+        distance_method (str): Distance model ('ellipsoidal', 'haversine', 'geopy').
+            'ellipsoidal' is within 0.5 mm of the geopy geodesic, 'haversine' is
+            a faster spherical approximation and 'geopy' calls geopy per route.
+        distance_cache (DistanceCache, optional): Cache of distances from earlier builds.
+        
+    Returns:
+        Network: The constructed transport network.
+    """
+    logger.info("Building the network.")
+    index = {}
+    ends, coords, speeds, costs_per_km, modes = [], [], [], [], []
+    for route in data:
+        for name, coordinates in ((route['position_1'], route['position1_coordinates']),
+                                  (route['position_2'], route['position2_coordinates'])):
+            ends.append(index.setdefault(name, len(index)))
+            coords.append(coordinates)
+        speeds.append(route['travel_speed'])
+        costs_per_km.append(route['cost_per_km'])
+        modes.append(route['travel_mode'])
+    n = len(index)
+    ends = np.array(ends, dtype=np.int64).reshape(-1, 2)
+    coords = np.array(coords, dtype=float).reshape(-1, 2, 2)
+
+    # Calculate distance, time and cost for all routes at once
+    distances = pair_distances(coords[:, 0], coords[:, 1], method=distance_method,
+                               cache=distance_cache)
+    times = distances / np.array(speeds, dtype=float)
+    costs = distances * np.array(costs_per_km, dtype=float)
+
+    # Each node takes the coordinates of its last appearance
+    flat_ends = ends.ravel()
+    _, last_from_end = np.unique(flat_ends[::-1], return_index=True)
+    coordinates = coords.reshape(-1, 2)[len(flat_ends) - 1 - last_from_end]
+
+    # Repeated routes between the same two nodes collapse into one edge
+    pair_keys = ends.min(axis=1) * n + ends.max(axis=1)
+    _, first = np.unique(pair_keys, return_index=True)
+    _, last_from_end = np.unique(pair_keys[::-1], return_index=True)
+    order = np.argsort(first, kind='stable')
+    first = first[order]
+    last = (len(pair_keys) - 1 - last_from_end)[order]
+
+    mode_codes, mode_names = encode_modes(modes)
+    network = Network(list(index), coordinates, ends[first, 0], ends[first, 1],
+                      {'time': times[last], 'cost': costs[last], 'distance': distances[last]},
+                      mode_codes[last], mode_names, criteria=criteria)
+    tracing.count('edges_built', len(distances))
+    tracing.gauge('graph_nodes', network.number_of_nodes())
+    tracing.gauge('graph_edges', network.number_of_edges())
+    logger.info(f"Network construction completed ({network.number_of_nodes()} nodes, "
+                f"{network.number_of_edges()} edges, {network.nbytes} bytes).")
+    return network
+
+
+@tracing.traced()
+def build_graph(data, criteria, distance_method='ellipsoidal', distance_cache=None):
     """
     Builds the transport network graph based on the provided data and optimization criteria.
     
+    The network is built with `build_network` and exported to networkx;
+    use `build_network` directly on the compute path.
+    
     Parameters:
-        data (list): List of route information.
+        data (iterable): List of route information, or a stream from `iter_routes`.
         criteria (str): Optimization criteria ('time', 'cost', 'transfers').
+        distance_method (str): Distance model ('ellipsoidal', 'haversine', 'geopy').
+        distance_cache (DistanceCache, optional): Cache of distances from earlier builds.
         
     Returns:
         networkx.Graph: The constructed transport network graph.
     """
-    G = nx.Graph()
-    logger.info("Building the graph.")
-    for route in data:
-        pos1 = route['position_1']
-        pos2 = route['position_2']
-        coord1 = tuple(route['position1_coordinates'])
-        coord2 = tuple(route['position2_coordinates'])
-        travel_speed = route['travel_speed']
-        cost_per_km = route['cost_per_km']
-        travel_mode = route['travel_mode']
-
-        # Calculate distance using geopy
-        distance = geodesic(coord1, coord2).kilometers
-        # Calculate time and cost
-        time = distance / travel_speed
-        cost = distance * cost_per_km
-
-        # Determine the edge weight based on criteria
-        if criteria == 'time':
-            weight = time
-        elif criteria == 'cost':
-            weight = cost
-        elif criteria == 'transfers':
-            # For transfers, assign a weight of 1 per edge
-            weight = 1
-        else:
-            weight = time  # default to time
-
-        # Add nodes and edge to the graph
-        G.add_node(pos1, coordinates=coord1)
-        G.add_node(pos2, coordinates=coord2)
-        G.add_edge(pos1, pos2, weight=weight, distance=distance, time=time,
-                   cost=cost, travel_mode=travel_mode)
-        logger.debug(f"Added edge from {pos1} to {pos2} with weight {weight:.4f}")
-
-    logger.info("Graph construction completed.")
+    G = build_network(data, criteria, distance_method, distance_cache).to_networkx()
+    if logger.isEnabledFor(logging.DEBUG):
+        for u, v, w in G.edges(data='weight'):
+            logger.debug(f"Added edge from {u} to {v} with weight {w:.4f}")
     return G
 
 
-def plot_graph(G, optimal_path, criteria):
+@tracing.traced()
+def expand_route(G, optimal_path, all_pairs):
+    """
+    Expands each leg of the tour into the hops actually travelled in the graph.
+    
+    Paths are read from the predecessors kept by the shortest path stage, so
+    no additional path searches are run.
+    
+    Parameters:
+        G (Network or networkx.Graph): The transport network.
+        optimal_path (list): The sequence of locations in the optimized route.
+        all_pairs (ShortestPaths): Shortest paths computed from the tour's nodes.
+        
+    Returns:
+        list: One dict per leg with 'from', 'to' and 'hops', where each hop is a
+            dict with 'from', 'to' and 'travel_mode'. The last leg returns to the start.
+    """
+    legs = []
+    for u, v in zip(optimal_path, optimal_path[1:] + optimal_path[:1]):
+        if u == v:
+            continue
+        path = all_pairs.path(u, v)
+        hops = [{'from': a, 'to': b, 'travel_mode': G.get_edge_data(a, b)['travel_mode']}
+                for a, b in zip(path, path[1:])]
+        legs.append({'from': u, 'to': v, 'hops': hops})
+    logger.info(f"Expanded route into {sum(len(leg['hops']) for leg in legs)} hops.")
+    return legs
+
+
+def _plot_arrays(G):
+    """Returns the node names, (longitude, latitude) positions and edge endpoints to plot."""
+    if isinstance(G, Network):
+        return G.nodes, G.index, G.coordinates[:, ::-1], G.src, G.dst
+    nodes = list(G)
+    index = {node: i for i, node in enumerate(nodes)}
+    # Note: Positions need to be in (longitude, latitude) for plotting
+    positions = np.array([G.nodes[node]['coordinates'][::-1] for node in nodes],
+                         dtype=float).reshape(-1, 2)
+    edges = np.array([(index[u], index[v]) for u, v in G.edges()], dtype=np.int64).reshape(-1, 2)
+    return nodes, index, positions, edges[:, 0], edges[:, 1]
+
+
+@tracing.traced()
+def plot_graph(G, optimal_path, criteria, legs=None, output=None, show=None, corridor=None,
+               max_labels=LABEL_LIMIT):
     """
     Plots the transport network graph and highlights the optimal path.
     
+    All edges are drawn as one line collection and all nodes as one scatter,
+    so large networks render in seconds. Labels are drawn for every node up
+    to `max_labels` nodes; beyond that only the tour's stops are labelled,
+    thinned out to `max_labels`. Layers with more than RASTERIZE_ABOVE
+    elements are rasterized, which keeps SVG and PDF output small.
+    
+    matplotlib is imported on first use. A figure written to `output` is
+    rendered without pyplot, on the Agg canvas, so it never opens a window
+    or blocks; pyplot is only used when the plot is shown.
+    
     Parameters:
-        G (networkx.Graph): The transport network graph.
+        G (Network or networkx.Graph): The transport network.
         optimal_path (list): The sequence of locations in the optimized route.
         criteria (str): The optimization criteria used ('time', 'cost', 'transfers').
+        legs (list, optional): Legs from `expand_route`; when given, the real hops
+            are highlighted instead of straight lines between tour nodes.
+        output (str, optional): Image file to write (format taken from its extension).
+        show (bool, optional): Display the plot interactively; defaults to True
+            only when no `output` is given.
+        corridor (float, optional): Only draw the bounding box of the tour, grown
+            by this fraction of its size on every side.
+        max_labels (int): Largest number of node labels drawn.
     """
-    # Prepare positions for plotting
-    nodes_positions = {}
-    for node in G.nodes():
-        coord = G.nodes[node]['coordinates']
-        # Note: Positions need to be in (longitude, latitude) for plotting
-        nodes_positions[node] = (coord[1], coord[0])
+    if show is None:
+        show = output is None
+    if show:
+        import matplotlib.pyplot as plt
+        fig = plt.figure(figsize=(12, 8))
+    else:
+        from matplotlib.figure import Figure
+        fig = Figure(figsize=(12, 8))
+    from matplotlib.collections import LineCollection
+    ax = fig.add_subplot()
+
+    nodes, index, positions, src, dst = _plot_arrays(G)
+
+    # Highlight the optimal path
+    if legs is not None:
+        path_edges = [(hop['from'], hop['to']) for leg in legs for hop in leg['hops']]
+    else:
+        path_edges = list(zip(optimal_path, optimal_path[1:] + [optimal_path[0]]))
+    path_src = np.array([index[u] for u, _ in path_edges], dtype=np.int64)
+    path_dst = np.array([index[v] for _, v in path_edges], dtype=np.int64)
+    stops = np.array([index[node] for node in optimal_path], dtype=np.int64)
 
-    plt.figure(figsize=(12, 8))
+    # Restrict the drawing to the tour corridor if requested
+    visible = np.ones(len(nodes), dtype=bool)
+    if corridor is not None:
+        on_tour = positions[np.concatenate([stops, path_src, path_dst])]
+        low, high = on_tour.min(axis=0), on_tour.max(axis=0)
+        pad = np.maximum((high - low) * corridor, 1e-3)
+        low, high = low - pad, high + pad
+        visible = np.all((positions >= low) & (positions <= high), axis=1)
+        ax.set_xlim(low[0], high[0])
+        ax.set_ylim(low[1], high[1])
+    shown_edges = visible[src] | visible[dst]
+    shown_nodes = np.flatnonzero(visible)
+    n_shown = len(shown_nodes)
 
     # Draw all edges
-    nx.draw_networkx_edges(G, pos=nodes_positions, edge_color='gray', alpha=0.5)
+    edges = LineCollection(np.stack([positions[src[shown_edges]], positions[dst[shown_edges]]], axis=1),
+                           colors='gray', alpha=0.5, linewidths=1.0, zorder=1)
+    edges.set_rasterized(int(shown_edges.sum()) > RASTERIZE_ABOVE)
+    ax.add_collection(edges)
 
-    # Draw nodes
-    nx.draw_networkx_nodes(G, pos=nodes_positions, node_size=300, node_color='blue')
+    # Draw nodes, smaller as the network grows
+    node_size = 300 if n_shown <= 100 else max(300 * 100 / n_shown, 2)
+    ax.scatter(positions[shown_nodes, 0], positions[shown_nodes, 1], s=node_size, c='blue',
+               zorder=2, rasterized=n_shown > RASTERIZE_ABOVE)
 
     # Draw labels
-    nx.draw_networkx_labels(G, pos=nodes_positions, font_size=9, font_color='black')
+    if n_shown <= max_labels:
+        labelled = shown_nodes
+    else:
+        labelled = stops[visible[stops]]
+        labelled = labelled[::-(-len(labelled) // max_labels)] if max_labels > 0 else labelled[:0]
+    for i in labelled.tolist():
+        ax.text(positions[i, 0], positions[i, 1], nodes[i], fontsize=9, color='black',
+                ha='center', va='center', zorder=4, clip_on=True)
 
-    # Highlight the optimal path
-    path_edges = list(zip(optimal_path, optimal_path[1:] + [optimal_path[0]]))
-    nx.draw_networkx_edges(G, pos=nodes_positions, edgelist=path_edges, edge_color='red', width=2)
+    path = LineCollection(np.stack([positions[path_src], positions[path_dst]], axis=1),
+                          colors='red', linewidths=2, zorder=3)
+    ax.add_collection(path)
 
     # Set the title based on the criteria
     if criteria == 'time':
@@ -94,49 +245,103 @@ def plot_graph(G, optimal_path, criteria):
         title = 'Optimal Path (Least Cost)'
     elif criteria == 'transfers':
         title = 'Optimal Path (Minimal Number of Transfers)'
+    elif criteria == 'mode_changes':
+        title = 'Optimal Path (Fewest Changes of Travel Mode)'
     else:
         title = 'Optimal Path to Visit All Relatives'
 
-    plt.title(title)
-    plt.xlabel('Longitude')
-    plt.ylabel('Latitude')
-    plt.axis('equal')
-    logger.info("Displaying the plot.")
-    plt.show()
+    ax.set_title(title)
+    ax.set_xlabel('Longitude')
+    ax.set_ylabel('Latitude')
+    if corridor is None:
+        ax.autoscale_view()
+    ax.set_aspect('equal', adjustable='datalim')
+    logger.info(f"Plotted {n_shown} of {len(nodes)} nodes and {int(shown_edges.sum())} edges.")
+    if output is not None:
+        fig.savefig(output)
+        logger.info(f"Saved the plot to {output}.")
+    if show:
+        logger.info("Displaying the plot.")
+        plt.show()
+        plt.close(fig)
+
+
+@tracing.traced()
+def find_terminals(G, start="Tarjan's Home", stops=None, prefix='Relative_'):
+    """
+    Determines the nodes the tour must visit.
+    
+    Parameters:
+        G (Network or networkx.Graph): The transport network.
+        start (str): The starting point of the tour.
+        stops (list, optional): Nodes that must be visited. Defaults to every
+            node whose name starts with `prefix`.
+        prefix (str): Name prefix identifying relatives when `stops` is not given.
+        
+    Returns:
+        list: The start node followed by the required stops.
+    """
+    if stops is None:
+        stops = [node for node in G if str(node).startswith(prefix)]
+    terminals = [start] + [node for node in stops if node != start]
+    missing = [node for node in terminals if node not in G]
+    if missing:
+        logger.error(f"Required nodes not found in the graph: {missing}")
+        raise KeyError(f"Required nodes not found in the graph: {missing}")
+    logger.info(f"Tour must visit {len(terminals)} of {G.number_of_nodes()} nodes.")
+    return terminals
 
 
-def compute_all_pairs_shortest_paths(G):
+@tracing.traced()
+def compute_all_pairs_shortest_paths(G, method='auto', as_dict=False, terminals=None):
     """
     Computes the shortest paths between all pairs of nodes in the graph.
     
+    When `terminals` is given, only paths starting at those nodes are
+    computed, which usually means one Dijkstra run per terminal.
+    
     Parameters:
-        G (networkx.Graph): The transport network graph.
+        G (Network or networkx.Graph): The transport network.
+        method (str): 'auto', 'floyd_warshall' (dense, vectorized) or 'dijkstra' (sparse).
+        as_dict (bool): Return a nested dict instead of the array-backed result.
+        terminals (list, optional): Nodes the tour must visit.
         
     Returns:
-        dict: A dictionary of shortest path lengths between nodes.
+        ShortestPaths: Shortest path lengths between nodes, indexable as
+            `all_pairs[u][v]`, or a dict of dicts if `as_dict` is True.
     """
-    all_pairs = dict(nx.floyd_warshall(G, weight='weight'))
-    logger.info("Computed all-pairs shortest paths.")
+    all_pairs = shortest_paths(G, sources=terminals, weight='weight', method=method)
+    tracing.gauge('shortest_path_matrix_cells', all_pairs.matrix.size)
+    if terminals is None:
+        logger.info("Computed all-pairs shortest paths.")
+    else:
+        logger.info(f"Computed shortest paths from {len(terminals)} terminals.")
+    if as_dict:
+        return all_pairs.to_dict()
     return all_pairs
 
 
-def create_distance_matrix(G, all_pairs):
+@tracing.traced()
+def create_distance_matrix(G, all_pairs, terminals=None):
     """
     Creates a distance matrix from the all-pairs shortest paths.
     
     Parameters:
-        G (networkx.Graph): The transport network graph.
-        all_pairs (dict): Shortest paths between all node pairs.
+        G (Network or networkx.Graph): The transport network.
+        all_pairs (ShortestPaths or dict): Shortest paths between all node pairs.
+        terminals (list, optional): Restrict the matrix to these nodes, in this order.
         
     Returns:
         tuple: Distance matrix (numpy.ndarray), index mapping (dict), list of nodes.
     """
-    nodes = list(G.nodes())
+    nodes = list(G) if terminals is None else list(terminals)
     n = len(nodes)
     index = {nodes[i]: i for i in range(n)}
-    distance_matrix = np.zeros((n, n))
-    for i, u in enumerate(nodes):
-        for j, v in enumerate(nodes):
-            distance_matrix[i][j] = all_pairs[u][v]
+    if isinstance(all_pairs, ShortestPaths):
+        distance_matrix = all_pairs.submatrix(nodes)
+    else:
+        distance_matrix = np.array([[all_pairs[u][v] for v in nodes] for u in nodes],
+                                   dtype=float).reshape(n, n)
+    tracing.gauge('distance_matrix_nodes', n)
     logger.info("Constructed distance matrix for TSP solver.")
     return distance_matrix, index, nodes
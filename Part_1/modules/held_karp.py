@@ -0,0 +1,214 @@
+# held_karp.py
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from .heuristics import solve_tsp_local_search, tour_length
+from . import tracing
+from .logger_config import logger
+
+# Number of subsets processed per vectorized step; bounds temporary memory
+CHUNK_SIZE = 1 << 15
+
+# Node count above which the DP tables no longer fit in int8 parents
+MAX_NODES = 32
+
+# Relative slack on the upper bound so float32 rounding never prunes the optimum
+_BOUND_SLACK = 1e-5
+
+
+def table_bytes(n):
+    """
+    Estimates the memory needed by the DP tables for n nodes.
+
+    Parameters:
+        n (int): Number of nodes.
+
+    Returns:
+        int: Bytes used by the cost, parent and liveness tables.
+    """
+    m = max(n - 1, 0)
+    return (1 << m) * (m * (4 + 1) + 1)
+
+
+def _popcounts(m):
+    """Returns the number of set bits of every m-bit mask as uint8."""
+    counts = np.zeros(1 << m, dtype=np.uint8)
+    for j in range(m):
+        counts[1 << j:1 << (j + 1)] = counts[:1 << j] + 1
+    return counts
+
+
+def _subset_sums(masks, values):
+    """Sums values[j] over the set bits j of every mask."""
+    total = np.zeros(len(masks), dtype=np.float64)
+    for j, value in enumerate(values):
+        total += ((masks >> j) & 1) * value
+    return total
+
+
+def _relax(dp, parent, alive, cost, masks, j, remaining_bound, upper_bound):
+    """
+    Computes dp[S, j] for a chunk of subsets S that contain j.
+
+    Parameters:
+        dp (numpy.ndarray): float32 cost table of shape (2**m, m).
+        parent (numpy.ndarray): int8 table of the previous node of each state.
+        alive (numpy.ndarray): bool flag per subset, True if any state in it survived pruning.
+        cost (numpy.ndarray): float32 distances between the non-depot nodes.
+        masks (numpy.ndarray): Subsets that contain bit j.
+        j (int): The node the partial paths end at.
+        remaining_bound (numpy.ndarray or None): Lower bound on completing each subset.
+        upper_bound (float): Length of a known tour, or infinity.
+    """
+    prev = masks ^ (1 << j)
+    keep = alive[prev]
+    if not keep.all():
+        masks, prev = masks[keep], prev[keep]
+        if remaining_bound is not None:
+            remaining_bound = remaining_bound[keep]
+    if len(masks) == 0:
+        return
+    candidates = dp[prev] + cost[:, j]
+    best = candidates.argmin(axis=1)
+    values = candidates[np.arange(len(masks)), best]
+    if remaining_bound is not None:
+        values = np.where(values + remaining_bound > upper_bound, np.inf, values)
+    survived = np.isfinite(values)
+    dp[masks, j] = values
+    parent[masks, j] = best
+    alive[masks[survived]] = True
+
+
+_shared = {}
+
+
+def _attach(names, m):
+    """Pool initializer: maps the shared DP tables into a worker process."""
+    size = 1 << m
+    blocks = {key: shared_memory.SharedMemory(name=name) for key, name in names.items()}
+    _shared['blocks'] = blocks
+    _shared['dp'] = np.ndarray((size, m), dtype=np.float32, buffer=blocks['dp'].buf)
+    _shared['parent'] = np.ndarray((size, m), dtype=np.int8, buffer=blocks['parent'].buf)
+    _shared['alive'] = np.ndarray(size, dtype=bool, buffer=blocks['alive'].buf)
+
+
+def _relax_task(cost, masks, j, remaining_bound, upper_bound):
+    """Runs `_relax` on the shared tables inside a worker process."""
+    _relax(_shared['dp'], _shared['parent'], _shared['alive'], cost, masks, j,
+           remaining_bound, upper_bound)
+
+
+def solve_tsp_held_karp(distance_matrix, workers=None, upper_bound=None, prune=True):
+    """
+    Solves the Traveling Salesman Problem exactly with a bitmask Held-Karp DP.
+
+    Costs are kept in a preallocated float32 table and parents in an int8
+    table, and each layer of equally sized subsets is relaxed with vectorized
+    NumPy operations. States whose cost plus a lower bound on the rest of the
+    tour exceeds a known tour length are pruned; that tour comes from the
+    local search heuristic unless `upper_bound` is given.
+
+    Parameters:
+        distance_matrix (numpy.ndarray): The distance matrix for TSP.
+        workers (int, optional): Number of processes relaxing each layer in parallel.
+        upper_bound (float, optional): Length of a known tour used for pruning.
+        prune (bool): Enable branch-and-bound pruning.
+
+    Returns:
+        tuple: Optimal permutation of nodes starting at node 0 (list), total weight (float).
+    """
+    distance_matrix = np.asarray(distance_matrix, dtype=np.float64)
+    n = len(distance_matrix)
+    if n <= 2:
+        # One tour only; from three nodes on the two directions can differ in cost
+        return solve_tsp_local_search(distance_matrix, time_budget=0.0)
+    if n > MAX_NODES:
+        raise ValueError(f"Held-Karp supports at most {MAX_NODES} nodes, got {n}.")
+
+    m = n - 1
+    size = 1 << m
+    cost = distance_matrix[1:, 1:].astype(np.float32)
+
+    if prune and upper_bound is None:
+        _, upper_bound = solve_tsp_local_search(distance_matrix, time_budget=0.5)
+    remaining_lb = None
+    if prune and np.isfinite(upper_bound):
+        upper_bound = upper_bound * (1 + _BOUND_SLACK) + _BOUND_SLACK
+        # Every node not yet visited, and the depot, still has to be entered once
+        masked = distance_matrix + np.diag(np.full(n, np.inf))
+        min_in = masked.min(axis=0)
+        remaining_lb = (min_in[0] + min_in[1:].sum(), min_in[1:])
+    else:
+        upper_bound = np.inf
+
+    logger.debug(f"Held-Karp on {n} nodes needs {table_bytes(n) / 2 ** 20:.1f} MiB of tables")
+    blocks = {}
+    pool = None
+    try:
+        if workers and workers > 1:
+            for key, nbytes in (('dp', size * m * 4), ('parent', size * m), ('alive', size)):
+                blocks[key] = shared_memory.SharedMemory(create=True, size=nbytes)
+            dp = np.ndarray((size, m), dtype=np.float32, buffer=blocks['dp'].buf)
+            parent = np.ndarray((size, m), dtype=np.int8, buffer=blocks['parent'].buf)
+            alive = np.ndarray(size, dtype=bool, buffer=blocks['alive'].buf)
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                       initargs=({k: b.name for k, b in blocks.items()}, m))
+        else:
+            dp = np.empty((size, m), dtype=np.float32)
+            parent = np.empty((size, m), dtype=np.int8)
+            alive = np.empty(size, dtype=bool)
+        dp.fill(np.inf)
+        parent.fill(-1)
+        alive.fill(False)
+
+        singles = 1 << np.arange(m)
+        dp[singles, np.arange(m)] = distance_matrix[0, 1:]
+        alive[singles] = True
+
+        popcount = _popcounts(m)
+        for layer in range(2, m + 1):
+            layer_masks = np.flatnonzero(popcount == layer)
+            futures = []
+            for j in range(m):
+                masks_j = layer_masks[(layer_masks >> j) & 1 == 1]
+                for start in range(0, len(masks_j), CHUNK_SIZE):
+                    chunk = masks_j[start:start + CHUNK_SIZE]
+                    bound = None
+                    if remaining_lb is not None:
+                        bound = remaining_lb[0] - _subset_sums(chunk, remaining_lb[1])
+                    if pool is not None:
+                        futures.append(pool.submit(_relax_task, cost, chunk, j, bound, upper_bound))
+                    else:
+                        _relax(dp, parent, alive, cost, chunk, j, bound, upper_bound)
+            for future in futures:
+                future.result()
+
+        tracing.count('held_karp_live_subsets', int(alive.sum()))
+        full = size - 1
+        closing = dp[full].astype(np.float64) + distance_matrix[1:, 0]
+        last = int(np.argmin(closing))
+        if not np.isfinite(closing[last]):
+            raise ValueError("No finite tour exists for this distance matrix.")
+
+        # Walk the parents back from the last node to the depot
+        tour = []
+        mask = full
+        j = last
+        while j >= 0:
+            tour.append(j + 1)
+            previous = int(parent[mask, j])
+            mask ^= 1 << j
+            j = previous if mask else -1
+        permutation = [0] + tour[::-1]
+    finally:
+        # Views into shared memory must be released before the blocks are closed
+        dp = parent = alive = None
+        if pool is not None:
+            pool.shutdown()
+        for block in blocks.values():
+            block.close()
+            block.unlink()
+
+    total_weight = tour_length(permutation, distance_matrix)
+    logger.debug(f"Held-Karp tour length {total_weight:.4f}")
+    return permutation, total_weight
@@ -0,0 +1,225 @@
+# heuristics.py
+import time
+import numpy as np
+from . import tracing
+from .logger_config import logger
+
+
+def tour_length(tour, distance_matrix):
+    """
+    Computes the length of a closed tour.
+
+    Parameters:
+        tour (list): The permutation of node indices.
+        distance_matrix (numpy.ndarray): The distance matrix for TSP.
+
+    Returns:
+        float: Sum of the edge weights along the tour, including the return leg.
+    """
+    tour = np.asarray(tour)
+    if len(tour) < 2:
+        return 0.0
+    return float(distance_matrix[tour, np.roll(tour, -1)].sum())
+
+
+def nearest_neighbor_tour(distance_matrix, start=0):
+    """
+    Builds a tour by repeatedly visiting the closest unvisited node.
+
+    Parameters:
+        distance_matrix (numpy.ndarray): The distance matrix for TSP.
+        start (int): Index of the node the tour starts from.
+
+    Returns:
+        list: The permutation of node indices.
+    """
+    n = len(distance_matrix)
+    visited = np.zeros(n, dtype=bool)
+    tour = [start]
+    visited[start] = True
+    current = start
+    for _ in range(n - 1):
+        row = np.where(visited, np.inf, distance_matrix[current])
+        current = int(np.argmin(row))
+        tour.append(current)
+        visited[current] = True
+    return tour
+
+
+def two_opt(tour, distance_matrix, deadline):
+    """
+    Improves a tour with 2-opt segment reversals until no move helps or time runs out.
+
+    The move gain assumes a symmetric distance matrix, which holds for the
+    shortest-path matrices of the undirected transport graph.
+
+    Parameters:
+        tour (numpy.ndarray): The permutation of node indices.
+        distance_matrix (numpy.ndarray): The distance matrix for TSP.
+        deadline (float): `time.perf_counter()` value at which to stop.
+
+    Returns:
+        tuple: Improved tour (numpy.ndarray), number of moves applied.
+    """
+    n = len(tour)
+    moves = 0
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(n - 2):
+            a, b = tour[i], tour[i + 1]
+            # Candidate second edges (tour[j], tour[j + 1]) for j in i+2..n-1
+            c = tour[i + 2:]
+            d = np.roll(tour, -1)[i + 2:]
+            with np.errstate(invalid='ignore'):
+                delta = (distance_matrix[a, c] + distance_matrix[b, d]
+                         - distance_matrix[a, b] - distance_matrix[c, d])
+            if i == 0:
+                # Reversing everything but the first node is the same tour
+                delta[-1] = 0.0
+            k = int(np.argmin(delta))
+            if delta[k] < -1e-12:
+                j = i + 2 + k
+                tour[i + 1:j + 1] = tour[i + 1:j + 1][::-1].copy()
+                moves += 1
+                improved = True
+            if time.perf_counter() >= deadline:
+                break
+    return tour, moves
+
+
+def or_opt(tour, distance_matrix, deadline, max_segment=3):
+    """
+    Improves a tour by relocating short segments, optionally reversed, elsewhere in the tour.
+
+    Parameters:
+        tour (numpy.ndarray): The permutation of node indices.
+        distance_matrix (numpy.ndarray): The distance matrix for TSP.
+        deadline (float): `time.perf_counter()` value at which to stop.
+        max_segment (int): Longest segment length to relocate.
+
+    Returns:
+        tuple: Improved tour (numpy.ndarray), number of moves applied.
+    """
+    n = len(tour)
+    moves = 0
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for length in range(1, min(max_segment, n - 2) + 1):
+            for i in range(n):
+                # Rotate so the segment starts at position 1 and position 0 precedes it
+                rotated = np.roll(tour, -(i - 1))
+                prev, first = rotated[0], rotated[1]
+                last, nxt = rotated[length], rotated[length + 1]
+                rest = np.concatenate(([prev], rotated[length + 1:]))
+                removal_gain = (distance_matrix[prev, first] + distance_matrix[last, nxt]
+                                - distance_matrix[prev, nxt])
+                p = rest
+                q = np.roll(rest, -1)
+                with np.errstate(invalid='ignore'):
+                    base = distance_matrix[p, q]
+                    forward = distance_matrix[p, first] + distance_matrix[last, q] - base
+                    backward = distance_matrix[p, last] + distance_matrix[first, q] - base
+                # Re-inserting between prev and nxt is the identity move
+                forward[0] = np.inf
+                backward[0] = np.inf
+                fk = int(np.argmin(forward))
+                bk = int(np.argmin(backward))
+                reverse = backward[bk] < forward[fk]
+                k = bk if reverse else fk
+                insertion_cost = backward[bk] if reverse else forward[fk]
+                if insertion_cost - removal_gain < -1e-12:
+                    segment = rotated[1:length + 1]
+                    if reverse:
+                        segment = segment[::-1]
+                    tour = np.concatenate((rest[:k + 1], segment, rest[k + 1:]))
+                    moves += 1
+                    improved = True
+                if time.perf_counter() >= deadline:
+                    return tour, moves
+    return tour, moves
+
+
+def one_tree_lower_bound(distance_matrix):
+    """
+    Computes the 1-tree lower bound on the optimal tour length.
+
+    The bound is the weight of a minimum spanning tree over all nodes but one,
+    plus the two cheapest edges joining the excluded node to the tree.
+
+    Parameters:
+        distance_matrix (numpy.ndarray): The distance matrix for TSP.
+
+    Returns:
+        float or None: The lower bound, or None when it cannot be computed.
+    """
+    n = len(distance_matrix)
+    if n < 3:
+        return None
+    # Any tour is also an undirected cycle, so the cheaper direction is a valid bound
+    sym = np.minimum(distance_matrix, distance_matrix.T)
+    if not np.isfinite(sym).all():
+        return None
+
+    # Prim's algorithm over nodes 1..n-1
+    sub = sym[1:, 1:]
+    m = n - 1
+    in_tree = np.zeros(m, dtype=bool)
+    best = sub[0].copy()
+    in_tree[0] = True
+    mst_weight = 0.0
+    for _ in range(m - 1):
+        candidates = np.where(in_tree, np.inf, best)
+        v = int(np.argmin(candidates))
+        mst_weight += candidates[v]
+        in_tree[v] = True
+        best = np.minimum(best, sub[v])
+
+    two_cheapest = np.sort(sym[0, 1:])[:2].sum()
+    return float(mst_weight + two_cheapest)
+
+
+def solve_tsp_local_search(distance_matrix, time_budget=1.0, initial_tour=None):
+    """
+    Solves the Traveling Salesman Problem heuristically.
+
+    A nearest-neighbour tour (or the given initial tour) is improved with
+    alternating 2-opt and Or-opt passes until a local optimum is reached or
+    the time budget is spent.
+
+    Parameters:
+        distance_matrix (numpy.ndarray): The distance matrix for TSP.
+        time_budget (float): Wall-clock seconds available for local search.
+        initial_tour (list, optional): Tour to start from instead of the construction heuristic.
+
+    Returns:
+        tuple: Permutation of nodes (list), total weight (float).
+    """
+    distance_matrix = np.asarray(distance_matrix, dtype=float)
+    n = len(distance_matrix)
+    if n <= 3:
+        tour = list(range(n)) if initial_tour is None else list(initial_tour)
+        return tour, tour_length(tour, distance_matrix)
+
+    deadline = time.perf_counter() + time_budget
+    if initial_tour is None:
+        tour = np.array(nearest_neighbor_tour(distance_matrix), dtype=np.intp)
+    else:
+        tour = np.array(initial_tour, dtype=np.intp)
+
+    total_moves = 0
+    rounds = 0
+    while time.perf_counter() < deadline:
+        tour, moves_2opt = two_opt(tour, distance_matrix, deadline)
+        tour, moves_oropt = or_opt(tour, distance_matrix, deadline)
+        total_moves += moves_2opt + moves_oropt
+        rounds += 1
+        if moves_oropt == 0:
+            break
+    tracing.count('local_search_rounds', rounds)
+    tracing.count('local_search_moves', total_moves)
+
+    total_weight = tour_length(tour, distance_matrix)
+    logger.debug(f"Local search applied {total_moves} moves, tour length {total_weight:.4f}")
+    return [int(i) for i in tour], total_weight
@@ -0,0 +1,169 @@
+# incremental.py
+import numpy as np
+from .geodesy import batch_distance
+from .graph_utils import expand_route
+from .optimizer import solve_tsp, adjust_route
+from .shortest_paths import ShortestPaths, graph_to_arrays, dijkstra
+from .logger_config import logger
+
+
+def _edge_weight(time, cost, criteria):
+    """Returns the edge weight `build_graph` would assign for the criteria."""
+    if criteria == 'cost':
+        return cost
+    if criteria == 'transfers':
+        return 1
+    return time
+
+
+def apply_edge_update(G, update, criteria, distance_method='ellipsoidal'):
+    """
+    Applies one route change to the graph.
+
+    Supported operations, given by update['op']:
+        'update': change 'travel_speed', 'cost_per_km' and/or 'travel_mode' of an existing route.
+        'add': add a route; the update is a full route record as in routes.json.
+        'remove': remove the route between 'position_1' and 'position_2'.
+
+    Parameters:
+        G (networkx.Graph): The transport network graph, modified in place.
+        update (dict): The change to apply.
+        criteria (str): Optimization criteria the graph weights are built for.
+        distance_method (str): Distance model for added routes.
+
+    Returns:
+        tuple: Endpoints (u, v), weight before and after the change (inf if absent).
+    """
+    u, v = update['position_1'], update['position_2']
+    op = update.get('op', 'update')
+    old_weight = G[u][v]['weight'] if G.has_edge(u, v) else np.inf
+
+    if op == 'remove':
+        if G.has_edge(u, v):
+            G.remove_edge(u, v)
+        return (u, v), old_weight, np.inf
+
+    if op == 'add':
+        coord1 = tuple(update['position1_coordinates'])
+        coord2 = tuple(update['position2_coordinates'])
+        distance = float(batch_distance([coord1], [coord2], method=distance_method)[0])
+        time = distance / update['travel_speed']
+        cost = distance * update['cost_per_km']
+        for node, coord in ((u, coord1), (v, coord2)):
+            if node not in G:
+                G.add_node(node, coordinates=coord)
+        weight = _edge_weight(time, cost, criteria)
+        G.add_edge(u, v, weight=weight, distance=distance, time=time, cost=cost,
+                   travel_mode=update['travel_mode'])
+        return (u, v), old_weight, weight
+
+    if op != 'update':
+        raise ValueError(f"Unknown edge update operation: {op}")
+    if not G.has_edge(u, v):
+        logger.error(f"Cannot update missing route between {u} and {v}.")
+        raise KeyError(f"No route between {u} and {v}.")
+    edge = G[u][v]
+    if 'travel_speed' in update:
+        edge['time'] = edge['distance'] / update['travel_speed']
+    if 'cost_per_km' in update:
+        edge['cost'] = edge['distance'] * update['cost_per_km']
+    if 'travel_mode' in update:
+        edge['travel_mode'] = update['travel_mode']
+    edge['weight'] = _edge_weight(edge['time'], edge['cost'], criteria)
+    return (u, v), old_weight, edge['weight']
+
+
+def affected_sources(all_pairs, changes):
+    """
+    Finds the source rows whose shortest path trees can change.
+
+    A row needs recomputing if a cheaper or new edge shortens the path to
+    one of its endpoints, or if a dearer or removed edge lies on its current
+    shortest path tree. Every other row keeps its distances and predecessors.
+
+    Parameters:
+        all_pairs (ShortestPaths): Shortest paths before the changes.
+        changes (list): (u, v), old weight, new weight for each changed edge.
+
+    Returns:
+        numpy.ndarray: Boolean mask over the source rows.
+    """
+    D = all_pairs.matrix
+    P = all_pairs.predecessors
+    affected = np.zeros(len(all_pairs.sources), dtype=bool)
+    for (u, v), old_weight, new_weight in changes:
+        if u not in all_pairs.index or v not in all_pairs.index:
+            # A new node adds a column every row has to fill in
+            affected[:] = True
+            break
+        iu, iv = all_pairs.index[u], all_pairs.index[v]
+        if new_weight < old_weight:
+            with np.errstate(invalid='ignore'):
+                affected |= (D[:, iu] + new_weight < D[:, iv]) | (D[:, iv] + new_weight < D[:, iu])
+        elif new_weight > old_weight:
+            affected |= (P[:, iv] == iu) | (P[:, iu] == iv)
+    return affected
+
+
+def update_shortest_paths(G, all_pairs, updates, criteria, distance_method='ellipsoidal'):
+    """
+    Applies a batch of route changes and updates the shortest paths incrementally.
+
+    Only the source rows whose shortest path trees can change are recomputed,
+    each with one Dijkstra run; the others are kept as they are.
+
+    Parameters:
+        G (networkx.Graph): The transport network graph, modified in place.
+        all_pairs (ShortestPaths): Shortest paths from the terminals before the changes.
+        updates (list): Route changes as accepted by `apply_edge_update`.
+        criteria (str): Optimization criteria the graph weights are built for.
+        distance_method (str): Distance model for added routes.
+
+    Returns:
+        ShortestPaths: The updated shortest paths.
+    """
+    changes = [apply_edge_update(G, update, criteria, distance_method) for update in updates]
+    affected = affected_sources(all_pairs, changes)
+
+    nodes, index, offsets, targets, weights = graph_to_arrays(G, 'weight')
+    n = len(nodes)
+    matrix = np.full((len(all_pairs.sources), n), np.inf)
+    predecessors = np.full((len(all_pairs.sources), n), -1, dtype=np.int32)
+    # nx appends new nodes, so existing columns keep their positions
+    old_n = all_pairs.matrix.shape[1]
+    matrix[:, :old_n] = all_pairs.matrix
+    predecessors[:, :old_n] = all_pairs.predecessors
+    for row in np.flatnonzero(affected):
+        source = index[all_pairs.sources[row]]
+        matrix[row], predecessors[row] = dijkstra(offsets, targets, weights, source)
+
+    logger.info(f"Applied {len(updates)} route updates; recomputed {int(affected.sum())} "
+                f"of {len(all_pairs.sources)} shortest path trees.")
+    return ShortestPaths(matrix, nodes, index, list(all_pairs.sources), predecessors)
+
+
+def replan(G, all_pairs, updates, criteria, previous_path, **solver_options):
+    """
+    Updates the shortest paths after route changes and re-solves the tour from the previous one.
+
+    Parameters:
+        G (networkx.Graph): The transport network graph, modified in place.
+        all_pairs (ShortestPaths): Shortest paths from the terminals before the changes.
+        updates (list): Route changes as accepted by `apply_edge_update`.
+        criteria (str): Optimization criteria the graph weights are built for.
+        previous_path (list): The previous tour, as returned by `adjust_route`.
+        **solver_options: Extra keyword arguments passed to `solve_tsp`.
+
+    Returns:
+        tuple: Updated shortest paths, optimal path (list), total weight (float), legs (list).
+    """
+    all_pairs = update_shortest_paths(G, all_pairs, updates, criteria)
+    terminals = list(all_pairs.sources)
+    index = {node: i for i, node in enumerate(terminals)}
+    distance_matrix = all_pairs.submatrix(terminals)
+    initial_tour = [index[node] for node in previous_path]
+    permutation, total_weight = solve_tsp(distance_matrix, initial_tour=initial_tour,
+                                          **solver_options)
+    optimal_path = adjust_route(permutation, index, terminals)
+    legs = expand_route(G, optimal_path, all_pairs)
+    return all_pairs, optimal_path, total_weight, legs
@@ -0,0 +1,24 @@
+# interface.py
+from .logger_config import logger
+
+CRITERIA_CHOICES = {'1': 'time', '2': 'cost', '3': 'transfers', '4': 'mode_changes'}
+
+
+def get_optimization_criteria():
+    """
+    Prompts the user to select the optimization criteria.
+    
+    Returns:
+        str: The selected criteria ('time', 'cost', 'transfers', 'mode_changes'). Invalid
+            input falls back to 'time'.
+    """
+    print("Select optimization criteria:")
+    print("1. Shortest travel time")
+    print("2. Least cost")
+    print("3. Minimal number of transfers")
+    print("4. Fewest changes of travel mode")
+    choice = input("Enter the number of your choice (1-4): ").strip()
+    if choice not in CRITERIA_CHOICES:
+        logger.warning(f"Invalid criteria choice {choice!r}; defaulting to shortest travel time.")
+        return 'time'
+    return CRITERIA_CHOICES[choice]
@@ -0,0 +1,119 @@
+# multi_criteria.py
+import numpy as np
+from .shortest_paths import graph_to_columns, shortest_paths_csr
+from .graph_utils import expand_route
+from .optimizer import solve_tsp, adjust_route
+from .transfers import count_mode_changes
+from .logger_config import logger
+
+CRITERIA = ('time', 'cost', 'transfers')
+
+# Metrics reported for every tour, whichever criterion it was optimized for
+METRICS = ('time', 'cost', 'transfers', 'distance')
+
+
+def criterion_columns(G):
+    """
+    Extracts the network structure once with one weight column per criterion.
+
+    Parameters:
+        G (Network or networkx.Graph): The transport network from `build_network` or `build_graph`.
+
+    Returns:
+        tuple: List of nodes, index mapping (dict), CSR offsets, CSR targets,
+            dict of criterion -> CSR weights. 'transfers' counts one per edge.
+    """
+    nodes, index, offsets, targets, columns = graph_to_columns(G, ('time', 'cost'))
+    columns['transfers'] = np.ones(len(targets))
+    return nodes, index, offsets, targets, columns
+
+
+def route_metrics(G, legs):
+    """
+    Sums every metric along the hops of an expanded route.
+
+    Parameters:
+        G (Network or networkx.Graph): The transport network.
+        legs (list): Legs from `expand_route`.
+
+    Returns:
+        dict: Total time, cost, number of edges travelled ('transfers'), distance
+            and changes of travel mode within the legs ('mode_changes').
+    """
+    metrics = {'time': 0.0, 'cost': 0.0, 'transfers': 0, 'distance': 0.0, 'mode_changes': 0}
+    for leg in legs:
+        metrics['mode_changes'] += count_mode_changes([hop['travel_mode'] for hop in leg['hops']])
+        for hop in leg['hops']:
+            edge = G.get_edge_data(hop['from'], hop['to'])
+            metrics['time'] += edge['time']
+            metrics['cost'] += edge['cost']
+            metrics['distance'] += edge['distance']
+            metrics['transfers'] += 1
+    return metrics
+
+
+def pareto_front(results):
+    """
+    Finds the criteria whose tours are not dominated on all metrics by another tour.
+
+    Parameters:
+        results (dict): Output of `compare_criteria`.
+
+    Returns:
+        list: Criteria whose tours are Pareto-optimal among the compared tours.
+    """
+    front = []
+    for name, result in results.items():
+        mine = [result['metrics'][m] for m in METRICS]
+        dominated = False
+        for other_name, other in results.items():
+            theirs = [other['metrics'][m] for m in METRICS]
+            if other_name != name and all(t <= m for t, m in zip(theirs, mine)) \
+                    and any(t < m for t, m in zip(theirs, mine)):
+                dominated = True
+                break
+        if not dominated:
+            front.append(name)
+    return front
+
+
+def compare_criteria(G, terminals, criteria=CRITERIA, **solver_options):
+    """
+    Plans one tour per optimization criterion over a single network build.
+
+    The adjacency structure is extracted once and shortest paths are run once
+    per criterion over it, instead of rebuilding the graph for each one.
+
+    Parameters:
+        G (Network or networkx.Graph): The transport network from `build_network` or `build_graph`.
+        terminals (list): Nodes the tour must visit, starting with Tarjan's Home.
+        criteria (tuple): Criteria to plan for ('time', 'cost', 'transfers').
+        **solver_options: Extra keyword arguments passed to `solve_tsp`.
+
+    Returns:
+        dict: For each criterion, a dict with 'path', 'total_weight', 'legs',
+            'metrics' (all metrics of that tour) and 'report' (solver report).
+    """
+    nodes, index, offsets, targets, columns = criterion_columns(G)
+    results = {}
+    for criterion in criteria:
+        if criterion not in columns:
+            logger.error(f"Unknown optimization criteria: {criterion}")
+            raise ValueError(f"Unknown optimization criteria: {criterion}")
+        paths = shortest_paths_csr(nodes, index, offsets, targets, columns[criterion],
+                                   sources=terminals)
+        distance_matrix = paths.submatrix(terminals)
+        terminal_index = {node: i for i, node in enumerate(terminals)}
+        permutation, total_weight, report = solve_tsp(distance_matrix, return_report=True,
+                                                      **solver_options)
+        optimal_path = adjust_route(permutation, terminal_index, terminals)
+        legs = expand_route(G, optimal_path, paths)
+        results[criterion] = {
+            'path': optimal_path,
+            'total_weight': total_weight,
+            'legs': legs,
+            'metrics': route_metrics(G, legs),
+            'report': report,
+        }
+        logger.info(f"Planned tour for {criterion}: {results[criterion]['metrics']}")
+    return results
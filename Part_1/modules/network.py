@@ -0,0 +1,302 @@
+# network.py
+import sys
+import numpy as np
+from .shortest_paths import csr_order, shortest_paths_csr
+from .spatial_index import SpatialIndex, duplicate_locations
+
+# Per-edge metrics stored as columns, in the order they are kept on disk
+EDGE_COLUMNS = ('time', 'cost', 'distance')
+
+
+class Edge:
+    """
+    Read-only view of one edge of a Network.
+
+    Supports the `data['travel_mode']` access of networkx edge dicts, with
+    'weight' resolving to the network's criterion.
+    """
+    __slots__ = ('_network', '_id')
+
+    def __init__(self, network, edge_id):
+        self._network = network
+        self._id = edge_id
+
+    @property
+    def travel_mode(self):
+        network = self._network
+        return network.mode_names[network.modes[self._id]]
+
+    @property
+    def weight(self):
+        return self['weight']
+
+    def __getitem__(self, key):
+        network = self._network
+        if key == 'travel_mode':
+            return self.travel_mode
+        if key == 'weight':
+            key = network.criteria
+        if key == 'transfers':
+            return 1
+        try:
+            return float(network.columns[key][self._id])
+        except KeyError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self):
+        """Returns the edge attributes as a networkx-style dict."""
+        data = {name: self[name] for name in self._network.columns}
+        data['weight'] = self['weight']
+        data['travel_mode'] = self.travel_mode
+        return data
+
+
+class Network:
+    """
+    Compact array-backed transport network.
+
+    Node names are interned and mapped to int ids. Edges are kept once each
+    in aligned arrays with one float64 column per metric; a CSR adjacency
+    structure lists every edge in both directions, with `edge_ids` pointing
+    back at the edge row, so a metric is turned into CSR weights with a
+    single gather.
+
+    Attributes:
+        nodes (list): Node names, in id order.
+        index (dict): Mapping of node names to ids.
+        coordinates (numpy.ndarray): float64 array of shape (n, 2) with latitude, longitude.
+        src, dst (numpy.ndarray): int32 endpoints of each edge.
+        columns (dict): Metric name -> float64 value per edge.
+        modes (numpy.ndarray): int16 travel mode code per edge.
+        mode_names (list): Travel mode name per code.
+        offsets, targets, edge_ids (numpy.ndarray): int32 CSR adjacency structure.
+        criteria (str): Criterion the 'weight' of an edge refers to.
+    """
+    __slots__ = ('nodes', 'index', 'coordinates', 'src', 'dst', 'columns', 'modes',
+                 'mode_names', 'offsets', 'targets', 'edge_ids', 'criteria', '_spatial')
+
+    def __init__(self, nodes, coordinates, src, dst, columns, modes, mode_names, criteria='time'):
+        self.nodes = [sys.intern(node) if isinstance(node, str) else node for node in nodes]
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        self.coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+        self.src = np.asarray(src, dtype=np.int32)
+        self.dst = np.asarray(dst, dtype=np.int32)
+        self.columns = {name: np.asarray(column, dtype=np.float64) for name, column in columns.items()}
+        self.modes = np.asarray(modes, dtype=np.int16)
+        self.mode_names = list(mode_names)
+        self.criteria = criteria
+        self._spatial = None
+
+        m = len(self.src)
+        both_src = np.concatenate((self.src, self.dst))
+        both_dst = np.concatenate((self.dst, self.src))
+        order, self.offsets = csr_order(len(self.nodes), both_src)
+        self.targets = both_dst[order].astype(np.int32)
+        self.edge_ids = (order % max(m, 1)).astype(np.int32)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def __contains__(self, node):
+        return node in self.index
+
+    def number_of_nodes(self):
+        return len(self.nodes)
+
+    def number_of_edges(self):
+        return len(self.src)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the network's arrays."""
+        arrays = [self.coordinates, self.src, self.dst, self.modes, self.offsets,
+                  self.targets, self.edge_ids] + list(self.columns.values())
+        return sum(array.nbytes for array in arrays)
+
+    def neighbors(self, node):
+        """
+        Lists the nodes adjacent to a node.
+
+        Parameters:
+            node (str): The node.
+
+        Returns:
+            list: Neighbouring node names.
+        """
+        i = self.index[node]
+        return [self.nodes[j] for j in self.targets[self.offsets[i]:self.offsets[i + 1]].tolist()]
+
+    def edge_id(self, u, v):
+        """
+        Finds the edge between two nodes.
+
+        Parameters:
+            u, v (str): The endpoints.
+
+        Returns:
+            int: The edge row, or -1 if the nodes are not adjacent.
+        """
+        i = self.index.get(u)
+        j = self.index.get(v)
+        if i is None or j is None:
+            return -1
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        hits = np.flatnonzero(self.targets[lo:hi] == j)
+        return int(self.edge_ids[lo + hits[0]]) if len(hits) else -1
+
+    def has_node(self, node):
+        return node in self.index
+
+    def has_edge(self, u, v):
+        return self.edge_id(u, v) >= 0
+
+    def get_edge_data(self, u, v, default=None):
+        """
+        Returns the edge between two nodes.
+
+        Parameters:
+            u, v (str): The endpoints.
+            default: Returned when there is no such edge.
+
+        Returns:
+            Edge: A view supporting `edge['time']`, `edge['travel_mode']` and so on.
+        """
+        k = self.edge_id(u, v)
+        return Edge(self, k) if k >= 0 else default
+
+    def spatial_index(self):
+        """Returns the KD-tree over the node coordinates, built on first use."""
+        if self._spatial is None:
+            self._spatial = SpatialIndex(self.coordinates)
+        return self._spatial
+
+    def nearest_nodes(self, lat, lon, k=1):
+        """
+        Finds the k nodes closest to a coordinate.
+
+        Parameters:
+            lat, lon (float): The coordinate in degrees.
+            k (int): Number of nodes to return.
+
+        Returns:
+            list: (node name, great-circle distance in km) tuples, closest first.
+        """
+        return [(self.nodes[i], d) for i, d in self.spatial_index().nearest(lat, lon, k)]
+
+    def nodes_within(self, lat, lon, radius_km):
+        """
+        Finds the nodes within a radius of a coordinate.
+
+        Parameters:
+            lat, lon (float): The coordinate in degrees.
+            radius_km (float): The search radius.
+
+        Returns:
+            list: (node name, great-circle distance in km) tuples, closest first.
+        """
+        return [(self.nodes[i], d) for i, d in self.spatial_index().within(lat, lon, radius_km)]
+
+    def duplicate_stops(self, tolerance_km=0.0):
+        """
+        Finds stops that share a location under different names.
+
+        Parameters:
+            tolerance_km (float): Stops closer than this count as one location;
+                0 means identical coordinates, which needs no index.
+
+        Returns:
+            list: Lists of node names, one per shared location.
+        """
+        if tolerance_km <= 0:
+            groups = duplicate_locations(self.coordinates)
+        else:
+            groups = self.spatial_index().duplicates(tolerance_km)
+        return [[self.nodes[i] for i in group] for group in groups]
+
+    def csr_weights(self, attribute='weight'):
+        """
+        Returns a metric as weights aligned with the CSR targets.
+
+        Parameters:
+            attribute (str): A metric column, 'transfers' (one per edge) or
+                'weight' for the network's criterion.
+
+        Returns:
+            numpy.ndarray: float64 weight per adjacency entry.
+        """
+        if attribute == 'weight':
+            attribute = self.criteria
+        if attribute == 'transfers':
+            return np.ones(len(self.targets))
+        return self.columns[attribute][self.edge_ids]
+
+    def shortest_paths(self, criteria=None, sources=None, method='auto'):
+        """
+        Computes shortest paths over the network for one criterion.
+
+        Parameters:
+            criteria (str, optional): Criterion to minimize; defaults to the network's.
+            sources (list, optional): Source nodes; defaults to all nodes.
+            method (str): 'auto', 'floyd_warshall' or 'dijkstra'.
+
+        Returns:
+            ShortestPaths: Distances and predecessors from every source.
+        """
+        weights = self.csr_weights(criteria or 'weight')
+        return shortest_paths_csr(self.nodes, self.index, self.offsets, self.targets, weights,
+                                  sources, method)
+
+    def to_networkx(self, criteria=None):
+        """
+        Exports the network as a networkx graph, for plotting and compatibility.
+
+        Parameters:
+            criteria (str, optional): Criterion stored as the 'weight' attribute;
+                defaults to the network's.
+
+        Returns:
+            networkx.Graph: Graph with 'coordinates' on nodes and 'weight',
+                'distance', 'time', 'cost' and 'travel_mode' on edges.
+        """
+        import networkx as nx
+        criteria = criteria or self.criteria
+        G = nx.Graph()
+        G.add_nodes_from((node, {'coordinates': tuple(coord)})
+                         for node, coord in zip(self.nodes, self.coordinates.tolist()))
+        columns = {name: column.tolist() for name, column in self.columns.items()}
+        if criteria == 'transfers':
+            weights = [1] * len(self.src)
+        else:
+            weights = columns.get(criteria, columns['time'])
+        names = self.nodes
+        modes = [self.mode_names[code] for code in self.modes.tolist()]
+        G.add_edges_from(
+            (names[u], names[v], dict({name: values[k] for name, values in columns.items()},
+                                      weight=weights[k], travel_mode=modes[k]))
+            for k, (u, v) in enumerate(zip(self.src.tolist(), self.dst.tolist()))
+        )
+        return G
+
+
+def encode_modes(modes):
+    """
+    Encodes travel mode names as small integer codes.
+
+    Parameters:
+        modes (list): Travel mode name per edge.
+
+    Returns:
+        tuple: int16 code per edge (numpy.ndarray), list of mode names per code.
+    """
+    mode_names = list(dict.fromkeys(modes))
+    codes = {mode: i for i, mode in enumerate(mode_names)}
+    return np.array([codes[mode] for mode in modes], dtype=np.int16), mode_names
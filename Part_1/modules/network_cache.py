@@ -0,0 +1,283 @@
+# network_cache.py
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+from .data_loader import iter_routes
+from .graph_utils import build_network, find_terminals
+from .network import EDGE_COLUMNS, Network
+from .shortest_paths import ShortestPaths
+from . import tracing
+from .logger_config import logger
+
+# Bump whenever the artifact layout or the meaning of its contents changes
+CACHE_VERSION = 2
+
+DEFAULT_CACHE_DIR = '.tarjan_cache'
+
+
+def file_digest(filename, chunk_size=1 << 20):
+    """
+    Computes the SHA-256 digest of a file's contents.
+
+    Parameters:
+        filename (str): The path to the file.
+        chunk_size (int): Number of bytes read at a time.
+
+    Returns:
+        str: Hexadecimal digest.
+    """
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(source_digest, criteria, distance_method='ellipsoidal', stops=None):
+    """
+    Derives the artifact key from the input contents and the build options.
+
+    Parameters:
+        source_digest (str): Digest of the routes file.
+        criteria (tuple): Criteria whose distance matrices are stored.
+        distance_method (str): Distance model used by `build_graph`.
+        stops (list, optional): Explicit required stops, if any.
+
+    Returns:
+        str: Hexadecimal key.
+    """
+    options = json.dumps({
+        'version': CACHE_VERSION,
+        'source': source_digest,
+        'criteria': sorted(criteria),
+        'distance_method': distance_method,
+        'stops': stops,
+    }, sort_keys=True)
+    return hashlib.sha256(options.encode('utf-8')).hexdigest()[:32]
+
+
+class CompiledNetwork:
+    """
+    A compiled transport network loaded from, or ready to be written to, disk.
+
+    Arrays are stored as `.npy` files and loaded memory-mapped, so a warm
+    start reads only the pages it touches.
+
+    Attributes:
+        meta (dict): Node names, terminals, travel mode names and build options.
+        arrays (dict): Node coordinates, edge arrays and per-criterion matrices.
+    """
+
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        self.arrays = arrays
+        self.nodes = meta['nodes']
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        self.terminals = meta['terminals']
+        self.criteria = tuple(meta['criteria'])
+
+    def shortest_paths(self, criteria):
+        """
+        Returns the stored shortest paths from the terminals for one criterion.
+
+        Parameters:
+            criteria (str): The optimization criteria.
+
+        Returns:
+            ShortestPaths: Distances and predecessors from every terminal.
+        """
+        return ShortestPaths(self.arrays[f'dist_{criteria}'], self.nodes, self.index,
+                             self.terminals, self.arrays[f'pred_{criteria}'])
+
+    def distance_matrix(self, criteria):
+        """
+        Returns the TSP distance matrix over the terminals for one criterion.
+
+        Parameters:
+            criteria (str): The optimization criteria.
+
+        Returns:
+            tuple: Distance matrix (numpy.ndarray), index mapping (dict), list of nodes.
+        """
+        nodes = list(self.terminals)
+        index = {node: i for i, node in enumerate(nodes)}
+        return np.array(self.shortest_paths(criteria).submatrix(nodes)), index, nodes
+
+    def to_network(self, criteria='time'):
+        """
+        Wraps the stored arrays in a Network without recomputing or copying them.
+
+        Parameters:
+            criteria (str): Criterion the edge 'weight' refers to.
+
+        Returns:
+            Network: The transport network.
+        """
+        columns = {name: self.arrays[f'edge_{name}'] for name in EDGE_COLUMNS}
+        return Network(self.nodes, self.arrays['coordinates'], self.arrays['edge_src'],
+                       self.arrays['edge_dst'], columns, self.arrays['edge_mode'],
+                       self.meta['travel_modes'], criteria=criteria)
+
+    def to_graph(self, criteria='time'):
+        """
+        Rebuilds the networkx graph without recomputing any distances.
+
+        Parameters:
+            criteria (str): Criterion whose values become the 'weight' attribute.
+
+        Returns:
+            networkx.Graph: The transport network graph.
+        """
+        return self.to_network(criteria).to_networkx()
+
+    def save(self, directory):
+        """
+        Writes the artifact atomically to a directory.
+
+        Parameters:
+            directory (str): Target directory; replaced if it already exists.
+        """
+        parent = os.path.dirname(os.path.abspath(directory))
+        os.makedirs(parent, exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=parent, prefix='.tmp-')
+        try:
+            for name, array in self.arrays.items():
+                np.save(os.path.join(tmp, f'{name}.npy'), array)
+            # meta.json is written last and marks the artifact as complete
+            with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+                json.dump(self.meta, f)
+            if os.path.exists(directory):
+                shutil.rmtree(directory)
+            os.replace(tmp, directory)
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+    @classmethod
+    def load(cls, directory):
+        """
+        Loads an artifact with all arrays memory-mapped read-only.
+
+        Parameters:
+            directory (str): The artifact directory.
+
+        Returns:
+            CompiledNetwork: The loaded network.
+        """
+        with open(os.path.join(directory, 'meta.json'), 'r') as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+                  for name in meta['arrays']}
+        return cls(meta, arrays)
+
+
+@tracing.traced()
+def compile_network(data, criteria, distance_method='ellipsoidal', stops=None, distance_cache=None):
+    """
+    Builds the network and the per-criterion shortest paths from the terminals.
+
+    Parameters:
+        data (iterable): Route records.
+        criteria (tuple): Criteria whose shortest paths are computed.
+        distance_method (str): Distance model used by `build_network`.
+        stops (list, optional): Required stops; defaults to all relatives.
+        distance_cache (DistanceCache, optional): Cache of distances from earlier builds.
+
+    Returns:
+        CompiledNetwork: The compiled network.
+    """
+    network = build_network(data, 'time', distance_method=distance_method,
+                            distance_cache=distance_cache)
+    terminals = find_terminals(network, stops=stops)
+
+    arrays = {
+        'coordinates': network.coordinates,
+        'edge_src': network.src,
+        'edge_dst': network.dst,
+        'edge_mode': network.modes,
+    }
+    for name in EDGE_COLUMNS:
+        arrays[f'edge_{name}'] = network.columns[name]
+    for criterion in criteria:
+        paths = network.shortest_paths(criterion, sources=terminals)
+        arrays[f'dist_{criterion}'] = paths.matrix
+        arrays[f'pred_{criterion}'] = paths.predecessors
+
+    meta = {
+        'version': CACHE_VERSION,
+        'nodes': network.nodes,
+        'terminals': terminals,
+        'criteria': list(criteria),
+        'travel_modes': network.mode_names,
+        'distance_method': distance_method,
+        'arrays': sorted(arrays),
+    }
+    return CompiledNetwork(meta, arrays)
+
+
+@tracing.traced()
+def load_or_compile_network(filename, criteria, cache_dir=DEFAULT_CACHE_DIR,
+                            distance_method='ellipsoidal', stops=None, distance_cache=None):
+    """
+    Returns the compiled network for a routes file, rebuilding it if the cache is stale.
+
+    The artifact is keyed by the SHA-256 of the file contents and the build
+    options, so any change to the routes file leads to a rebuild. Artifacts
+    for older contents of the same file are removed.
+
+    Parameters:
+        filename (str): The path to the routes JSON file.
+        criteria (str or tuple): Criteria whose distance matrices are needed.
+        cache_dir (str): Directory holding the artifacts.
+        distance_method (str): Distance model used by `build_graph`.
+        stops (list, optional): Required stops; defaults to all relatives.
+        distance_cache (DistanceCache, optional): Cache of distances used if a rebuild is needed.
+
+    Returns:
+        CompiledNetwork: The compiled network.
+    """
+    if isinstance(criteria, str):
+        criteria = (criteria,)
+    source_digest = file_digest(filename)
+    key = cache_key(source_digest, criteria, distance_method, stops)
+    directory = os.path.join(cache_dir, key)
+
+    if os.path.exists(os.path.join(directory, 'meta.json')):
+        try:
+            network = CompiledNetwork.load(directory)
+            if network.meta.get('version') == CACHE_VERSION and \
+                    network.meta.get('source_digest') == source_digest:
+                tracing.count('network_cache_hits')
+                logger.info(f"Loaded compiled network from {directory}.")
+                return network
+            logger.info(f"Compiled network in {directory} is stale.")
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not load compiled network from {directory}: {e}")
+
+    tracing.count('network_cache_misses')
+    network = compile_network(iter_routes(filename), criteria, distance_method, stops,
+                              distance_cache)
+    network.meta['source'] = os.path.abspath(filename)
+    network.meta['source_digest'] = source_digest
+    network.save(directory)
+    _remove_stale_artifacts(cache_dir, network.meta['source'], source_digest)
+    logger.info(f"Compiled network for {filename} written to {directory}.")
+    return network
+
+
+def _remove_stale_artifacts(cache_dir, source, source_digest):
+    """Removes artifacts built from older contents of the same source file."""
+    for name in os.listdir(cache_dir):
+        if name.startswith('.'):
+            continue
+        meta_path = os.path.join(cache_dir, name, 'meta.json')
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if meta.get('source') == source and meta.get('source_digest') != source_digest:
+            shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
@@ -1,25 +1,90 @@
 # optimizer.py
+import time
 import numpy as np
-from python_tsp.exact import solve_tsp_dynamic_programming
+from .heuristics import solve_tsp_local_search, one_tree_lower_bound, tour_length
+from .held_karp import solve_tsp_held_karp
+from . import tracing
 from .logger_config import logger
 
+# Largest number of nodes solved exactly when method='auto'
+EXACT_NODE_LIMIT = 16
 
-def solve_tsp(distance_matrix):
+# Default wall-clock budget in seconds for the heuristic solver
+HEURISTIC_TIME_BUDGET = 2.0
+
+
+@tracing.traced()
+def solve_tsp(distance_matrix, method='auto', exact_node_limit=EXACT_NODE_LIMIT,
+              time_budget=HEURISTIC_TIME_BUDGET, return_report=False, workers=None,
+              initial_tour=None):
     """
-    Solves the Traveling Salesman Problem using dynamic programming.
-    
+    Solves the Traveling Salesman Problem exactly or heuristically.
+
+    With method='auto' the exact Held-Karp solver is used up to
+    `exact_node_limit` nodes, and the local search heuristic beyond that.
+    A previous tour can be passed to warm-start either solver: the heuristic
+    improves it directly and the exact solver prunes with its length.
+
     Parameters:
         distance_matrix (numpy.ndarray): The distance matrix for TSP.
-        
+        method (str): Solver to use ('auto', 'exact', 'heuristic').
+        exact_node_limit (int): Largest node count solved exactly in 'auto' mode.
+        time_budget (float): Wall-clock seconds available to the heuristic solver.
+        return_report (bool): Also return a report describing the solver run.
+        workers (int, optional): Processes used by the exact solver for each subset layer.
+        initial_tour (list, optional): A known tour over all nodes to start from.
+
     Returns:
-        tuple: Optimal permutation of nodes, total weight.
+        tuple: Optimal permutation of nodes, total weight, and, if requested,
+            a report dict with the solver used, lower bound, optimality gap
+            and elapsed time.
     """
-    permutation, total_weight = solve_tsp_dynamic_programming(distance_matrix)
-    logger.info("Solved Traveling Salesman Problem.")
+    n = len(distance_matrix)
+    if method == 'auto':
+        method = 'exact' if n <= exact_node_limit else 'heuristic'
+
+    start_time = time.perf_counter()
+    if method == 'exact':
+        upper_bound = None
+        if initial_tour is not None:
+            upper_bound = tour_length(initial_tour, np.asarray(distance_matrix, dtype=float))
+        permutation, total_weight = solve_tsp_held_karp(distance_matrix, workers=workers,
+                                                        upper_bound=upper_bound)
+        lower_bound, gap = total_weight, 0.0
+    elif method == 'heuristic':
+        permutation, total_weight = solve_tsp_local_search(distance_matrix, time_budget=time_budget,
+                                                           initial_tour=initial_tour)
+        lower_bound = one_tree_lower_bound(np.asarray(distance_matrix, dtype=float))
+        gap = None
+        if lower_bound is not None and lower_bound > 0:
+            gap = max(total_weight - lower_bound, 0.0) / lower_bound
+    else:
+        logger.error(f"Unknown TSP solver method: {method}")
+        raise ValueError(f"Unknown TSP solver method: {method}")
+    elapsed = time.perf_counter() - start_time
+    tracing.count(f"tsp_{method}_solves")
+    tracing.gauge('tsp_nodes', n)
+
+    if gap is None:
+        logger.info(f"Solved Traveling Salesman Problem ({method}, {n} nodes, {elapsed:.4f} s).")
+    else:
+        logger.info(f"Solved Traveling Salesman Problem ({method}, {n} nodes, {elapsed:.4f} s, "
+                    f"gap <= {gap:.2%}).")
+
+    if return_report:
+        report = {
+            'solver': method,
+            'nodes': n,
+            'lower_bound': lower_bound,
+            'gap': gap,
+            'elapsed': elapsed,
+        }
+        return permutation, total_weight, report
     return permutation, total_weight
 
 
-def adjust_route(permutation, index, nodes):
+@tracing.traced()
+def adjust_route(permutation, index, nodes, start="Tarjan's Home"):
     """
     Adjusts the permutation to start at the designated starting point.
     
@@ -27,20 +92,21 @@ def adjust_route(permutation, index, nodes):
         permutation (list): The permutation of node indices.
         index (dict): Mapping of node names to their indices.
         nodes (list): List of node names.
+        start (str): The node the route starts from.
         
     Returns:
         list: Optimized path starting from the designated point.
     """
     try:
-        start_index = index["Tarjan's Home"]
+        start_index = index[start]
         start_pos = list(permutation).index(start_index)
         permutation = np.roll(permutation, -start_pos)
         optimal_path = [nodes[i] for i in permutation]
         logger.info(f"Optimal path determined: {optimal_path}")
         return optimal_path
     except KeyError:
-        logger.error("'Tarjan's Home' not found in the nodes.")
+        logger.error(f"'{start}' not found in the nodes.")
         raise
     except ValueError:
-        logger.error("'Tarjan's Home' is not in the permutation.")
+        logger.error(f"'{start}' is not in the permutation.")
         raise
@@ -0,0 +1,202 @@
+# planner.py
+import numbers
+import threading
+import time
+import numpy as np
+from .graph_utils import expand_route
+from .multi_criteria import CRITERIA, criterion_columns
+from .network_cache import load_or_compile_network, DEFAULT_CACHE_DIR
+from .optimizer import solve_tsp, adjust_route
+from .shortest_paths import ShortestPaths, dijkstra
+from .transfers import MODE_CHANGES, transfer_inputs, transfer_paths, transfer_search
+from . import tracing
+from .logger_config import logger
+
+# Shortest path trees kept for start nodes that are not precompiled terminals,
+# and mode-aware search results kept per (node, penalty)
+ROW_CACHE_SIZE = 256
+
+# Farthest a coordinate may be from its nearest stop to be snapped to it, in km
+MAX_SNAP_DISTANCE_KM = 1.0
+
+
+class PlanningError(ValueError):
+    """Exception raised for planning requests that cannot be served."""
+    pass
+
+
+class Planner:
+    """
+    Keeps a compiled network in memory and answers planning requests against it.
+
+    Shortest path trees from the compiled terminals are loaded once; trees from
+    other start nodes or stops are computed on first use and cached.
+    """
+
+    def __init__(self, routes_file, cache_dir=DEFAULT_CACHE_DIR, criteria=CRITERIA,
+                 distance_cache=None):
+        start_time = time.perf_counter()
+        # Mode-aware paths are searched per request rather than compiled
+        compiled = tuple(c for c in criteria if c != MODE_CHANGES)
+        self.network = load_or_compile_network(routes_file, compiled, cache_dir=cache_dir,
+                                               distance_cache=distance_cache)
+        self.G = self.network.to_network()
+        self.nodes, self.index, self.offsets, self.targets, self.columns = criterion_columns(self.G)
+        self.criteria = tuple(criteria)
+        self.paths = {c: self.network.shortest_paths(c) for c in compiled}
+        self._rows = {}
+        self._transfer_inputs = None
+        self._lock = threading.Lock()
+        self.duplicates = self.G.duplicate_stops()
+        for group in self.duplicates:
+            logger.warning(f"Stops {group} share the same coordinates.")
+        logger.info(f"Planner ready in {time.perf_counter() - start_time:.4f} seconds.")
+
+    def shortest_path_tree(self, criteria, node):
+        """
+        Returns one node's shortest path tree for a criterion.
+
+        Parameters:
+            criteria (str): The optimization criteria.
+            node (str): The tree's root.
+
+        Returns:
+            tuple: Distances to every node (numpy.ndarray), predecessors (int32 numpy.ndarray).
+        """
+        paths = self.paths[criteria]
+        if node in paths.source_index:
+            i = paths.source_index[node]
+            return paths.matrix[i], paths.predecessors[i]
+        key = (criteria, node)
+        with self._lock:
+            row = self._rows.pop(key, None)
+            if row is not None:
+                self._rows[key] = row
+                return row
+        row = dijkstra(self.offsets, self.targets, self.columns[criteria], self.index[node])
+        with self._lock:
+            self._rows[key] = row
+            while len(self._rows) > ROW_CACHE_SIZE:
+                self._rows.pop(next(iter(self._rows)))
+        return row
+
+    def transfer_tree(self, node, penalty=None):
+        """
+        Returns one node's mode-aware search result, minimizing mode changes and time.
+
+        Parameters:
+            node (str): The search's source.
+            penalty (float, optional): Hours per mode change; lexicographic when None.
+
+        Returns:
+            tuple: The `transfer_search` result for the node.
+        """
+        key = (MODE_CHANGES, node, penalty)
+        with self._lock:
+            row = self._rows.pop(key, None)
+            if row is not None:
+                self._rows[key] = row
+                return row
+            if self._transfer_inputs is None:
+                self._transfer_inputs = transfer_inputs(self.G, 'time')
+        weights, modes, n_modes = self._transfer_inputs
+        row = transfer_search(self.G.offsets, self.G.targets, weights, modes, n_modes,
+                              self.G.index[node], penalty)
+        tracing.count('transfer_searches')
+        with self._lock:
+            self._rows[key] = row
+            while len(self._rows) > ROW_CACHE_SIZE:
+                self._rows.pop(next(iter(self._rows)))
+        return row
+
+    def snap(self, location, max_distance_km=MAX_SNAP_DISTANCE_KM):
+        """
+        Resolves a location to a node of the network.
+
+        Parameters:
+            location (str, list or dict): A node name, a (latitude, longitude)
+                pair or a dict with 'lat' and 'lon'.
+            max_distance_km (float): Farthest a coordinate may be from its nearest node.
+
+        Returns:
+            tuple: The node name and its distance from the location in km (0 for names).
+        """
+        if isinstance(location, str):
+            return location, 0.0
+        try:
+            if isinstance(location, dict):
+                lat, lon = float(location['lat']), float(location['lon'])
+            else:
+                lat, lon = map(float, location)
+        except (KeyError, TypeError, ValueError):
+            raise PlanningError(f"Invalid location: {location!r}") from None
+        nearest = self.G.nearest_nodes(lat, lon)
+        if not nearest or nearest[0][1] > max_distance_km:
+            raise PlanningError(f"No stop within {max_distance_km} km of ({lat}, {lon}).")
+        return nearest[0]
+
+    def plan(self, criteria='time', stops=None, start="Tarjan's Home",
+             max_snap_km=MAX_SNAP_DISTANCE_KM, transfer_penalty=None, **solver_options):
+        """
+        Plans one tour.
+
+        Parameters:
+            criteria (str): Optimization criteria ('time', 'cost', 'transfers' or
+                'mode_changes' for the fewest changes of travel mode).
+            stops (list, optional): Nodes or coordinates to visit; defaults to all
+                compiled terminals.
+            start (str or list): The node or coordinate the tour starts from.
+            max_snap_km (float): Farthest a coordinate may be snapped to a stop.
+            transfer_penalty (float, optional): For 'mode_changes', hours of travel
+                time a mode change is worth; by default the fewest mode changes
+                are found first and travel time only breaks ties.
+            **solver_options: Extra keyword arguments passed to `solve_tsp`.
+
+        Returns:
+            dict: The path, total weight, hop-level legs, solver report and the
+                stops that coordinates were snapped to.
+        """
+        if criteria != MODE_CHANGES and criteria not in self.paths:
+            raise PlanningError(f"Unknown optimization criteria: {criteria}")
+        if transfer_penalty is not None:
+            if isinstance(transfer_penalty, bool) or not isinstance(transfer_penalty, numbers.Real):
+                raise PlanningError(f"Invalid transfer penalty: {transfer_penalty!r}")
+            transfer_penalty = float(transfer_penalty)
+            # Negative penalties would be negative edge weights to the search
+            if not 0 <= transfer_penalty < np.inf:
+                raise PlanningError(f"Transfer penalty must be a non-negative number of hours, "
+                                    f"got {transfer_penalty}")
+        if stops is None:
+            stops = self.network.terminals
+        snapped = []
+        resolved = []
+        for location in [start] + list(stops):
+            node, distance = self.snap(location, max_snap_km)
+            if not isinstance(location, str):
+                snapped.append({'location': location, 'node': node, 'distance_km': distance})
+            resolved.append(node)
+        start, stops = resolved[0], resolved[1:]
+        terminals = [start] + [node for node in dict.fromkeys(stops) if node != start]
+        missing = [node for node in terminals if node not in self.index]
+        if missing:
+            raise PlanningError(f"Unknown nodes: {missing}")
+
+        if criteria == MODE_CHANGES:
+            rows = [self.transfer_tree(node, transfer_penalty) for node in terminals]
+            paths = transfer_paths(self.G, terminals, 'time', transfer_penalty, rows=rows)
+        else:
+            rows = [self.shortest_path_tree(criteria, node) for node in terminals]
+            paths = ShortestPaths(np.array([r[0] for r in rows]), self.nodes, self.index,
+                                  terminals, np.array([r[1] for r in rows]))
+        index = {node: i for i, node in enumerate(terminals)}
+        permutation, total_weight, report = solve_tsp(paths.submatrix(terminals),
+                                                      return_report=True, **solver_options)
+        optimal_path = adjust_route(permutation, index, terminals, start=start)
+        return {
+            'criteria': criteria,
+            'path': optimal_path,
+            'total_weight': total_weight,
+            'legs': expand_route(self.G, optimal_path, paths),
+            'report': report,
+            'snapped': snapped,
+        }
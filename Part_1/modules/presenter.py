@@ -1,26 +1,60 @@
 # presenter.py
+import csv
+import io
+import json
 from .logger_config import logger
 
 
-def log_total_weight(criteria, total_weight):
+def total_lines(criteria, total_weight, metrics=None, transfer_penalty=None):
+    """
+    Describes a tour's total weight for the selected optimization criteria.
+
+    Parameters:
+        criteria (str): The selected optimization criteria.
+        total_weight (float): The total weight calculated by the optimizer.
+        metrics (dict, optional): The tour's `route_metrics`.
+        transfer_penalty (float, optional): Hours per mode change 'mode_changes' was
+            planned with; the total weight is then penalized travel time.
+
+    Returns:
+        list: Lines of text.
+    """
+    if criteria == 'time':
+        return [f"Total travel time: {total_weight:.2f} hours"]
+    if criteria == 'cost':
+        return [f"Total travel cost: {total_weight:.2f} units"]
+    if criteria == 'transfers':
+        return [f"Total number of transfers: {total_weight:.0f}"]
+    if criteria == 'mode_changes':
+        lines = []
+        if transfer_penalty is not None:
+            lines.append(f"Penalized travel time: {total_weight:.2f} hours "
+                         f"({transfer_penalty:g} hours per mode change)")
+        if metrics is not None:
+            lines.append(f"Total number of mode changes: {metrics['mode_changes']}")
+        elif transfer_penalty is None:
+            # Lexicographic: whole mode changes plus a fraction for the time
+            lines.append(f"Total number of mode changes: {int(total_weight)}")
+        return lines
+    return [f"Total weight: {total_weight:.2f}"]
+
+
+def log_total_weight(criteria, total_weight, metrics=None, transfer_penalty=None):
     """
     Logs the total weight based on the selected optimization criteria.
     
     Parameters:
         criteria (str): The selected optimization criteria ('time', 'cost', 'transfers').
         total_weight (float): The total weight calculated by the optimizer.
+        metrics (dict, optional): The tour's `route_metrics`.
+        transfer_penalty (float, optional): Hours per mode change 'mode_changes' was planned with.
     """
-    if criteria == 'time':
-        logger.info(f"Total travel time: {total_weight:.2f} hours")
-    elif criteria == 'cost':
-        logger.info(f"Total travel cost: {total_weight:.2f} units")
-    elif criteria == 'transfers':
-        logger.info(f"Total number of transfers: {total_weight:.0f}")
-    else:
-        logger.info(f"Total weight: {total_weight:.2f}")
+    for line in total_lines(criteria, total_weight, metrics, transfer_penalty):
+        logger.info(line)
 
 
-def output_results(optimal_path, criteria, total_weight):
+def output_results(optimal_path, criteria, total_weight, legs=None, file=None, metrics=None,
+                   transfer_penalty=None):
     """
     Outputs the optimized route and associated metrics to the console.
     
@@ -28,16 +62,80 @@ def output_results(optimal_path, criteria, total_weight):
         optimal_path (list): The sequence of locations to visit.
         criteria (str): The selected optimization criteria.
         total_weight (float): The total weight corresponding to the criteria.
+        legs (list, optional): Legs from `expand_route` with the hops between stops.
+        file (file object, optional): Where to write instead of stdout.
+        metrics (dict, optional): The tour's `route_metrics`.
+        transfer_penalty (float, optional): Hours per mode change 'mode_changes' was planned with.
     """
-    print("\nOptimal path to visit all relatives:")
+    print("\nOptimal path to visit all relatives:", file=file)
     for node in optimal_path:
-        print(node)
-    print()
-    if criteria == 'time':
-        print(f"Total travel time: {total_weight:.2f} hours")
-    elif criteria == 'cost':
-        print(f"Total travel cost: {total_weight:.2f} units")
-    elif criteria == 'transfers':
-        print(f"Total number of transfers: {total_weight:.0f}")
-    else:
-        print(f"Total weight: {total_weight:.2f}")
+        print(node, file=file)
+    print(file=file)
+    if legs is not None:
+        print("Route details:", file=file)
+        for leg in legs:
+            print(f"{leg['from']} -> {leg['to']}", file=file)
+            for hop in leg['hops']:
+                print(f"    {hop['from']} -> {hop['to']} ({hop['travel_mode']})", file=file)
+        print(file=file)
+    for line in total_lines(criteria, total_weight, metrics, transfer_penalty):
+        print(line, file=file)
+
+
+def output_comparison(results, front=None, file=None):
+    """
+    Outputs the tours planned for several criteria with their cross-metrics.
+    
+    Parameters:
+        results (dict): Output of `multi_criteria.compare_criteria`.
+        front (list, optional): Criteria whose tours are Pareto-optimal.
+        file (file object, optional): Where to write instead of stdout.
+    """
+    print("\nRoute comparison across optimization criteria:", file=file)
+    print(f"{'Optimized for':<15}{'Time (h)':>12}{'Cost':>12}{'Edges':>8}{'Distance (km)':>16}",
+          file=file)
+    for criteria, result in results.items():
+        metrics = result['metrics']
+        marker = ' *' if front is not None and criteria in front else ''
+        print(f"{criteria:<15}{metrics['time']:>12.2f}{metrics['cost']:>12.2f}"
+              f"{metrics['transfers']:>8d}{metrics['distance']:>16.2f}{marker}", file=file)
+    if front is not None:
+        print("* Pareto-optimal among the compared tours", file=file)
+
+
+def results_to_json(results, timings=None):
+    """
+    Serializes planned routes to JSON.
+    
+    Parameters:
+        results (list): Plan dicts with 'criteria', 'path', 'total_weight' and 'legs'.
+        timings (dict, optional): Stage timings in seconds to include.
+        
+    Returns:
+        str: The JSON document.
+    """
+    document = {'results': results}
+    if timings is not None:
+        document['timings'] = timings
+    return json.dumps(document, indent=2)
+
+
+def results_to_csv(results):
+    """
+    Serializes planned routes to CSV, one row per hop travelled.
+    
+    Parameters:
+        results (list): Plan dicts with 'criteria', 'path', 'total_weight' and 'legs'.
+        
+    Returns:
+        str: The CSV document.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['criteria', 'total_weight', 'leg', 'from', 'to', 'travel_mode'])
+    for result in results:
+        for leg_number, leg in enumerate(result['legs'], start=1):
+            for hop in leg['hops']:
+                writer.writerow([result['criteria'], f"{result['total_weight']:.6f}", leg_number,
+                                 hop['from'], hop['to'], hop['travel_mode']])
+    return buffer.getvalue()
@@ -0,0 +1,155 @@
+# service.py
+import argparse
+import json
+import os
+import socketserver
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .network_cache import DEFAULT_CACHE_DIR
+from .planner import Planner, PlanningError
+from .logger_config import logger
+
+DEFAULT_PORT = 8765
+
+
+def handle_request(planner, request):
+    """
+    Serves one decoded JSON request.
+
+    Parameters:
+        planner (Planner): The resident planner.
+        request (dict): Request with optional 'criteria', 'stops', 'start' and
+            'transfer_penalty'.
+
+    Returns:
+        tuple: HTTP-style status code, response dict.
+    """
+    start_time = time.perf_counter()
+    try:
+        if not isinstance(request, dict):
+            raise PlanningError("Request must be a JSON object.")
+        result = planner.plan(criteria=request.get('criteria', 'time'),
+                              stops=request.get('stops'),
+                              start=request.get('start', "Tarjan's Home"),
+                              transfer_penalty=request.get('transfer_penalty'))
+    except PlanningError as e:
+        return 400, {'error': str(e)}
+    except Exception as e:
+        logger.exception(f"Planning request failed: {e}")
+        return 500, {'error': str(e)}
+    result['elapsed'] = time.perf_counter() - start_time
+    logger.info(f"Served plan for {result['criteria']} in {result['elapsed']:.4f} seconds.")
+    return 200, result
+
+
+class _HTTPHandler(BaseHTTPRequestHandler):
+    """POST /plan with a JSON body; GET /health."""
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send(200, {'status': 'ok', 'nodes': len(self.server.planner.nodes)})
+        else:
+            self._send(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if self.path != '/plan':
+            self._send(404, {'error': 'not found'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError as e:
+            self._send(400, {'error': f"Invalid JSON: {e}"})
+            return
+        status, body = self.server.pool.submit(handle_request, self.server.planner, request).result()
+        self._send(status, body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+class _UnixHandler(socketserver.StreamRequestHandler):
+    """One JSON request per line, answered with one JSON line."""
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                body = {'error': f"Invalid JSON: {e}"}
+            else:
+                _, body = self.server.pool.submit(handle_request, self.server.planner, request).result()
+            self.wfile.write(json.dumps(body).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class _ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def create_server(planner, host='127.0.0.1', port=DEFAULT_PORT, unix_socket=None, workers=4):
+    """
+    Creates the planning server without starting it.
+
+    Parameters:
+        planner (Planner): The resident planner.
+        host (str): Interface to bind the HTTP server to.
+        port (int): TCP port for the HTTP server; 0 picks a free port.
+        unix_socket (str, optional): Serve line-delimited JSON on this Unix socket instead.
+        workers (int): Size of the pool that runs planning requests.
+
+    Returns:
+        socketserver.BaseServer: The server; call `serve_forever()` to run it.
+    """
+    if unix_socket is not None:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        server = _ThreadingUnixServer(unix_socket, _UnixHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), _HTTPHandler)
+        server.daemon_threads = True
+    server.planner = planner
+    server.pool = ThreadPoolExecutor(max_workers=workers)
+    return server
+
+
+def main(argv=None):
+    """
+    Runs the planning daemon until interrupted.
+    """
+    parser = argparse.ArgumentParser(description="Resident TarjanPlanner service.")
+    parser.add_argument('--routes', default='data/routes.json', help="Routes JSON file.")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="Compiled network cache.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix-socket', help="Serve on a Unix socket instead of HTTP.")
+    parser.add_argument('--workers', type=int, default=4, help="Concurrent planning requests.")
+    args = parser.parse_args(argv)
+
+    planner = Planner(args.routes, cache_dir=args.cache_dir)
+    server = create_server(planner, args.host, args.port, args.unix_socket, args.workers)
+    where = args.unix_socket or f"http://{args.host}:{server.server_address[1]}"
+    logger.info(f"Planning service listening on {where}.")
+    print(f"Planning service listening on {where}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
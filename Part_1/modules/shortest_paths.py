@@ -0,0 +1,374 @@
+# shortest_paths.py
+import heapq
+import math
+from collections.abc import Mapping
+import numpy as np
+from . import tracing
+from .logger_config import logger
+
+# A Python heap operation costs roughly this many vectorized NumPy flops;
+# used to choose between Floyd-Warshall and repeated Dijkstra.
+_PYTHON_OP_COST = 50
+
+
+def graph_to_arrays(G, weight='weight'):
+    """
+    Extracts the node order and a CSR adjacency structure from a graph.
+
+    Each undirected edge is stored in both directions.
+
+    Parameters:
+        G (Network or networkx.Graph): The transport network.
+        weight (str): Edge attribute used as the weight.
+
+    Returns:
+        tuple: List of nodes, index mapping (dict), CSR offsets (numpy.ndarray),
+            CSR targets (numpy.ndarray), CSR weights (numpy.ndarray).
+    """
+    nodes, index, offsets, targets, columns = graph_to_columns(G, (weight,))
+    return nodes, index, offsets, targets, columns[weight]
+
+
+def graph_to_columns(G, attributes):
+    """
+    Extracts a CSR adjacency structure with one weight column per edge attribute.
+
+    The structure is shared by all columns, so shortest paths for several
+    criteria can be computed without rebuilding it.
+
+    Parameters:
+        G (Network or networkx.Graph): The transport network.
+        attributes (tuple): Edge attributes to extract; missing values default to 1.
+
+    Returns:
+        tuple: List of nodes, index mapping (dict), CSR offsets (numpy.ndarray),
+            CSR targets (numpy.ndarray), dict of attribute -> CSR weights (numpy.ndarray).
+    """
+    from .network import Network
+    if isinstance(G, Network):
+        # Already in CSR form; only the weight columns need gathering
+        return G.nodes, G.index, G.offsets, G.targets, \
+            {attribute: G.csr_weights(attribute) for attribute in attributes}
+    nodes = list(G.nodes())
+    index = {node: i for i, node in enumerate(nodes)}
+    m = G.number_of_edges()
+    src = np.empty(m, dtype=np.int32)
+    dst = np.empty(m, dtype=np.int32)
+    values = {attribute: np.empty(m, dtype=np.float64) for attribute in attributes}
+    for k, (u, v, data) in enumerate(G.edges(data=True)):
+        src[k] = index[u]
+        dst[k] = index[v]
+        for attribute, column in values.items():
+            column[k] = data.get(attribute, 1)
+    if not G.is_directed():
+        src, dst = np.concatenate((src, dst)), np.concatenate((dst, src))
+        values = {attribute: np.concatenate((column, column)) for attribute, column in values.items()}
+    order, offsets = csr_order(len(nodes), src)
+    targets = dst[order].astype(np.int32)
+    columns = {attribute: column[order] for attribute, column in values.items()}
+    return nodes, index, offsets, targets, columns
+
+
+def csr_order(n, src):
+    """
+    Computes the edge permutation and row offsets of a CSR structure.
+
+    Parameters:
+        n (int): Number of nodes.
+        src (numpy.ndarray): Edge source indices.
+
+    Returns:
+        tuple: Edge order sorting by source (numpy.ndarray), offsets (int32, length n + 1).
+    """
+    order = np.argsort(src, kind='stable')
+    counts = np.bincount(src, minlength=n)
+    offsets = np.zeros(n + 1, dtype=np.int32)
+    np.cumsum(counts, out=offsets[1:])
+    return order, offsets
+
+
+def build_csr(n, src, dst, w):
+    """
+    Builds a compressed sparse row adjacency structure from edge arrays.
+
+    Parameters:
+        n (int): Number of nodes.
+        src (numpy.ndarray): Edge source indices.
+        dst (numpy.ndarray): Edge target indices.
+        w (numpy.ndarray): Edge weights.
+
+    Returns:
+        tuple: Offsets (int32, length n + 1), targets (int32), weights (float64).
+    """
+    order, offsets = csr_order(n, src)
+    return offsets, dst[order].astype(np.int32), w[order].astype(np.float64)
+
+
+def dense_adjacency(n, offsets, targets, weights):
+    """
+    Builds a dense weight matrix with infinity for missing edges and zero on the diagonal.
+
+    Parameters:
+        n (int): Number of nodes.
+        offsets, targets, weights (numpy.ndarray): CSR adjacency structure.
+
+    Returns:
+        numpy.ndarray: The n x n weight matrix.
+    """
+    W = np.full((n, n), np.inf)
+    rows = np.repeat(np.arange(n), np.diff(offsets))
+    # Parallel edges keep their smallest weight
+    np.minimum.at(W, (rows, targets), weights)
+    np.fill_diagonal(W, 0.0)
+    return W
+
+
+def floyd_warshall_numpy(W, return_predecessors=False):
+    """
+    Runs Floyd-Warshall on a dense weight matrix.
+
+    Each pivot is a single vectorized rank-1 min-plus update, so the only
+    Python-level loop is over the n pivots.
+
+    Parameters:
+        W (numpy.ndarray): The n x n weight matrix.
+        return_predecessors (bool): Also track the predecessor of each node on its path.
+
+    Returns:
+        numpy.ndarray: The n x n shortest path length matrix, and if requested
+            an int32 matrix where entry [i, j] is the node before j on the
+            path from i (-1 when there is none).
+    """
+    D = np.array(W, dtype=np.float64, copy=True)
+    n = len(D)
+    if not return_predecessors:
+        for k in range(n):
+            np.minimum(D, D[:, k, None] + D[None, k, :], out=D)
+        return D
+
+    P = np.where(np.isfinite(D), np.arange(n, dtype=np.int32)[:, None], -1).astype(np.int32)
+    np.fill_diagonal(P, -1)
+    for k in range(n):
+        candidate = D[:, k, None] + D[None, k, :]
+        improved = candidate < D
+        np.copyto(D, candidate, where=improved)
+        np.copyto(P, np.broadcast_to(P[k], P.shape), where=improved)
+    return D, P
+
+
+def dijkstra(offsets, targets, weights, source):
+    """
+    Runs Dijkstra's algorithm from one source over a CSR adjacency structure.
+
+    Parameters:
+        offsets, targets, weights (numpy.ndarray): CSR adjacency structure.
+        source (int): Index of the source node.
+
+    Returns:
+        tuple: Shortest path lengths from the source to every node (numpy.ndarray),
+            predecessor of every node on its path (int32 numpy.ndarray, -1 for none).
+    """
+    n = len(offsets) - 1
+    dist = [math.inf] * n
+    pred = [-1] * n
+    dist[source] = 0.0
+    offsets = offsets.tolist()
+    targets = targets.tolist()
+    weights = weights.tolist()
+    done = [False] * n
+    heap = [(0.0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if done[u]:
+            continue
+        done[u] = True
+        for e in range(offsets[u], offsets[u + 1]):
+            v = targets[e]
+            nd = d + weights[e]
+            if nd < dist[v]:
+                dist[v] = nd
+                pred[v] = u
+                heapq.heappush(heap, (nd, v))
+    return np.array(dist), np.array(pred, dtype=np.int32)
+
+
+def choose_method(n, num_edges, num_sources):
+    """
+    Chooses the cheaper all-pairs strategy for a graph.
+
+    Parameters:
+        n (int): Number of nodes.
+        num_edges (int): Number of directed adjacency entries.
+        num_sources (int): Number of source nodes needed.
+
+    Returns:
+        str: 'floyd_warshall' or 'dijkstra'.
+    """
+    if n == 0:
+        return 'floyd_warshall'
+    dijkstra_cost = num_sources * (num_edges + n) * max(math.log2(n), 1) * _PYTHON_OP_COST
+    return 'dijkstra' if dijkstra_cost < n ** 3 else 'floyd_warshall'
+
+
+class _DistanceRow(Mapping):
+    """Read-only mapping view of one row of a ShortestPaths matrix."""
+
+    __slots__ = ('_row', '_index')
+
+    def __init__(self, row, index):
+        self._row = row
+        self._index = index
+
+    def __getitem__(self, node):
+        return float(self._row[self._index[node]])
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+
+class ShortestPaths(Mapping):
+    """
+    Shortest path lengths from a set of source nodes to every node, stored as an array.
+
+    Supports the nested-dict access pattern `paths[u][v]` of `nx.floyd_warshall`
+    without materializing the dict; use `to_dict()` when a real dict is needed.
+
+    Attributes:
+        matrix (numpy.ndarray): Array of shape (len(sources), len(nodes)).
+        predecessors (numpy.ndarray): int32 array of the same shape holding the
+            column index of the node before each target on its path, or -1.
+        nodes (list): All nodes, in column order.
+        index (dict): Mapping of node names to column indices.
+        sources (list): Source nodes, in row order.
+        source_index (dict): Mapping of source node names to row indices.
+    """
+
+    def __init__(self, matrix, nodes, index, sources, predecessors=None):
+        self.matrix = matrix
+        self.predecessors = predecessors
+        self.nodes = nodes
+        self.index = index
+        self.sources = sources
+        self.source_index = {node: i for i, node in enumerate(sources)}
+
+    def __getitem__(self, node):
+        return _DistanceRow(self.matrix[self.source_index[node]], self.index)
+
+    def __iter__(self):
+        return iter(self.sources)
+
+    def __len__(self):
+        return len(self.sources)
+
+    def submatrix(self, nodes):
+        """
+        Returns the distances between the given nodes, which must all be sources.
+
+        Parameters:
+            nodes (list): Nodes in the desired row and column order.
+
+        Returns:
+            numpy.ndarray: Array of shape (len(nodes), len(nodes)).
+        """
+        rows = np.array([self.source_index[node] for node in nodes], dtype=np.intp)
+        cols = np.array([self.index[node] for node in nodes], dtype=np.intp)
+        return self.matrix[np.ix_(rows, cols)]
+
+    def path(self, source, target):
+        """
+        Reconstructs the node sequence of the shortest path between two nodes.
+
+        One of the two nodes must be a source; for undirected graphs a path
+        to a source is returned by reversing the path from it.
+
+        Parameters:
+            source: The start node.
+            target: The end node.
+
+        Returns:
+            list: Nodes from source to target, inclusive.
+        """
+        if self.predecessors is None:
+            raise ValueError("Shortest paths were computed without predecessors.")
+        if source not in self.source_index:
+            return self.path(target, source)[::-1]
+        preds = self.predecessors[self.source_index[source]]
+        start = self.index[source]
+        current = self.index[target]
+        hops = [current]
+        while current != start:
+            current = int(preds[current])
+            if current < 0:
+                raise ValueError(f"No path between {source} and {target}.")
+            hops.append(current)
+        return [self.nodes[i] for i in reversed(hops)]
+
+    def to_dict(self):
+        """
+        Materializes the nested dict of path lengths.
+
+        Returns:
+            dict: Mapping of source -> {target: length}.
+        """
+        return {u: dict(zip(self.nodes, row.tolist())) for u, row in zip(self.sources, self.matrix)}
+
+
+def shortest_paths(G, sources=None, weight='weight', method='auto'):
+    """
+    Computes shortest path lengths from the given sources to every node.
+
+    Parameters:
+        G (Network or networkx.Graph): The transport network.
+        sources (list, optional): Source nodes; defaults to all nodes.
+        weight (str): Edge attribute used as the weight.
+        method (str): 'auto', 'floyd_warshall' or 'dijkstra'.
+
+    Returns:
+        ShortestPaths: The shortest path lengths.
+    """
+    nodes, index, offsets, targets, weights = graph_to_arrays(G, weight)
+    return shortest_paths_csr(nodes, index, offsets, targets, weights, sources, method)
+
+
+@tracing.traced()
+def shortest_paths_csr(nodes, index, offsets, targets, weights, sources=None, method='auto'):
+    """
+    Computes shortest path lengths from the given sources over a CSR adjacency structure.
+
+    Parameters:
+        nodes (list): All nodes, in index order.
+        index (dict): Mapping of node names to indices.
+        offsets, targets, weights (numpy.ndarray): CSR adjacency structure.
+        sources (list, optional): Source nodes; defaults to all nodes.
+        method (str): 'auto', 'floyd_warshall' or 'dijkstra'.
+
+    Returns:
+        ShortestPaths: The shortest path lengths.
+    """
+    n = len(nodes)
+    if sources is None:
+        sources = nodes
+    source_ids = [index[s] for s in sources]
+
+    if method == 'auto':
+        method = choose_method(n, len(targets), len(source_ids))
+    if method == 'floyd_warshall':
+        tracing.count('floyd_warshall_runs')
+        D, P = floyd_warshall_numpy(dense_adjacency(n, offsets, targets, weights),
+                                    return_predecessors=True)
+        if not (len(source_ids) == n and source_ids == list(range(n))):
+            D, P = D[source_ids], P[source_ids]
+        matrix, predecessors = D, P
+    elif method == 'dijkstra':
+        matrix = np.empty((len(source_ids), n))
+        predecessors = np.empty((len(source_ids), n), dtype=np.int32)
+        for row, s in enumerate(source_ids):
+            matrix[row], predecessors[row] = dijkstra(offsets, targets, weights, s)
+        tracing.count('dijkstra_runs', len(source_ids))
+    else:
+        raise ValueError(f"Unknown shortest path method: {method}")
+    logger.debug(f"Shortest paths via {method}: {len(source_ids)} sources, {n} nodes")
+    return ShortestPaths(matrix, nodes, index, list(sources), predecessors)
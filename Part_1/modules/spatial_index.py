@@ -0,0 +1,224 @@
+# spatial_index.py
+import heapq
+import numpy as np
+from .geodesy import EARTH_RADIUS_KM
+
+# Points per leaf of the KD-tree; leaves are scanned with one vectorized step
+LEAF_SIZE = 16
+
+
+def unit_vectors(coordinates):
+    """
+    Converts (latitude, longitude) pairs to points on the unit sphere.
+
+    The straight-line (chord) distance between two such points grows
+    monotonically with their great-circle distance, so nearest neighbours
+    can be searched with plain Euclidean bounds.
+
+    Parameters:
+        coordinates (numpy.ndarray): Array of shape (n, 2) in degrees.
+
+    Returns:
+        numpy.ndarray: Array of shape (n, 3).
+    """
+    coordinates = np.radians(np.asarray(coordinates, dtype=float).reshape(-1, 2))
+    lat, lon = coordinates[:, 0], coordinates[:, 1]
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def chord_to_km(chord):
+    """Converts chord lengths on the unit sphere to great-circle kilometers."""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2, 0.0, 1.0))
+
+
+def km_to_chord(distance_km):
+    """Converts great-circle kilometers to chord lengths on the unit sphere."""
+    return 2 * np.sin(min(distance_km / (2 * EARTH_RADIUS_KM), np.pi / 2))
+
+
+def duplicate_locations(coordinates):
+    """
+    Groups the points that have identical coordinates.
+
+    Parameters:
+        coordinates (numpy.ndarray): Array of shape (n, 2).
+
+    Returns:
+        list: Lists of point ids, one per location shared by several points.
+    """
+    coordinates = np.asarray(coordinates, dtype=float).reshape(-1, 2)
+    order = np.lexsort((coordinates[:, 1], coordinates[:, 0]))
+    ordered = coordinates[order]
+    starts = np.ones(len(order), dtype=bool)
+    starts[1:] = np.any(ordered[1:] != ordered[:-1], axis=1)
+    groups = np.split(order, np.flatnonzero(starts)[1:])
+    return [sorted(group.tolist()) for group in groups if len(group) > 1]
+
+
+class SpatialIndex:
+    """
+    KD-tree over node coordinates for nearest-k and within-radius queries.
+
+    The tree is stored in flat arrays: each tree node has a range of the
+    permuted point order and a bounding box, and leaves are scanned with
+    NumPy. Distances are great-circle distances on the spherical Earth, the
+    same model as the 'haversine' distance method.
+
+    Attributes:
+        points (numpy.ndarray): Unit-sphere points, shape (n, 3).
+        order (numpy.ndarray): Point ids in tree order.
+    """
+
+    def __init__(self, coordinates, leaf_size=LEAF_SIZE):
+        self.coordinates = np.asarray(coordinates, dtype=float).reshape(-1, 2)
+        self.points = unit_vectors(self.coordinates)
+        n = len(self.points)
+        self.order = np.arange(n)
+        lo, hi, left, right, box_min, box_max = [], [], [], [], [], []
+
+        def new_node(start, stop):
+            pts = self.points[self.order[start:stop]]
+            lo.append(start)
+            hi.append(stop)
+            left.append(-1)
+            right.append(-1)
+            box_min.append(pts.min(axis=0) if len(pts) else np.zeros(3))
+            box_max.append(pts.max(axis=0) if len(pts) else np.zeros(3))
+            return len(lo) - 1
+
+        stack = [new_node(0, n)]
+        while stack:
+            node = stack.pop()
+            start, stop = lo[node], hi[node]
+            if stop - start <= leaf_size:
+                continue
+            dim = int(np.argmax(box_max[node] - box_min[node]))
+            mid = (start + stop) // 2
+            ids = self.order[start:stop]
+            ids = ids[np.argpartition(self.points[ids, dim], mid - start)]
+            self.order[start:stop] = ids
+            left[node] = new_node(start, mid)
+            right[node] = new_node(mid, stop)
+            stack.extend((left[node], right[node]))
+
+        self._lo = lo
+        self._hi = hi
+        self._left = left
+        self._right = right
+        self._box_min = np.array(box_min).reshape(-1, 3)
+        self._box_max = np.array(box_max).reshape(-1, 3)
+
+    def __len__(self):
+        return len(self.points)
+
+    def _box_distance2(self, node, q):
+        """Squared distance from a point to a tree node's bounding box."""
+        gap = np.maximum(self._box_min[node] - q, 0.0) + np.maximum(q - self._box_max[node], 0.0)
+        return float(gap @ gap)
+
+    def nearest(self, lat, lon, k=1):
+        """
+        Finds the k nodes closest to a coordinate.
+
+        Parameters:
+            lat, lon (float): The query coordinate in degrees.
+            k (int): Number of nodes to return.
+
+        Returns:
+            list: (node id, distance in km) tuples, closest first.
+        """
+        if len(self.points) == 0 or k <= 0:
+            return []
+        q = unit_vectors([(lat, lon)])[0]
+        best = []  # max-heap of (-squared chord, id)
+        queue = [(0.0, 0)]
+        while queue:
+            bound, node = heapq.heappop(queue)
+            if len(best) == k and bound > -best[0][0]:
+                break
+            if self._left[node] < 0:
+                ids = self.order[self._lo[node]:self._hi[node]]
+                diff = self.points[ids] - q
+                for d2, i in zip(np.einsum('ij,ij->i', diff, diff).tolist(), ids.tolist()):
+                    if len(best) < k:
+                        heapq.heappush(best, (-d2, i))
+                    elif d2 < -best[0][0]:
+                        heapq.heapreplace(best, (-d2, i))
+                continue
+            for child in (self._left[node], self._right[node]):
+                d2 = self._box_distance2(child, q)
+                if len(best) < k or d2 <= -best[0][0]:
+                    heapq.heappush(queue, (d2, child))
+        found = sorted((-d2, i) for d2, i in best)
+        return [(i, float(chord_to_km(np.sqrt(d2)))) for d2, i in found]
+
+    def within(self, lat, lon, radius_km):
+        """
+        Finds all nodes within a great-circle radius of a coordinate.
+
+        Parameters:
+            lat, lon (float): The query coordinate in degrees.
+            radius_km (float): The search radius.
+
+        Returns:
+            list: (node id, distance in km) tuples, closest first.
+        """
+        if len(self.points) == 0:
+            return []
+        q = unit_vectors([(lat, lon)])[0]
+        r2 = km_to_chord(radius_km) ** 2
+        hits_ids, hits_d2 = [], []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            if self._box_distance2(node, q) > r2:
+                continue
+            if self._left[node] < 0:
+                ids = self.order[self._lo[node]:self._hi[node]]
+                diff = self.points[ids] - q
+                d2 = np.einsum('ij,ij->i', diff, diff)
+                keep = d2 <= r2
+                hits_ids.append(ids[keep])
+                hits_d2.append(d2[keep])
+            else:
+                stack.extend((self._left[node], self._right[node]))
+        if not hits_ids:
+            return []
+        ids = np.concatenate(hits_ids)
+        distances = chord_to_km(np.sqrt(np.concatenate(hits_d2)))
+        ranked = np.argsort(distances, kind='stable')
+        return list(zip(ids[ranked].tolist(), distances[ranked].tolist()))
+
+    def duplicates(self, tolerance_km=0.0):
+        """
+        Groups nodes that share a location.
+
+        Parameters:
+            tolerance_km (float): Nodes closer than this count as the same
+                location; 0 means identical coordinates.
+
+        Returns:
+            list: Lists of node ids, one per location shared by several nodes.
+        """
+        if tolerance_km <= 0:
+            return duplicate_locations(self.coordinates)
+        n = len(self.coordinates)
+
+        # Union-find over the pairs closer than the tolerance
+        parent = list(range(n))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i, (lat, lon) in enumerate(self.coordinates.tolist()):
+            for j, _ in self.within(lat, lon, tolerance_km):
+                a, b = find(i), find(j)
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+        groups = {}
+        for i in range(n):
+            groups.setdefault(find(i), []).append(i)
+        return [group for group in groups.values() if len(group) > 1]
@@ -0,0 +1,149 @@
+# synthetic.py
+import json
+import numpy as np
+from .geodesy import EARTH_RADIUS_KM
+
+# Speed (km/h) and cost per km of each travel mode, as in data/routes.json
+MODES = {
+    'bus': (40, 2),
+    'bicycle': (15, 0),
+    'walking': (5, 0),
+}
+
+DEFAULT_MODE_MIX = {'bus': 0.3, 'bicycle': 0.4, 'walking': 0.3}
+
+# Rows of the distance matrix handled at once when finding nearest neighbours
+NEIGHBOUR_CHUNK = 512
+
+
+def node_names(n, stops, start="Tarjan's Home"):
+    """
+    Names the nodes of a synthetic network.
+
+    Parameters:
+        n (int): Total number of nodes.
+        stops (int): Number of relatives the tour must visit.
+        start (str): Name of the starting point.
+
+    Returns:
+        list: The start, then 'Relative_1'..'Relative_<stops>', then 'Stop_<k>' nodes.
+    """
+    if stops >= n:
+        raise ValueError(f"A network of {n} nodes cannot hold {stops} stops and a start.")
+    names = [start] + [f"Relative_{i}" for i in range(1, stops + 1)]
+    return names + [f"Stop_{i}" for i in range(1, n - stops)]
+
+
+def _planar(coordinates):
+    """Projects coordinates onto a local plane in km, good enough to pick neighbours."""
+    lat = np.radians(coordinates[:, 0])
+    lon = np.radians(coordinates[:, 1])
+    x = lon * np.cos(lat.mean()) * EARTH_RADIUS_KM
+    y = lat * EARTH_RADIUS_KM
+    return np.column_stack([x, y])
+
+
+def _spanning_edges(points, rng):
+    """Connects each node to its nearest earlier node in a random order, giving a tree."""
+    order = rng.permutation(len(points))
+    edges = np.empty((len(points) - 1, 2), dtype=np.int64)
+    for k in range(1, len(order)):
+        earlier = order[:k]
+        d = np.einsum('ij,ij->i', points[earlier] - points[order[k]], points[earlier] - points[order[k]])
+        edges[k - 1] = (earlier[np.argmin(d)], order[k])
+    return edges
+
+
+def _neighbour_edges(points, k):
+    """Links every node to its k nearest neighbours."""
+    n = len(points)
+    k = min(k, n - 1)
+    edges = []
+    for lo in range(0, n, NEIGHBOUR_CHUNK):
+        block = points[lo:lo + NEIGHBOUR_CHUNK]
+        d = ((block[:, None, :] - points[None, :, :]) ** 2).sum(axis=2)
+        d[np.arange(len(block)), np.arange(lo, lo + len(block))] = np.inf
+        nearest = np.argpartition(d, k - 1, axis=1)[:, :k]
+        sources = np.repeat(np.arange(lo, lo + len(block)), k)
+        edges.append(np.column_stack([sources, nearest.ravel()]))
+    return np.concatenate(edges)
+
+
+def generate_routes(n_nodes=100, degree=4.0, stops=10, mode_mix=None, seed=0,
+                    center=(37.55, 126.98), spread_km=15.0):
+    """
+    Generates a connected synthetic transport network in the routes.json schema.
+
+    Nodes are scattered around `center`; a random spanning tree keeps the
+    network connected and the remaining edges join nearby nodes, so routes
+    look like a city network rather than a random graph.
+
+    Parameters:
+        n_nodes (int): Number of nodes, including the start and the stops.
+        degree (float): Average number of routes per node (edge density).
+        stops (int): Number of relatives the tour must visit.
+        mode_mix (dict, optional): Travel mode -> share of routes; modes must be in MODES.
+        seed (int): Random seed, so a size always produces the same network.
+        center (tuple): Latitude and longitude the nodes are scattered around.
+        spread_km (float): Standard deviation of the node scatter in km.
+
+    Returns:
+        list: Route records accepted by `parse_json` and `iter_routes`.
+    """
+    if n_nodes < 2:
+        raise ValueError("A network needs at least two nodes.")
+    mode_mix = DEFAULT_MODE_MIX if mode_mix is None else mode_mix
+    unknown = set(mode_mix) - set(MODES)
+    if unknown:
+        raise ValueError(f"Unknown travel modes: {sorted(unknown)}")
+    rng = np.random.default_rng(seed)
+    names = node_names(n_nodes, stops)
+
+    offsets_km = rng.normal(scale=spread_km, size=(n_nodes, 2))
+    lat = center[0] + np.degrees(offsets_km[:, 0] / EARTH_RADIUS_KM)
+    lon = center[1] + np.degrees(offsets_km[:, 1] / (EARTH_RADIUS_KM * np.cos(np.radians(center[0]))))
+    coordinates = np.round(np.column_stack([lat, lon]), 6)
+    points = _planar(coordinates)
+
+    tree = _spanning_edges(points, rng)
+    target = max(int(round(n_nodes * degree / 2)), len(tree))
+    candidates = np.sort(_neighbour_edges(points, int(np.ceil(degree))), axis=1)
+    candidates = np.unique(candidates, axis=0)
+    tree = np.sort(tree, axis=1)
+    # Drop candidates already in the tree, then sample the rest up to the target count
+    tree_keys = tree[:, 0] * n_nodes + tree[:, 1]
+    candidates = candidates[~np.isin(candidates[:, 0] * n_nodes + candidates[:, 1], tree_keys)]
+    extra = min(target - len(tree), len(candidates))
+    chosen = candidates[rng.choice(len(candidates), size=extra, replace=False)]
+    edges = np.concatenate([tree, chosen])
+
+    modes = list(mode_mix)
+    shares = np.array([mode_mix[m] for m in modes], dtype=float)
+    edge_modes = rng.choice(len(modes), size=len(edges), p=shares / shares.sum())
+
+    routes = []
+    for r, ((u, v), m) in enumerate(zip(edges.tolist(), edge_modes.tolist()), start=1):
+        speed, cost = MODES[modes[m]]
+        routes.append({
+            'routeName': f"route{r}",
+            'position_1': names[u],
+            'position1_coordinates': coordinates[u].tolist(),
+            'position_2': names[v],
+            'position2_coordinates': coordinates[v].tolist(),
+            'travel_mode': modes[m],
+            'travel_speed': speed,
+            'cost_per_km': cost,
+        })
+    return routes
+
+
+def write_routes(routes, filename):
+    """
+    Writes route records to a JSON file.
+
+    Parameters:
+        routes (list): Route records.
+        filename (str): Destination path.
+    """
+    with open(filename, 'w') as f:
+        json.dump(routes, f)
@@ -0,0 +1,279 @@
+# tracing.py
+import json
+import os
+import threading
+import time
+import tracemalloc
+from functools import wraps
+
+# Checked on every traced call; while False spans and counters do nothing
+_enabled = False
+_memory = False
+
+_lock = threading.Lock()
+_local = threading.local()
+_epoch = time.perf_counter()
+_spans = []
+_counters = {}
+_gauges = {}
+
+# Prefix of every Prometheus metric name
+METRIC_PREFIX = 'tarjan'
+
+
+class _NullSpan:
+    """Span returned while tracing is disabled."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """A timed, optionally memory-profiled region of the pipeline."""
+    __slots__ = ('name', 'attrs', 'start', 'parent', 'depth', 'base', 'peak')
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        """Attaches attributes, such as sizes known only inside the span."""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        self.parent = stack[-1] if stack else None
+        self.depth = len(stack)
+        if _memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # reset_peak() is global, so fold the peak so far into the enclosing span first
+            if self.parent is not None:
+                self.parent.peak = max(self.parent.peak, peak)
+            tracemalloc.reset_peak()
+            self.base = self.peak = current
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        _local.stack.pop()
+        record = {
+            'name': self.name,
+            'start': self.start - _epoch,
+            'duration': end - self.start,
+            'depth': self.depth,
+            'parent': self.parent.name if self.parent is not None else None,
+            'thread': threading.current_thread().name,
+        }
+        if _memory:
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            record['peak_bytes'] = self.peak - self.base
+            if self.parent is not None:
+                self.parent.peak = max(self.parent.peak, self.peak)
+        if exc_type is not None:
+            record['error'] = exc_type.__name__
+        if self.attrs:
+            record['attrs'] = self.attrs
+        with _lock:
+            _spans.append(record)
+        return False
+
+
+def enable(memory=False):
+    """
+    Turns tracing on.
+
+    Parameters:
+        memory (bool): Also record each span's peak allocation with tracemalloc,
+            which slows Python-heavy code down noticeably.
+    """
+    global _enabled, _memory
+    _enabled = True
+    _memory = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    """Turns tracing off; recorded spans and counters are kept until `reset`."""
+    global _enabled, _memory
+    if _memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _enabled = _memory = False
+
+
+def is_enabled():
+    """Returns True while tracing is on."""
+    return _enabled
+
+
+def reset():
+    """Discards all recorded spans, counters and gauges."""
+    global _epoch
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+        _gauges.clear()
+        _epoch = time.perf_counter()
+
+
+def span(name, **attrs):
+    """
+    Times a block of code.
+
+    Parameters:
+        name (str): Span name, e.g. the function being timed.
+        **attrs: Attributes recorded with the span.
+
+    Returns:
+        Context manager; its `set(**attrs)` adds attributes from inside the block.
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, attrs)
+
+
+def traced(name=None):
+    """
+    Decorator that records a span around every call of a function.
+
+    Parameters:
+        name (str, optional): Span name; defaults to the function's name.
+    """
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(span_name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, value=1):
+    """
+    Adds to a counter, such as edges built or solver moves.
+
+    Parameters:
+        name (str): Counter name.
+        value (int or float): Amount to add.
+    """
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def gauge(name, value):
+    """
+    Sets a gauge to its latest value, such as the distance matrix size.
+
+    Parameters:
+        name (str): Gauge name.
+        value (int or float): Current value.
+    """
+    if not _enabled:
+        return
+    with _lock:
+        _gauges[name] = value
+
+
+def summary():
+    """
+    Aggregates the recorded spans by name.
+
+    Returns:
+        dict: Span name -> calls, total_seconds, max_seconds and, with memory
+            tracing, the largest peak_bytes.
+    """
+    totals = {}
+    with _lock:
+        spans = list(_spans)
+    for record in spans:
+        entry = totals.setdefault(record['name'], {'calls': 0, 'total_seconds': 0.0,
+                                                   'max_seconds': 0.0})
+        entry['calls'] += 1
+        entry['total_seconds'] += record['duration']
+        entry['max_seconds'] = max(entry['max_seconds'], record['duration'])
+        if 'peak_bytes' in record:
+            entry['peak_bytes'] = max(entry.get('peak_bytes', 0), record['peak_bytes'])
+    return totals
+
+
+def snapshot():
+    """
+    Returns everything recorded so far.
+
+    Returns:
+        dict: 'spans' (in completion order), 'summary', 'counters' and 'gauges'.
+    """
+    with _lock:
+        spans = list(_spans)
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+    return {'spans': spans, 'summary': summary(), 'counters': counters, 'gauges': gauges}
+
+
+def to_prometheus():
+    """
+    Formats the span summary, counters and gauges in the Prometheus text format.
+
+    Returns:
+        str: The exposition text.
+    """
+    data = snapshot()
+    lines = []
+
+    def family(metric, kind, help_text, samples):
+        if not samples:
+            return
+        lines.append(f"# HELP {METRIC_PREFIX}_{metric} {help_text}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_{metric} {kind}")
+        for labels, value in samples:
+            lines.append(f"{METRIC_PREFIX}_{metric}{labels} {value}")
+
+    stages = data['summary'].items()
+    family('span_calls_total', 'counter', "Number of times each stage ran.",
+           [(f'{{span="{name}"}}', s['calls']) for name, s in stages])
+    family('span_seconds_total', 'counter', "Wall time spent in each stage.",
+           [(f'{{span="{name}"}}', repr(s['total_seconds'])) for name, s in stages])
+    family('span_seconds_max', 'gauge', "Longest single run of each stage.",
+           [(f'{{span="{name}"}}', repr(s['max_seconds'])) for name, s in stages])
+    family('span_peak_bytes', 'gauge', "Peak allocation during each stage.",
+           [(f'{{span="{name}"}}', s['peak_bytes']) for name, s in stages if 'peak_bytes' in s])
+    for name, value in sorted(data['counters'].items()):
+        family(f"{name}_total", 'counter', f"Counter {name}.", [('', value)])
+    for name, value in sorted(data['gauges'].items()):
+        family(name, 'gauge', f"Gauge {name}.", [('', value)])
+    return '\n'.join(lines) + '\n'
+
+
+def write_trace(filename):
+    """
+    Writes the trace to a file: Prometheus text for '.prom' or '.txt', JSON otherwise.
+
+    Parameters:
+        filename (str): Destination path.
+    """
+    if os.path.splitext(filename)[1] in ('.prom', '.txt'):
+        text = to_prometheus()
+    else:
+        text = json.dumps(snapshot(), indent=2, default=str)
+    with open(filename, 'w') as f:
+        f.write(text)
@@ -0,0 +1,237 @@
+# transfers.py
+import heapq
+import math
+import numpy as np
+from .shortest_paths import ShortestPaths
+from . import tracing
+from .logger_config import logger
+
+# Criterion counting actual changes of travel mode, as opposed to 'transfers' (edges travelled)
+MODE_CHANGES = 'mode_changes'
+
+
+def count_mode_changes(modes):
+    """
+    Counts the changes of travel mode along a sequence of hops.
+
+    Parameters:
+        modes (list): Travel mode of each hop, in travel order.
+
+    Returns:
+        int: Number of consecutive hops with different modes.
+    """
+    return sum(1 for a, b in zip(modes, modes[1:]) if a != b)
+
+
+def transfer_search(offsets, targets, weights, modes, n_modes, source, penalty=None):
+    """
+    Runs a mode-aware shortest path search from one source.
+
+    The search runs over (stop, mode) states, where the mode is the one the
+    stop was reached with; taking an edge of another mode is a mode change.
+    Leaving the source is free, since no mode has been chosen yet.
+
+    With `penalty=None` the objective is lexicographic: fewest mode changes,
+    then least weight. States are kept in a bucket queue indexed by the number
+    of mode changes, with a heap on the weight inside each bucket, so every
+    bucket is settled before the next one is opened. With a penalty, a mode
+    change costs `penalty` weight units and a single heap is used.
+
+    A state is pruned when the best state of its stop, switched to the
+    state's mode at the price of one more change, is at least as good.
+
+    Parameters:
+        offsets, targets, weights (numpy.ndarray): CSR adjacency structure.
+        modes (numpy.ndarray): Travel mode code of every adjacency entry.
+        n_modes (int): Number of travel mode codes.
+        source (int): Index of the source node.
+        penalty (float, optional): Weight units charged per mode change.
+
+    Returns:
+        tuple: Mode changes and path weight to every node (numpy.ndarray, inf
+            where unreachable), state every node is best reached in (-1 for the
+            source and unreachable nodes), predecessor of every state
+            (int32 numpy.ndarray, -1 for states entered from the source).
+    """
+    n = len(offsets) - 1
+    step_bucket, step_key = (1, 0.0) if penalty is None else (0, float(penalty))
+    offsets = offsets.tolist()
+    targets = targets.tolist()
+    weights = weights.tolist()
+    modes = modes.tolist()
+
+    size = n * n_modes
+    bucket = [math.inf] * size
+    key = [math.inf] * size
+    changes = [0] * size
+    weight = [0.0] * size
+    pred = [-1] * size
+    done = [False] * size
+    best_bucket = [math.inf] * n
+    best_key = [math.inf] * n
+    best_state = [-1] * n
+    buckets = [[(0.0, -1)]]
+    pruned = 0
+
+    b = 0
+    while b < len(buckets):
+        heap = buckets[b]
+        while heap:
+            k, s = heapq.heappop(heap)
+            if s < 0:
+                v, m, c, t = source, -1, 0, 0.0
+            else:
+                if done[s] or bucket[s] != b or k != key[s]:
+                    continue
+                done[s] = True
+                v, m = divmod(s, n_modes)
+                if best_state[v] < 0:
+                    best_bucket[v], best_key[v], best_state[v] = b, k, s
+                elif best_bucket[v] + step_bucket <= b and best_key[v] + step_key <= k:
+                    pruned += 1
+                    continue
+                c, t = changes[s], weight[s]
+            for e in range(offsets[v], offsets[v + 1]):
+                w = targets[e]
+                if w == source:
+                    continue
+                m2 = modes[e]
+                s2 = w * n_modes + m2
+                if done[s2]:
+                    continue
+                nk = k + weights[e]
+                if m >= 0 and m2 != m:
+                    nb, nk, nc = b + step_bucket, nk + step_key, c + 1
+                else:
+                    nb, nc = b, c
+                if best_state[w] >= 0 and best_bucket[w] + step_bucket <= nb \
+                        and best_key[w] + step_key <= nk:
+                    pruned += 1
+                    continue
+                if nb < bucket[s2] or (nb == bucket[s2] and nk < key[s2]):
+                    bucket[s2], key[s2] = nb, nk
+                    changes[s2], weight[s2], pred[s2] = nc, t + weights[e], s
+                    while len(buckets) <= nb:
+                        buckets.append([])
+                    heapq.heappush(buckets[nb], (nk, s2))
+        b += 1
+    tracing.count('transfer_states_pruned', pruned)
+
+    node_changes = np.full(n, np.inf)
+    node_weight = np.full(n, np.inf)
+    node_changes[source] = node_weight[source] = 0.0
+    for v, s in enumerate(best_state):
+        if s >= 0:
+            node_changes[v] = changes[s]
+            node_weight[v] = weight[s]
+    return node_changes, node_weight, np.array(best_state, dtype=np.int32), \
+        np.array(pred, dtype=np.int32)
+
+
+class TransferPaths(ShortestPaths):
+    """
+    Mode-aware shortest paths from a set of sources, over (stop, mode) states.
+
+    `matrix` holds the objective: mode changes plus a fraction for the weight
+    when lexicographic, or weight plus the penalty per mode change otherwise.
+    Paths are reconstructed from state predecessors, so `path` follows the
+    modes the search actually chose.
+
+    Attributes:
+        changes (numpy.ndarray): Mode changes from every source to every node.
+        weights (numpy.ndarray): Path weight from every source to every node.
+        penalty (float): Weight units per mode change, or None for lexicographic.
+        best_states (numpy.ndarray): State every node is best reached in, per source.
+        state_predecessors (numpy.ndarray): Predecessor of every state, per source.
+        n_modes (int): Number of travel mode codes.
+    """
+
+    def __init__(self, changes, weights, nodes, index, sources, best_states,
+                 state_predecessors, n_modes, penalty=None):
+        self.changes = changes
+        self.weights = weights
+        self.penalty = penalty
+        self.best_states = best_states
+        self.state_predecessors = state_predecessors
+        self.n_modes = n_modes
+        if penalty is None:
+            finite = weights[np.isfinite(weights)]
+            # Large enough that the weights of a whole tour add up to less than one change
+            self.scale = (float(finite.max()) if len(finite) else 0.0) * (len(sources) + 1) + 1.0
+            matrix = changes + weights / self.scale
+        else:
+            self.scale = None
+            matrix = weights + penalty * changes
+        super().__init__(matrix, nodes, index, sources)
+
+    def path(self, source, target):
+        """
+        Reconstructs the node sequence of the best path between two nodes.
+
+        Parameters:
+            source: The start node.
+            target: The end node.
+
+        Returns:
+            list: Nodes from source to target, inclusive.
+        """
+        if source not in self.source_index:
+            return self.path(target, source)[::-1]
+        row = self.source_index[source]
+        if source == target:
+            return [source]
+        state = int(self.best_states[row][self.index[target]])
+        if state < 0:
+            raise ValueError(f"No path between {source} and {target}.")
+        preds = self.state_predecessors[row]
+        hops = []
+        while state >= 0:
+            hops.append(state // self.n_modes)
+            state = int(preds[state])
+        hops.append(self.index[source])
+        return [self.nodes[i] for i in reversed(hops)]
+
+
+def transfer_inputs(network, weight='time'):
+    """
+    Returns the arrays `transfer_search` runs on for a network.
+
+    Parameters:
+        network (Network): The transport network.
+        weight (str): Metric minimized after, or alongside, the mode changes.
+
+    Returns:
+        tuple: CSR weights (numpy.ndarray), travel mode code of every adjacency
+            entry (numpy.ndarray), number of travel mode codes (int).
+    """
+    n_modes = max(len(network.mode_names), 1)
+    return network.csr_weights(weight), network.modes[network.edge_ids], n_modes
+
+
+@tracing.traced()
+def transfer_paths(network, sources, weight='time', penalty=None, rows=None):
+    """
+    Computes mode-aware shortest paths over a network from the given sources.
+
+    Parameters:
+        network (Network): The transport network.
+        sources (list): Source nodes.
+        weight (str): Metric minimized after, or alongside, the mode changes.
+        penalty (float, optional): Weight units per mode change; lexicographic when None.
+        rows (list, optional): `transfer_search` results for the sources, when
+            already computed with the same weight and penalty.
+
+    Returns:
+        TransferPaths: Mode changes, weights and paths from every source.
+    """
+    n = network.number_of_nodes()
+    weights, modes, n_modes = transfer_inputs(network, weight)
+    if rows is None:
+        rows = [transfer_search(network.offsets, network.targets, weights, modes, n_modes,
+                                network.index[node], penalty) for node in sources]
+        tracing.count('transfer_searches', len(sources))
+    changes, totals, best_states, preds = (
+        np.array([row[column] for row in rows]).reshape(len(sources), -1) for column in range(4))
+    logger.debug(f"Mode-aware shortest paths: {len(sources)} sources, {n * n_modes} states")
+    return TransferPaths(changes, totals, network.nodes, network.index, list(sources),
+                         best_states, preds, n_modes, penalty)
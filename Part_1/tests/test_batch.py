@@ -0,0 +1,38 @@
+import shutil
+import tempfile
+import unittest
+from modules.batch import plan_many
+from modules.service import Planner
+
+class TestBatch(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cache_dir = tempfile.mkdtemp()
+        cls.planner = Planner('data/routes.json', cache_dir=cls.cache_dir)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.cache_dir)
+
+    def test_results_match_single_plans(self):
+        jobs = [
+            ("Tarjan's Home", ['Relative_1', 'Relative_2', 'Relative_3'], 'time'),
+            {'start': 'Relative_4', 'stops': ['Relative_5', 'Relative_9'], 'criteria': 'cost'},
+            ('Relative_10', ['Relative_6', 'Relative_7', 'Relative_8', "Tarjan's Home"], 'transfers'),
+        ]
+        results = sorted(plan_many(self.planner, jobs, workers=2), key=lambda r: r['job'])
+        self.assertEqual([r['job'] for r in results], [0, 1, 2])
+        for result, job in zip(results, jobs):
+            start, stops, criteria = (job['start'], job['stops'], job['criteria']) \
+                if isinstance(job, dict) else job
+            expected = self.planner.plan(criteria, stops=stops, start=start)
+            self.assertEqual(result['path'][0], start)
+            self.assertAlmostEqual(result['total_weight'], expected['total_weight'])
+            self.assertGreaterEqual(result['latency'], result['solve_time'])
+
+    def test_empty_batch(self):
+        self.assertEqual(list(plan_many(self.planner, [])), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+import networkx as nx
+from modules.benchmark import STAGES, compare_results, run_case
+from modules.data_loader import validate_route
+from modules.graph_utils import build_graph
+from modules.synthetic import generate_routes
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_generated_network_is_valid_and_connected(self):
+        routes = generate_routes(120, degree=3.0, stops=8, mode_mix={'bus': 1, 'walking': 1}, seed=3)
+        for route in routes:
+            self.assertIsNone(validate_route(route))
+        G = build_graph(routes, 'time')
+        self.assertEqual(G.number_of_nodes(), 120)
+        self.assertTrue(nx.is_connected(G))
+        self.assertAlmostEqual(G.number_of_edges(), 180, delta=5)
+        self.assertIn('Relative_8', G)
+        self.assertNotIn('Relative_9', G)
+        self.assertEqual({route['travel_mode'] for route in routes}, {'bus', 'walking'})
+
+    def test_generator_is_deterministic(self):
+        self.assertEqual(generate_routes(30, seed=1), generate_routes(30, seed=1))
+
+    def test_run_case_measures_every_stage(self):
+        case = run_case(40, stops=5, repeat=1, time_budget=0.1)
+        self.assertEqual(tuple(case['stages']), STAGES)
+        for measured in case['stages'].values():
+            self.assertGreaterEqual(measured['wall_median'], measured['wall_min'])
+            self.assertGreater(measured['peak_bytes'], 0)
+
+    def test_compare_flags_slowdowns(self):
+        def results(wall):
+            return {'cases': [{'nodes': 10, 'degree': 4.0, 'stops': 3, 'seed': 0, 'criteria': 'time',
+                               'stages': {'solve_tsp': {'wall_min': wall}}}]}
+        rows = compare_results(results(0.1), results(0.2))
+        self.assertEqual(len(rows), 1)
+        self.assertTrue(rows[0]['regression'])
+        self.assertFalse(compare_results(results(0.1), results(0.105))[0]['regression'])
+
+if __name__ == '__main__':
+    unittest.main()
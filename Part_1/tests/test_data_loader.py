@@ -1,7 +1,9 @@
 import unittest
 from unittest.mock import mock_open, patch
-from modules.data_loader import parse_json
+from modules.data_loader import parse_json, iter_routes, RouteSchemaError
 import json
+import os
+import tempfile
 
 class TestDataLoader(unittest.TestCase):
 
@@ -21,5 +23,50 @@ class TestDataLoader(unittest.TestCase):
         with self.assertRaises(json.JSONDecodeError):
             parse_json('data/routes.json')
 
+    def write_routes(self, text):
+        fd, path = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_iter_routes_matches_parse_json(self):
+        routes = list(iter_routes('data/routes.json', chunk_size=64))
+        expected = parse_json('data/routes.json')
+        self.assertEqual(len(routes), len(expected))
+        for route, original in zip(routes, expected):
+            self.assertEqual(route['position_1'], original['position_1'])
+            self.assertEqual(list(route['position2_coordinates']), original['position2_coordinates'])
+            self.assertEqual(route['travel_speed'], original['travel_speed'])
+        # Each stop's coordinates are stored once
+        self.assertIs(routes[0]['position1_coordinates'], routes[1]['position1_coordinates'])
+
+    def test_iter_routes_reports_schema_error_location(self):
+        path = self.write_routes('[\n  {"position_1": "A", "position_2": "B",\n'
+                                 '   "position1_coordinates": [1, 2], "position2_coordinates": [3, 4],\n'
+                                 '   "travel_mode": "bus", "travel_speed": 40, "cost_per_km": 2},\n'
+                                 '  {"position_1": "B"}\n]')
+        routes = iter_routes(path)
+        self.assertEqual(next(routes)['position_2'], 'B')
+        with self.assertRaises(RouteSchemaError) as context:
+            next(routes)
+        self.assertEqual((context.exception.record, context.exception.lineno), (1, 5))
+
+    def test_iter_routes_malformed_json(self):
+        path = self.write_routes('[{"position_1": }]')
+        with self.assertRaises(RouteSchemaError) as context:
+            list(iter_routes(path))
+        self.assertEqual((context.exception.lineno, context.exception.colno), (1, 17))
+
+    def test_iter_routes_rejects_trailing_data(self):
+        route = ('{"position_1": "A", "position_2": "B", "position1_coordinates": [1, 2], '
+                 '"position2_coordinates": [3, 4], "travel_mode": "bus", "travel_speed": 40, '
+                 '"cost_per_km": 2}')
+        self.assertEqual(len(list(iter_routes(self.write_routes(f'[{route}]\n\n')))), 1)
+        for text in (f'[{route}]\n[{route}]', '[] x'):
+            with self.assertRaises(RouteSchemaError) as context:
+                list(iter_routes(self.write_routes(text), chunk_size=8))
+            self.assertIn("unexpected data after the routes array", str(context.exception))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from modules.data_loader import parse_json
+from modules.distance_cache import DistanceCache
+from modules.geodesy import batch_distance
+from modules.graph_utils import build_network
+
+class TestDistanceCache(unittest.TestCase):
+
+    def setUp(self):
+        data = parse_json('data/routes.json')
+        self.coords1 = np.array([route['position1_coordinates'] for route in data])
+        self.coords2 = np.array([route['position2_coordinates'] for route in data])
+
+    def test_identical_to_uncached(self):
+        cache = DistanceCache()
+        expected = batch_distance(self.coords1, self.coords2)
+        # Reversed routes hit the entries of the forward ones
+        coords1 = np.vstack([self.coords1, self.coords2])
+        coords2 = np.vstack([self.coords2, self.coords1])
+        for _ in range(2):
+            distances = cache.distances(coords1, coords2)
+            np.testing.assert_array_equal(distances, np.concatenate([expected, expected]))
+        stats = cache.stats()
+        self.assertEqual(stats['misses'], len(self.coords1))
+        self.assertEqual(stats['hits'], 3 * len(self.coords1))
+        np.testing.assert_array_equal(batch_distance(self.coords2, self.coords1), expected)
+
+    def test_build_network_with_cache(self):
+        data = parse_json('data/routes.json')
+        cache = DistanceCache()
+        uncached = build_network(data)
+        cached = build_network(data, distance_cache=cache)
+        np.testing.assert_array_equal(cached.columns['distance'], uncached.columns['distance'])
+        build_network(data, distance_cache=cache)
+        self.assertEqual(cache.stats()['hit_rate'], 0.5)
+
+    def test_lru_eviction(self):
+        cache = DistanceCache(maxsize=5)
+        cache.distances(self.coords1[:5], self.coords2[:5])
+        cache.distances(self.coords1[:1], self.coords2[:1])
+        cache.distances(self.coords1[5:7], self.coords2[5:7])
+        self.assertEqual(len(cache), 5)
+        self.assertEqual(cache.evictions, 2)
+        misses = cache.misses
+        cache.distances(self.coords1[:1], self.coords2[:1])
+        self.assertEqual(cache.misses, misses)
+
+    def test_persistence(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'distances.npz')
+            cache = DistanceCache(path=path)
+            expected = cache.distances(self.coords1, self.coords2, method='haversine')
+            cache.save()
+            reloaded = DistanceCache(path=path)
+            self.assertEqual(len(reloaded), len(cache))
+            np.testing.assert_array_equal(
+                reloaded.distances(self.coords1, self.coords2, method='haversine'), expected)
+            self.assertEqual(reloaded.misses, 0)
+            reloaded.distances(self.coords1[:1], self.coords2[:1], method='ellipsoidal')
+            self.assertEqual(reloaded.misses, 1)
+
+if __name__ == '__main__':
+    unittest.main()
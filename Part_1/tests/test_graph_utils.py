@@ -1,6 +1,12 @@
+import os
+import tempfile
 import unittest
 import networkx as nx
-from modules.graph_utils import build_graph, compute_all_pairs_shortest_paths, create_distance_matrix
+from modules.graph_utils import (
+    build_graph, build_network, compute_all_pairs_shortest_paths, create_distance_matrix,
+    find_terminals, expand_route, plot_graph
+)
+from modules.synthetic import generate_routes
 from geopy.distance import geodesic
 import numpy as np
 
@@ -34,6 +40,23 @@ class TestGraphUtils(unittest.TestCase):
         self.assertAlmostEqual(edge_data['time'], expected_distance / 40, places=2)
         self.assertAlmostEqual(edge_data['cost'], expected_distance * 2, places=2)
     
+    def test_build_graph_matches_per_route_geodesic(self):
+        G = build_graph(self.sample_data, 'cost')
+        G_reference = build_graph(self.sample_data, 'cost', distance_method='geopy')
+        self.assertEqual(list(G.nodes(data=True)), list(G_reference.nodes(data=True)))
+        self.assertEqual(list(G.edges()), list(G_reference.edges()))
+        for u, v, data in G.edges(data=True):
+            reference = G_reference.get_edge_data(u, v)
+            self.assertEqual(data['travel_mode'], reference['travel_mode'])
+            for key in ('weight', 'distance', 'time', 'cost'):
+                self.assertAlmostEqual(data[key], reference[key], places=9)
+    
+    def test_build_graph_haversine(self):
+        G = build_graph(self.sample_data, 'time', distance_method='haversine')
+        expected_distance = geodesic((37.52389, 126.92667), (37.5800, 126.9844)).kilometers
+        edge_data = G.get_edge_data("Tarjan's Home", "Relative_8")
+        self.assertAlmostEqual(edge_data['distance'], expected_distance, delta=expected_distance * 0.005)
+    
     def test_compute_all_pairs_shortest_paths(self):
         G = build_graph(self.sample_data, 'time')
         all_pairs = compute_all_pairs_shortest_paths(G)
@@ -52,5 +75,64 @@ class TestGraphUtils(unittest.TestCase):
         self.assertAlmostEqual(distance_matrix[0][1], all_pairs["Tarjan's Home"]["Relative_8"])
         self.assertAlmostEqual(distance_matrix[1][0], all_pairs["Relative_8"]["Tarjan's Home"])
 
+    def test_terminal_only_distance_matrix(self):
+        transit_data = self.sample_data + [
+            {
+                "routeName": "route2",
+                "position_1": "Relative_8",
+                "position1_streetName": "Bukhan-ro",
+                "position1_coordinates": [37.5800, 126.9844],
+                "position_2": "Station",
+                "position2_streetName": "Hannam-daero",
+                "position2_coordinates": [37.5340, 127.0026],
+                "travel_mode": "bus",
+                "travel_speed": 40,
+                "cost_per_km": 2
+            },
+            {
+                "routeName": "route3",
+                "position_1": "Station",
+                "position1_streetName": "Hannam-daero",
+                "position1_coordinates": [37.5340, 127.0026],
+                "position_2": "Relative_6",
+                "position2_streetName": "Seongsu-daero",
+                "position2_coordinates": [37.5443, 127.0557],
+                "travel_mode": "bicycle",
+                "travel_speed": 15,
+                "cost_per_km": 0
+            }
+        ]
+        G = build_graph(transit_data, 'time')
+        terminals = find_terminals(G)
+        self.assertEqual(terminals, ["Tarjan's Home", "Relative_8", "Relative_6"])
+        all_pairs = compute_all_pairs_shortest_paths(G, terminals=terminals)
+        distance_matrix, index, nodes = create_distance_matrix(G, all_pairs, terminals)
+        self.assertEqual(distance_matrix.shape, (3, 3))
+        self.assertEqual(nodes, terminals)
+        full = compute_all_pairs_shortest_paths(G, as_dict=True)
+        for u in terminals:
+            for v in terminals:
+                self.assertAlmostEqual(distance_matrix[index[u]][index[v]], full[u][v])
+        legs = expand_route(G, terminals, all_pairs)
+        self.assertEqual(len(legs), 3)
+        self.assertEqual([(hop['from'], hop['to'], hop['travel_mode']) for hop in legs[1]['hops']],
+                         [("Relative_8", "Station", "bus"), ("Station", "Relative_6", "bicycle")])
+
+    def test_plot_graph_writes_file(self):
+        network = build_network(generate_routes(300, stops=5, seed=2))
+        terminals = find_terminals(network)
+        paths = network.shortest_paths(sources=terminals)
+        legs = expand_route(network, terminals, paths)
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, options in (('full.png', {}), ('corridor.svg', {'corridor': 0.1, 'max_labels': 3})):
+                output = os.path.join(tmp, name)
+                plot_graph(network, terminals, 'time', legs, output=output, **options)
+                self.assertGreater(os.path.getsize(output), 0)
+
+    def test_find_terminals_missing_start(self):
+        G = build_graph(self.sample_data, 'time')
+        with self.assertRaises(KeyError):
+            find_terminals(G, start='Nowhere')
+
 if __name__ == '__main__':
     unittest.main()
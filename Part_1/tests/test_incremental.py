@@ -0,0 +1,64 @@
+import unittest
+import numpy as np
+from modules.data_loader import parse_json
+from modules.graph_utils import build_graph, find_terminals, compute_all_pairs_shortest_paths
+from modules.incremental import update_shortest_paths, affected_sources, replan
+from modules.optimizer import solve_tsp, adjust_route
+
+class TestIncremental(unittest.TestCase):
+
+    def setUp(self):
+        self.data = parse_json('data/routes.json')
+        self.G = build_graph(self.data, 'time')
+        self.terminals = find_terminals(self.G)
+        self.all_pairs = compute_all_pairs_shortest_paths(self.G, terminals=self.terminals)
+
+    def assertMatchesFullRecompute(self, updated):
+        expected = compute_all_pairs_shortest_paths(self.G, terminals=self.terminals)
+        np.testing.assert_allclose(updated.matrix, expected.matrix)
+        for u in self.terminals:
+            for v in self.terminals:
+                path = updated.path(u, v)
+                length = sum(self.G[a][b]['weight'] for a, b in zip(path, path[1:]))
+                self.assertAlmostEqual(length, updated[u][v])
+
+    def test_weight_increase_and_decrease(self):
+        updates = [
+            {'op': 'update', 'position_1': "Tarjan's Home", 'position_2': 'Relative_8', 'travel_speed': 5},
+            {'op': 'update', 'position_1': 'Relative_8', 'position_2': 'Relative_5', 'travel_speed': 400},
+        ]
+        updated = update_shortest_paths(self.G, self.all_pairs, updates, 'time')
+        self.assertMatchesFullRecompute(updated)
+
+    def test_remove_and_add_routes(self):
+        route = dict(self.data[0], position_2='New_Stop', position2_coordinates=[37.55, 126.95])
+        updates = [
+            {'op': 'remove', 'position_1': "Tarjan's Home", 'position_2': 'Relative_5'},
+            dict(route, op='add'),
+        ]
+        updated = update_shortest_paths(self.G, self.all_pairs, updates, 'time')
+        self.assertIn('New_Stop', updated.index)
+        self.assertMatchesFullRecompute(updated)
+
+    def test_unrelated_change_recomputes_nothing(self):
+        u, v = "Tarjan's Home", 'Relative_8'
+        weight = self.G[u][v]['weight']
+        changes = [((u, v), weight, weight)]
+        self.assertFalse(affected_sources(self.all_pairs, changes).any())
+
+    def test_replan_warm_starts_from_previous_tour(self):
+        distance_matrix = self.all_pairs.submatrix(self.terminals)
+        index = {node: i for i, node in enumerate(self.terminals)}
+        permutation, _ = solve_tsp(distance_matrix)
+        previous_path = adjust_route(permutation, index, self.terminals)
+        updates = [{'op': 'update', 'position_1': 'Relative_8', 'position_2': 'Relative_5',
+                    'cost_per_km': 10}]
+        _, path, total_weight, legs = replan(self.G, self.all_pairs, updates, 'time', previous_path)
+        self.assertEqual(sorted(path), sorted(previous_path))
+        self.assertEqual(len(legs), len(path))
+        _, expected = solve_tsp(compute_all_pairs_shortest_paths(
+            self.G, terminals=self.terminals).submatrix(self.terminals))
+        self.assertAlmostEqual(total_weight, expected)
+
+if __name__ == '__main__':
+    unittest.main()
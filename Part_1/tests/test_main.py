@@ -0,0 +1,93 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from main import main
+from modules import tracing
+
+class TestMain(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def run_main(self, *argv):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            status = main(['--cache-dir', self.cache_dir] + list(argv))
+        return status, stdout.getvalue()
+
+    def test_json_output(self):
+        status, output = self.run_main('--criteria', 'cost', '--format', 'json')
+        self.assertEqual(status, 0)
+        result = json.loads(output)['results'][0]
+        self.assertEqual(result['criteria'], 'cost')
+        self.assertEqual(result['path'][0], "Tarjan's Home")
+        self.assertEqual(len(result['path']), 11)
+
+    def test_csv_output_for_all_criteria(self):
+        status, output = self.run_main('--criteria', 'all', '--format', 'csv',
+                                        '--stops', 'Relative_2,Relative_5')
+        self.assertEqual(status, 0)
+        lines = output.splitlines()
+        self.assertEqual(lines[0], 'criteria,total_weight,leg,from,to,travel_mode')
+        self.assertEqual({line.split(',')[0] for line in lines[1:]}, {'time', 'cost', 'transfers'})
+
+    def test_text_output_to_file(self):
+        output = os.path.join(self.cache_dir, 'out.txt')
+        for criteria, expected in (('cost', 'Total travel cost:'),
+                                   ('all', 'Route comparison across optimization criteria:')):
+            status, printed = self.run_main('--criteria', criteria, '--output', output)
+            self.assertEqual(status, 0)
+            self.assertEqual(printed, '')
+            with open(output) as f:
+                self.assertIn(expected, f.read())
+
+    def test_text_output_with_transfer_penalty(self):
+        args = ('--criteria', 'mode_changes', '--transfer-penalty', '0.5')
+        _, output = self.run_main(*args, '--format', 'json')
+        result = json.loads(output)['results'][0]
+        status, output = self.run_main(*args)
+        self.assertEqual(status, 0)
+        self.assertIn(f"Penalized travel time: {result['total_weight']:.2f} hours "
+                      f"(0.5 hours per mode change)", output)
+        self.assertIn(f"Total number of mode changes: {result['metrics']['mode_changes']}", output)
+
+    def test_coordinate_start(self):
+        status, output = self.run_main('--criteria', 'time', '--format', 'json',
+                                        '--start', '37.5239,126.9267', '--stops', 'Relative_2;Relative_5')
+        self.assertEqual(status, 0)
+        result = json.loads(output)['results'][0]
+        self.assertEqual(result['path'][0], "Tarjan's Home")
+        self.assertEqual(result['snapped'][0]['node'], "Tarjan's Home")
+
+    def test_single_coordinate_stop(self):
+        status, output = self.run_main('--criteria', 'time', '--format', 'json',
+                                        '--stops', '37.5239,126.9267')
+        self.assertEqual(status, 0)
+        result = json.loads(output)['results'][0]
+        self.assertEqual(result['snapped'][0]['node'], "Tarjan's Home")
+
+    def test_negative_transfer_penalty_rejected(self):
+        with self.assertRaises(SystemExit), contextlib.redirect_stderr(io.StringIO()):
+            self.run_main('--criteria', 'mode_changes', '--transfer-penalty', '-1')
+
+    def test_unknown_stop_fails(self):
+        status, _ = self.run_main('--criteria', 'time', '--stops', 'Nowhere')
+        self.assertEqual(status, 2)
+
+    def test_trace_written_when_planning_fails(self):
+        trace = os.path.join(self.cache_dir, 'trace.json')
+        status, _ = self.run_main('--criteria', 'time', '--stops', 'Nowhere', '--trace', trace)
+        self.assertEqual(status, 2)
+        self.assertFalse(tracing.is_enabled())
+        with open(trace) as f:
+            self.assertIn('plan', {span['name'] for span in json.load(f)['spans']})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+from modules.data_loader import parse_json
+from modules.graph_utils import build_graph, find_terminals, compute_all_pairs_shortest_paths, \
+    create_distance_matrix
+from modules.optimizer import solve_tsp
+from modules.multi_criteria import compare_criteria, pareto_front
+
+class TestMultiCriteria(unittest.TestCase):
+
+    def setUp(self):
+        self.G = build_graph(parse_json('data/routes.json'), 'time')
+        self.terminals = find_terminals(self.G)
+
+    def test_matches_single_criterion_pipeline(self):
+        results = compare_criteria(self.G, self.terminals)
+        self.assertEqual(set(results), {'time', 'cost', 'transfers'})
+        for criteria, result in results.items():
+            G = build_graph(parse_json('data/routes.json'), criteria)
+            all_pairs = compute_all_pairs_shortest_paths(G, terminals=self.terminals)
+            distance_matrix, _, _ = create_distance_matrix(G, all_pairs, self.terminals)
+            _, total_weight = solve_tsp(distance_matrix)
+            self.assertAlmostEqual(result['total_weight'], total_weight)
+            self.assertAlmostEqual(result['metrics'][criteria], total_weight)
+            self.assertEqual(result['path'][0], "Tarjan's Home")
+
+    def test_pareto_front_is_not_empty(self):
+        results = compare_criteria(self.G, self.terminals)
+        front = pareto_front(results)
+        self.assertTrue(front)
+        self.assertTrue(set(front) <= set(results))
+
+if __name__ == '__main__':
+    unittest.main()
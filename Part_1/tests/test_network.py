@@ -0,0 +1,55 @@
+import unittest
+import networkx as nx
+import numpy as np
+from modules.data_loader import parse_json
+from modules.graph_utils import build_network, build_graph, find_terminals, expand_route
+from modules.shortest_paths import shortest_paths
+
+class TestNetwork(unittest.TestCase):
+
+    def setUp(self):
+        self.data = parse_json('data/routes.json')
+        self.network = build_network(self.data, 'cost')
+        self.G = build_graph(self.data, 'cost')
+
+    def test_matches_networkx_graph(self):
+        self.assertEqual(list(self.network), list(self.G.nodes()))
+        self.assertEqual(self.network.number_of_edges(), self.G.number_of_edges())
+        for u, v, data in self.G.edges(data=True):
+            edge = self.network.get_edge_data(v, u)
+            self.assertEqual(edge.to_dict(), data)
+        self.assertIsNone(self.network.get_edge_data("Tarjan's Home", 'Nowhere'))
+        self.assertEqual(sorted(self.network.neighbors('Relative_1')),
+                         sorted(self.G.neighbors('Relative_1')))
+        self.assertTrue(nx.utils.graphs_equal(self.network.to_networkx(), self.G))
+
+    def test_repeated_routes_keep_last_attributes(self):
+        route = dict(self.data[0])
+        repeated = dict(route, travel_mode='walking', travel_speed=5, cost_per_km=0,
+                        position2_coordinates=[37.58, 126.99])
+        network = build_network([route, self.data[1], repeated])
+        self.assertEqual(network.number_of_edges(), 2)
+        edge = network.get_edge_data(route['position_1'], route['position_2'])
+        self.assertEqual(edge.travel_mode, 'walking')
+        self.assertEqual(edge['cost'], 0.0)
+        self.assertEqual(network.coordinates[network.index[route['position_2']]].tolist(),
+                         [37.58, 126.99])
+
+    def test_shortest_paths_and_legs_match_networkx(self):
+        terminals = find_terminals(self.network)
+        for criteria in ('time', 'cost', 'transfers'):
+            expected = shortest_paths(build_graph(self.data, criteria), sources=terminals)
+            result = self.network.shortest_paths(criteria, sources=terminals)
+            np.testing.assert_allclose(result.submatrix(terminals), expected.submatrix(terminals))
+        paths = self.network.shortest_paths(sources=terminals)
+        self.assertEqual(expand_route(self.network, terminals, paths),
+                         expand_route(self.G, terminals, paths))
+
+    def test_compact_arrays(self):
+        self.assertEqual(self.network.offsets.dtype, np.int32)
+        self.assertEqual(self.network.targets.dtype, np.int32)
+        self.assertEqual(len(self.network.targets), 2 * self.network.number_of_edges())
+        self.assertLess(self.network.nbytes / self.network.number_of_edges(), 100)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from modules.data_loader import parse_json
+from modules.graph_utils import build_graph, find_terminals, compute_all_pairs_shortest_paths, \
+    create_distance_matrix
+from modules.network_cache import load_or_compile_network
+
+class TestNetworkCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.routes = os.path.join(self.tmp, 'routes.json')
+        shutil.copy('data/routes.json', self.routes)
+        self.cache_dir = os.path.join(self.tmp, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_warm_start_matches_fresh_build(self):
+        cold = load_or_compile_network(self.routes, ('time', 'cost'), cache_dir=self.cache_dir)
+        warm = load_or_compile_network(self.routes, ('time', 'cost'), cache_dir=self.cache_dir)
+        self.assertIsInstance(warm.arrays['dist_time'], np.memmap)
+
+        G = build_graph(parse_json(self.routes), 'cost')
+        terminals = find_terminals(G)
+        all_pairs = compute_all_pairs_shortest_paths(G, terminals=terminals)
+        expected, _, nodes = create_distance_matrix(G, all_pairs, terminals)
+        for network in (cold, warm):
+            matrix, _, cached_nodes = network.distance_matrix('cost')
+            self.assertEqual(cached_nodes, nodes)
+            np.testing.assert_allclose(matrix, expected)
+        rebuilt = warm.to_graph('cost')
+        self.assertEqual(sorted(rebuilt.edges()), sorted(G.edges()))
+
+    def test_changed_file_triggers_rebuild(self):
+        load_or_compile_network(self.routes, 'time', cache_dir=self.cache_dir)
+        data = parse_json(self.routes)
+        data[0]['travel_speed'] *= 2
+        with open(self.routes, 'w') as f:
+            json.dump(data, f)
+        network = load_or_compile_network(self.routes, 'time', cache_dir=self.cache_dir)
+        G = build_graph(data, 'time')
+        self.assertAlmostEqual(network.to_graph().get_edge_data("Tarjan's Home", 'Relative_8')['time'],
+                               G.get_edge_data("Tarjan's Home", 'Relative_8')['time'])
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import itertools
+import unittest
+import numpy as np
+from modules.optimizer import solve_tsp, adjust_route
+from modules.heuristics import solve_tsp_local_search, one_tree_lower_bound, tour_length
+from modules.held_karp import solve_tsp_held_karp
+from python_tsp.exact import solve_tsp_dynamic_programming
+
+class TestOptimizer(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        points = rng.random((9, 2))
+        self.distance_matrix = np.linalg.norm(points[:, None] - points[None, :], axis=2)
+
+    def test_heuristic_matches_exact_on_small_instance(self):
+        _, exact_weight = solve_tsp(self.distance_matrix, method='exact')
+        permutation, heuristic_weight = solve_tsp(self.distance_matrix, method='heuristic')
+        self.assertEqual(sorted(permutation), list(range(9)))
+        self.assertAlmostEqual(heuristic_weight, tour_length(permutation, self.distance_matrix))
+        self.assertLessEqual(exact_weight, heuristic_weight + 1e-9)
+        self.assertLessEqual(heuristic_weight, exact_weight * 1.1)
+
+    def test_auto_switches_on_node_count(self):
+        _, _, report = solve_tsp(self.distance_matrix, exact_node_limit=5, return_report=True)
+        self.assertEqual(report['solver'], 'heuristic')
+        self.assertIsNotNone(report['gap'])
+        _, _, report = solve_tsp(self.distance_matrix, exact_node_limit=20, return_report=True)
+        self.assertEqual(report['solver'], 'exact')
+        self.assertEqual(report['gap'], 0.0)
+
+    def test_lower_bound_is_below_optimum(self):
+        _, exact_weight = solve_tsp(self.distance_matrix, method='exact')
+        self.assertLessEqual(one_tree_lower_bound(self.distance_matrix), exact_weight + 1e-9)
+
+    def test_local_search_respects_initial_tour(self):
+        permutation, weight = solve_tsp_local_search(self.distance_matrix, time_budget=0.0,
+                                                     initial_tour=list(range(9)))
+        self.assertEqual(permutation, list(range(9)))
+        self.assertAlmostEqual(weight, tour_length(range(9), self.distance_matrix))
+
+    def test_held_karp_matches_reference_solver(self):
+        _, expected = solve_tsp_dynamic_programming(self.distance_matrix)
+        for kwargs in ({}, {'prune': False}, {'upper_bound': expected}):
+            permutation, total_weight = solve_tsp_held_karp(self.distance_matrix, **kwargs)
+            self.assertEqual(permutation[0], 0)
+            self.assertEqual(sorted(permutation), list(range(9)))
+            self.assertAlmostEqual(total_weight, expected)
+
+    def test_held_karp_on_asymmetric_matrices(self):
+        rng = np.random.default_rng(7)
+        matrices = [np.array([[0, 1, 10], [10, 0, 1], [1, 10, 0]]).T, rng.random((6, 6))]
+        for matrix in matrices:
+            n = len(matrix)
+            expected = min(tour_length([0, *rest], matrix)
+                           for rest in itertools.permutations(range(1, n)))
+            permutation, total_weight = solve_tsp_held_karp(matrix)
+            self.assertAlmostEqual(total_weight, expected)
+            _, total_weight, report = solve_tsp(matrix, return_report=True)
+            self.assertEqual(report['solver'], 'exact')
+            self.assertAlmostEqual(total_weight, expected)
+
+    def test_held_karp_parallel_layers(self):
+        _, serial = solve_tsp_held_karp(self.distance_matrix)
+        _, parallel = solve_tsp_held_karp(self.distance_matrix, workers=2)
+        self.assertAlmostEqual(serial, parallel)
+
+    def test_adjust_route_starts_at_home(self):
+        nodes = ['Relative_1', "Tarjan's Home", 'Relative_2']
+        index = {node: i for i, node in enumerate(nodes)}
+        self.assertEqual(adjust_route([0, 1, 2], index, nodes),
+                         ["Tarjan's Home", 'Relative_2', 'Relative_1'])
+
+if __name__ == '__main__':
+    unittest.main()
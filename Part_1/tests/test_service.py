@@ -0,0 +1,57 @@
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+import urllib.request
+from modules.service import Planner, PlanningError, create_server
+
+class TestService(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cache_dir = tempfile.mkdtemp()
+        cls.planner = Planner('data/routes.json', cache_dir=cls.cache_dir)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.cache_dir)
+
+    def test_plan_subset_from_other_start(self):
+        result = self.planner.plan('cost', stops=['Relative_3', 'Relative_7'], start='Relative_1')
+        self.assertEqual(result['path'][0], 'Relative_1')
+        self.assertEqual(sorted(result['path']), ['Relative_1', 'Relative_3', 'Relative_7'])
+        self.assertEqual(result['legs'][-1]['to'], 'Relative_1')
+
+    def test_unknown_stop(self):
+        with self.assertRaises(PlanningError):
+            self.planner.plan('time', stops=['Nowhere'])
+
+    def test_snap_coordinates_to_stops(self):
+        result = self.planner.plan('time', stops=[[37.5801, 126.9843], 'Relative_5'],
+                                   start={'lat': 37.5239, 'lon': 126.9267})
+        self.assertEqual(result['path'][0], "Tarjan's Home")
+        self.assertIn('Relative_8', result['path'])
+        self.assertEqual([snap['node'] for snap in result['snapped']], ["Tarjan's Home", 'Relative_8'])
+        self.assertLess(result['snapped'][1]['distance_km'], 0.05)
+        with self.assertRaises(PlanningError):
+            self.planner.plan('time', start=[0.0, 0.0])
+
+    def test_http_round_trip(self):
+        server = create_server(self.planner, port=0, workers=2)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/plan"
+            body = json.dumps({'criteria': 'time'}).encode('utf-8')
+            with urllib.request.urlopen(urllib.request.Request(url, data=body)) as response:
+                result = json.loads(response.read())
+            self.assertEqual(result['path'][0], "Tarjan's Home")
+            self.assertEqual(len(result['path']), 11)
+        finally:
+            server.shutdown()
+            server.server_close()
+            server.pool.shutdown()
+
+if __name__ == '__main__':
+    unittest.main()
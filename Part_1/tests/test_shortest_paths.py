@@ -0,0 +1,59 @@
+import unittest
+import networkx as nx
+import numpy as np
+from modules.shortest_paths import shortest_paths, ShortestPaths
+from modules.graph_utils import compute_all_pairs_shortest_paths
+
+class TestShortestPaths(unittest.TestCase):
+
+    def setUp(self):
+        self.G = nx.gnm_random_graph(30, 60, seed=7)
+        rng = np.random.default_rng(7)
+        for u, v in self.G.edges():
+            self.G[u][v]['weight'] = float(rng.uniform(1, 10))
+        self.G.add_node('isolated')
+        self.reference = dict(nx.floyd_warshall(self.G, weight='weight'))
+
+    def assertMatchesReference(self, result):
+        for u in self.G.nodes():
+            for v in self.G.nodes():
+                expected = self.reference[u][v]
+                if np.isinf(expected):
+                    self.assertTrue(np.isinf(result[u][v]))
+                else:
+                    self.assertAlmostEqual(result[u][v], expected)
+
+    def test_floyd_warshall_matches_networkx(self):
+        self.assertMatchesReference(shortest_paths(self.G, method='floyd_warshall'))
+
+    def test_dijkstra_matches_networkx(self):
+        self.assertMatchesReference(shortest_paths(self.G, method='dijkstra'))
+
+    def test_nested_dict_only_on_request(self):
+        result = compute_all_pairs_shortest_paths(self.G)
+        self.assertIsInstance(result, ShortestPaths)
+        as_dict = compute_all_pairs_shortest_paths(self.G, as_dict=True)
+        self.assertIsInstance(as_dict, dict)
+        self.assertMatchesReference(as_dict)
+
+    def test_path_reconstruction_matches_lengths(self):
+        for method in ('floyd_warshall', 'dijkstra'):
+            result = shortest_paths(self.G, sources=[0, 1, 2], method=method)
+            for target in range(30):
+                if np.isinf(result[0][target]):
+                    continue
+                path = result.path(0, target)
+                self.assertEqual(path[0], 0)
+                self.assertEqual(path[-1], target)
+                length = sum(self.G[a][b]['weight'] for a, b in zip(path, path[1:]))
+                self.assertAlmostEqual(length, result[0][target])
+            # Paths towards a source are the reversed paths from it
+            self.assertEqual(result.path(5, 1), result.path(1, 5)[::-1])
+
+    def test_path_to_unreachable_node(self):
+        result = shortest_paths(self.G, sources=[0])
+        with self.assertRaises(ValueError):
+            result.path(0, 'isolated')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+import numpy as np
+from modules.geodesy import batch_distance
+from modules.spatial_index import SpatialIndex
+
+class TestSpatialIndex(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.coordinates = np.column_stack([rng.uniform(37.4, 37.7, 2000),
+                                            rng.uniform(126.8, 127.1, 2000)])
+        self.coordinates[10] = self.coordinates[20]
+        self.index = SpatialIndex(self.coordinates, leaf_size=8)
+        self.queries = np.column_stack([rng.uniform(37.4, 37.7, 25), rng.uniform(126.8, 127.1, 25)])
+
+    def brute_force(self, lat, lon):
+        query = np.tile([lat, lon], (len(self.coordinates), 1))
+        return batch_distance(query, self.coordinates, method='haversine')
+
+    def test_nearest_matches_brute_force(self):
+        for lat, lon in self.queries.tolist():
+            distances = self.brute_force(lat, lon)
+            expected = np.argsort(distances)[:5]
+            found = self.index.nearest(lat, lon, k=5)
+            self.assertEqual([i for i, _ in found], expected.tolist())
+            np.testing.assert_allclose([d for _, d in found], distances[expected])
+
+    def test_within_matches_brute_force(self):
+        for lat, lon in self.queries.tolist():
+            distances = self.brute_force(lat, lon)
+            found = self.index.within(lat, lon, 1.5)
+            self.assertEqual(sorted(i for i, _ in found), np.flatnonzero(distances <= 1.5).tolist())
+            self.assertEqual([d for _, d in found], sorted(d for _, d in found))
+
+    def test_duplicates(self):
+        self.assertEqual(self.index.duplicates(), [[10, 20]])
+        self.assertIn([10, 20], self.index.duplicates(0.001))
+
+    def test_empty(self):
+        index = SpatialIndex(np.empty((0, 2)))
+        self.assertEqual(index.nearest(37.5, 127.0), [])
+        self.assertEqual(index.within(37.5, 127.0, 10), [])
+
+if __name__ == '__main__':
+    unittest.main()
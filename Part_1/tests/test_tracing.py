@@ -0,0 +1,57 @@
+import json
+import os
+import tempfile
+import unittest
+from modules import tracing
+from modules.data_loader import parse_json
+from modules.graph_utils import build_graph
+
+class TestTracing(unittest.TestCase):
+
+    def setUp(self):
+        tracing.reset()
+
+    def tearDown(self):
+        tracing.disable()
+        tracing.reset()
+
+    def test_disabled_records_nothing(self):
+        build_graph(parse_json('data/routes.json'), 'time')
+        with tracing.span('outer') as span:
+            span.set(size=3)
+        tracing.count('edges_built', 5)
+        snapshot = tracing.snapshot()
+        self.assertEqual(snapshot['spans'], [])
+        self.assertEqual(snapshot['counters'], {})
+
+    def test_spans_counters_and_memory(self):
+        tracing.enable(memory=True)
+        with tracing.span('outer', criteria='time'):
+            G = build_graph(parse_json('data/routes.json'), 'time')
+        snapshot = tracing.snapshot()
+        spans = {record['name']: record for record in snapshot['spans']}
+        self.assertEqual(spans['build_graph']['parent'], 'outer')
+        self.assertEqual(spans['batch_distance']['parent'], 'build_network')
+        self.assertEqual(spans['batch_distance']['depth'], 3)
+        self.assertEqual(spans['outer']['attrs'], {'criteria': 'time'})
+        self.assertGreaterEqual(spans['outer']['peak_bytes'], spans['build_graph']['peak_bytes'])
+        self.assertGreaterEqual(spans['outer']['duration'], spans['build_graph']['duration'])
+        self.assertEqual(snapshot['counters']['edges_built'], 17)
+        self.assertEqual(snapshot['gauges']['graph_nodes'], G.number_of_nodes())
+
+    def test_exports(self):
+        tracing.enable()
+        build_graph(parse_json('data/routes.json'), 'cost')
+        with tempfile.TemporaryDirectory() as tmp:
+            tracing.write_trace(os.path.join(tmp, 'trace.prom'))
+            tracing.write_trace(os.path.join(tmp, 'trace.json'))
+            with open(os.path.join(tmp, 'trace.prom')) as f:
+                text = f.read()
+            with open(os.path.join(tmp, 'trace.json')) as f:
+                document = json.load(f)
+        self.assertIn('tarjan_span_calls_total{span="build_graph"} 1', text)
+        self.assertIn('tarjan_edges_built_total 17', text)
+        self.assertEqual(document['summary']['build_graph']['calls'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import networkx as nx
+import numpy as np
+from modules.graph_utils import build_network
+from modules.network import Network
+from modules.planner import Planner, PlanningError
+from modules.service import handle_request
+from modules import transfers
+from modules.synthetic import generate_routes
+from modules.transfers import count_mode_changes, transfer_paths
+
+def expanded_graph(network, source, penalty):
+    """Builds the (stop, mode) state graph explicitly, as a reference."""
+    G = nx.DiGraph()
+    modes = network.modes[network.edge_ids].tolist()
+    weights = network.csr_weights('time').tolist()
+    for v in range(network.number_of_nodes()):
+        for e in range(network.offsets[v], network.offsets[v + 1]):
+            u = int(network.targets[e])
+            for m in range(len(network.mode_names)):
+                G.add_edge((v, m), (u, modes[e]), weight=weights[e] + (penalty if m != modes[e] else 0))
+            if v == source:
+                G.add_edge('source', (u, modes[e]), weight=weights[e])
+    return G
+
+class TestTransfers(unittest.TestCase):
+
+    def setUp(self):
+        # A-B-C is quickest but changes mode at B; A-D-E-C stays on the bus
+        nodes = ['A', 'B', 'C', 'D', 'E']
+        edges = [(0, 1, 1.0, 0), (1, 2, 1.0, 1), (0, 3, 1.0, 0), (3, 4, 1.0, 0), (4, 2, 1.0, 0)]
+        src, dst, time, modes = zip(*edges)
+        self.network = Network(nodes, np.zeros((5, 2)), src, dst,
+                               {'time': time, 'cost': time, 'distance': time}, modes,
+                               ['bus', 'walking'])
+
+    def test_count_mode_changes(self):
+        self.assertEqual(count_mode_changes(['bus', 'bus', 'walking', 'bus']), 2)
+        self.assertEqual(count_mode_changes([]), 0)
+
+    def test_lexicographic_prefers_fewer_changes(self):
+        paths = transfer_paths(self.network, ['A'])
+        self.assertEqual(paths.path('A', 'C'), ['A', 'D', 'E', 'C'])
+        self.assertEqual(paths.changes[0, 2], 0)
+        self.assertEqual(paths.weights[0, 2], 3.0)
+        self.assertEqual(paths.path('C', 'A'), ['C', 'E', 'D', 'A'])
+
+    def test_penalty_trades_changes_for_time(self):
+        self.assertEqual(transfer_paths(self.network, ['A'], penalty=0.5).path('A', 'C'),
+                         ['A', 'B', 'C'])
+        self.assertEqual(transfer_paths(self.network, ['A'], penalty=2.0).path('A', 'C'),
+                         ['A', 'D', 'E', 'C'])
+
+    def test_matches_expanded_graph(self):
+        network = build_network(generate_routes(n_nodes=120, degree=4.0, seed=2))
+        sources = network.nodes[:4]
+        for penalty, big in ((None, 1e6), (0.25, 0.25)):
+            paths = transfer_paths(network, sources, penalty=penalty)
+            for row, source in enumerate(sources):
+                lengths = nx.single_source_dijkstra_path_length(
+                    expanded_graph(network, network.index[source], big), 'source')
+                expected = np.full(network.number_of_nodes(), np.inf)
+                expected[network.index[source]] = 0.0
+                for state, length in lengths.items():
+                    if state != 'source':
+                        expected[state[0]] = min(expected[state[0]], length)
+                np.testing.assert_allclose(paths.changes[row] * big + paths.weights[row], expected)
+                for target in network.nodes[::10]:
+                    path = paths.path(source, target)
+                    modes = [network.get_edge_data(u, v).travel_mode for u, v in zip(path, path[1:])]
+                    self.assertEqual(count_mode_changes(modes),
+                                     paths.changes[row, network.index[target]])
+
+class TestPlannerModeChanges(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.planner = Planner('data/routes.json', cache_dir=self.cache_dir,
+                               criteria=('time', 'mode_changes'))
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_plan_minimizes_mode_changes(self):
+        result = self.planner.plan('mode_changes')
+        self.assertEqual(result['path'][0], "Tarjan's Home")
+        self.assertEqual(len(result['path']), 11)
+        changes = sum(count_mode_changes([hop['travel_mode'] for hop in leg['hops']])
+                      for leg in result['legs'])
+        self.assertEqual(int(result['total_weight']), changes)
+        fastest = self.planner.plan('time')
+        fastest_changes = sum(count_mode_changes([hop['travel_mode'] for hop in leg['hops']])
+                              for leg in fastest['legs'])
+        self.assertLessEqual(changes, fastest_changes)
+
+    def test_plan_reuses_transfer_searches(self):
+        with patch('modules.planner.transfer_search', wraps=transfers.transfer_search) as search:
+            first = self.planner.plan('mode_changes', transfer_penalty=0.5)
+            self.assertEqual(search.call_count, 11)
+            second = self.planner.plan('mode_changes', transfer_penalty=0.5)
+            self.assertEqual(search.call_count, 11)
+            self.planner.plan('mode_changes', transfer_penalty=1)
+            self.assertEqual(search.call_count, 22)
+        self.assertEqual(first['path'], second['path'])
+        self.assertAlmostEqual(first['total_weight'], second['total_weight'])
+
+    def test_invalid_transfer_penalty(self):
+        for penalty in ('2', -1, float('nan'), True):
+            with self.assertRaises(PlanningError):
+                self.planner.plan('mode_changes', transfer_penalty=penalty)
+        status, _ = handle_request(self.planner, {'criteria': 'mode_changes',
+                                                  'transfer_penalty': '2'})
+        self.assertEqual(status, 400)
+
+if __name__ == '__main__':
+    unittest.main()